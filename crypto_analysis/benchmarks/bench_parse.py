@@ -0,0 +1,85 @@
+"""
+Micro-benchmark of the OHLC response parser against the previous implementation.
+
+    python -m benchmarks.bench_parse
+"""
+import time
+import json
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+from crypto_analysis.utils import process_response
+
+
+def legacy_process_response(response):
+    """
+    Previous implementation: object DataFrame, column by column conversion and copy.
+    """
+    asset = list(response["result"].keys())[0]
+    data = pd.DataFrame(response["result"][asset])
+    data.columns = ["date", "open", "high", "low", "close", "vwap", "volume", "count"]
+
+    ohlc_columns = ["open", "high", "low", "close", "volume"]
+    data["date"] = pd.to_datetime(data["date"], unit="s")
+    data[ohlc_columns] = data[ohlc_columns].apply(pd.to_numeric, errors="coerce")
+    data = data[["date"] + ohlc_columns].copy()
+
+    return data
+
+
+def make_response(n, seed=0):
+    """
+    Kraken-like OHLC response with n rows, prices as strings.
+    """
+    rng = np.random.default_rng(seed)
+    close = 30000 + rng.normal(0, 50, n).cumsum()
+    rows = [
+        [
+            1600000000 + 60 * i,
+            f"{close[i] - 5:.1f}",
+            f"{close[i] + 20:.1f}",
+            f"{close[i] - 20:.1f}",
+            f"{close[i]:.1f}",
+            f"{close[i] + 1:.1f}",
+            f"{rng.uniform(0, 10):.8f}",
+            int(rng.integers(1, 500)),
+        ]
+        for i in range(n)
+    ]
+
+    return {"error": [], "result": {"XXBTZUSD": rows, "last": rows[-2][0]}}
+
+
+def measure(function, response, repeat):
+    """
+    Best time of repeat runs, in seconds, and peak traced memory of one run, in bytes.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(response)
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    function(response)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return min(times), peak
+
+
+def main():
+    results = []
+    for rows, repeat in [(720, 50), (100_000, 5)]:
+        response = make_response(rows)
+        for name, function in [("legacy", legacy_process_response), ("process_response", process_response)]:
+            seconds, peak = measure(function, response, repeat)
+            results.append({"benchmark": f"parse_{name}", "rows": rows, "seconds": seconds, "peak_bytes": peak})
+            print(f"{name:>16} {rows:>7} rows: {seconds * 1000:8.2f} ms, peak {peak / 1024**2:7.2f} MiB")
+
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(main()))
@@ -0,0 +1,130 @@
+"""
+Local stand-in for the Kraken public REST API, serving fixture payloads over HTTP.
+"""
+
+import os
+import json
+import time
+import threading
+import numpy as np
+from urllib.parse import parse_qs, urlparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES_PATH = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def load_fixture(name):
+    """
+    Load a JSON payload from the fixtures directory.
+    """
+    with open(os.path.join(FIXTURES_PATH, name), "r") as file:
+        return json.load(file)
+
+
+def scale_rows(rows, n):
+    """
+    Extend (or cut) the OHLC rows of a fixture to n rows. Extra rows are fixture candles
+    picked at random and scaled so their closes follow a random walk that ends at the first
+    fixture candle.
+    """
+    if n <= len(rows):
+        return rows[-n:]
+
+    base = np.array([row[1:7] for row in rows], dtype=np.float64)
+    closes = base[:, 3]
+    extra = n - len(rows)
+    rng = np.random.default_rng(n)
+
+    # Closes of the extra candles, walking backwards with the fixture returns
+    picks = rng.integers(1, len(rows), extra)
+    returns = closes[picks] / closes[picks - 1]
+    walk = closes[0] / np.cumprod(returns[::-1])[::-1]
+
+    # Prices scaled to the walk, volume as in the fixture
+    values = base[picks] / closes[picks, None] * walk[:, None]
+    values[:, 5] = base[picks, 5]
+    times = rows[0][0] - 86400 * np.arange(extra, 0, -1)
+
+    new_rows = [
+        [int(timestamp)] + [f"{value:.1f}" for value in prices[:5]] + [f"{prices[5]:.8f}", rows[pick][7]]
+        for timestamp, prices, pick in zip(times, values, picks)
+    ]
+
+    return new_rows + rows
+
+
+def ohlc_payload(n, pair="XXBTZUSD", interval=1440):
+    """
+    Kraken OHLC response with n rows built from the recorded fixture, placed on the interval
+    grid so the last candle is the running candle, as in a live response.
+    """
+    rows = scale_rows(load_fixture("ohlc_xbtusd_1440.json")["result"]["XXBTZUSD"], n)
+    last_time = int(time.time()) // (interval * 60) * interval * 60
+    rows = [[last_time - (n - 1 - i) * interval * 60] + row[1:] for i, row in enumerate(rows)]
+
+    return {"error": [], "result": {pair: rows, "last": rows[-2][0]}}
+
+
+class FakeKraken:
+    """
+    HTTP server answering /0/public/OHLC and /0/public/AssetPairs with fixture payloads.
+    The number of OHLC rows served is set with the rows attribute.
+    """
+
+    def __init__(self, rows=720):
+        self.rows = rows
+        self.requests = 0
+        self.asset_pairs = load_fixture("asset_pairs.json")
+        self.payloads = {}
+
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.answer(parse_qs(urlparse(self.path).query))
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                self.answer(parse_qs(self.rfile.read(length).decode()))
+
+            def answer(self, params):
+                fake.requests += 1
+                body = json.dumps(fake.payload(urlparse(self.path).path, params)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("localhost", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def uri(self):
+        return f"http://localhost:{self.server.server_address[1]}"
+
+    def payload(self, path, params):
+        # Response of an endpoint
+        if path.endswith("/AssetPairs"):
+            return self.asset_pairs
+
+        if path.endswith("/OHLC"):
+            pair = params.get("pair", ["XXBTZUSD"])[0]
+            interval = int(params.get("interval", [1440])[0])
+            key = (pair, interval, self.rows)
+            if key not in self.payloads:
+                self.payloads[key] = ohlc_payload(self.rows, pair, interval)
+            return self.payloads[key]
+
+        return {"error": ["EGeneral:Unknown method"], "result": {}}
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,197 @@
+"""
+Benchmark suite of the model, utils and app hot paths, run against a local fake Kraken API.
+
+    python -m benchmarks.run --output bench_results.json
+    python -m benchmarks.run --sizes 720 10000 --compare bench_results.json
+
+Timings (best of --repeat runs) and peak traced memory of every benchmark and size are
+written to a JSON file, so results of different commits can be compared.
+"""
+
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import subprocess
+import tracemalloc
+
+from crypto_analysis.app import CryptoAnalysisApp
+from crypto_analysis.model import CryptoAnalysisModel
+from crypto_analysis.pairs import PairCatalogue
+from crypto_analysis.utils import process_response
+from benchmarks.fake_kraken import FakeKraken, ohlc_payload
+
+# Default number of candles
+SIZES = [720, 10_000, 100_000, 1_000_000]
+
+# Benchmarks that send or render every candle only run up to this size by default
+MAX_RENDER_ROWS = 100_000
+
+# Minute candles, so millions of candles stay within a few years
+PAIR = "BTCUSD"
+INTERVAL = 1
+
+
+def measure(function, repeat=5, setup=None):
+    """
+    Best time of repeat runs, in seconds, and peak traced memory of one more run, in bytes.
+    setup runs before every call and is not measured.
+    """
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    result = function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"seconds": min(times), "peak_bytes": peak}, result
+
+
+def offline_model(fake):
+    """
+    Model that talks to the fake Kraken API, without local store.
+    """
+    model = CryptoAnalysisModel()
+    model.config["data"]["interval"] = INTERVAL
+    model.connection.uri = fake.uri
+    model.store = None
+    model.pair_catalogue = PairCatalogue(url=f"{fake.uri}/0/public/AssetPairs")
+
+    return model
+
+
+def run_size(fake, rows, repeat, max_render_rows):
+    """
+    Run every benchmark with the given number of candles.
+    """
+    fake.rows = rows
+    model = offline_model(fake)
+    results = []
+
+    def record(name, measurement, **extra):
+        results.append({"benchmark": name, "rows": rows, **measurement, **extra})
+        print(
+            f"{name:>20} {rows:>9} rows: {measurement['seconds'] * 1000:10.2f} ms, "
+            f"peak {measurement['peak_bytes'] / 1024**2:8.2f} MiB",
+            file=sys.stderr,
+        )
+
+    # Parse an OHLC response
+    payload = ohlc_payload(rows, interval=INTERVAL)
+    measurement, _ = measure(lambda: process_response(payload), repeat)
+    record("process_response", measurement)
+
+    # Raw data from the API, parsed and cached
+    if rows <= max_render_rows:
+        measurement, _ = measure(lambda: model.get_data(PAIR), repeat, setup=model.data_cache.invalidate)
+        record("get_data_miss", measurement)
+
+    # Raw data from the cache
+    model.get_data(PAIR)
+    measurement, _ = measure(lambda: model.get_data(PAIR), repeat)
+    record("get_data_hit", measurement)
+
+    # Indicators, without cached result
+    def drop_indicators():
+        model.data_cache.remove(model.indicator_key(PAIR, INTERVAL, model.indicator_params()))
+
+    measurement, data = measure(lambda: model.compute_indicators(PAIR), repeat, setup=drop_indicators)
+    record("compute_indicators", measurement)
+
+    # Date range of the second half of the candles, as selected in the sidebar
+    start_date = data["date"].iloc[len(data) // 2]
+    measurement, _ = measure(lambda: model.filter_dates(data, start_date, data["date"].iloc[-1]), repeat)
+    record("filter_dates", measurement)
+
+    if rows <= max_render_rows:
+        # Figure construction, and size of the JSON sent to the browser
+        measurement, fig = measure(lambda: model.graph_pair(data, PAIR), repeat)
+        record("graph_pair", measurement, payload_bytes=len(fig.to_json()))
+
+        # Figure JSON from the figure cache
+        model.get_figure_json(PAIR, interval=INTERVAL)
+        measurement, _ = measure(lambda: model.get_figure_json(PAIR, interval=INTERVAL), repeat)
+        record("figure_json_hit", measurement)
+
+        # Full dashboard rerun with warm cache
+        app = CryptoAnalysisApp(model=model)
+        measurement, _ = measure(app.run, repeat)
+        record("app_run", measurement)
+
+        # Chart displayed from the figure cache, Streamlit serialization included
+        measurement, _ = measure(app.display_graph, repeat)
+        record("display_graph_hit", measurement)
+
+    return results
+
+
+def git_commit():
+    # Current commit, if available
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(results, baseline_path):
+    """
+    Print the time and memory ratio of every benchmark against a previous results file.
+    """
+    with open(baseline_path, "r") as file:
+        baseline = {(item["benchmark"], item["rows"]): item for item in json.load(file)["results"]}
+
+    for item in results:
+        previous = baseline.get((item["benchmark"], item["rows"]))
+        if previous is None:
+            continue
+        time_ratio = item["seconds"] / previous["seconds"]
+        memory_ratio = item["peak_bytes"] / max(previous["peak_bytes"], 1)
+        print(f"{item['benchmark']:>20} {item['rows']:>9} rows: time x{time_ratio:5.2f}, memory x{memory_ratio:5.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the crypto_analysis hot paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="Numbers of candles")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs of each benchmark, the best is kept")
+    parser.add_argument(
+        "--max-render-rows", type=int, default=MAX_RENDER_ROWS, help="Largest size for API and rendering benchmarks"
+    )
+    parser.add_argument("--output", default="bench_results.json", help="JSON results file")
+    parser.add_argument("--compare", default=None, help="Previous JSON results file to compare with")
+    args = parser.parse_args(argv)
+
+    # Streamlit warns about running without "streamlit run"
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+    results = []
+    with FakeKraken() as fake:
+        for rows in args.sizes:
+            results += run_size(fake, rows, args.repeat, args.max_render_rows)
+
+    output = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "timestamp": time.time(),
+        "results": results,
+    }
+    with open(args.output, "w") as file:
+        json.dump(output, file, indent=1)
+
+    if args.compare is not None:
+        compare(results, args.compare)
+
+    return output
+
+
+if __name__ == "__main__":
+    main()
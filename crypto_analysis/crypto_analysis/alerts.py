@@ -0,0 +1,282 @@
+import json
+import math
+import time
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from crypto_analysis.pairs import DEFAULT_PAIRS
+from crypto_analysis.metrics import metrics
+
+
+# Signal columns that fire alerts by default
+ALERT_SIGNALS = ["Buy_Signal", "Sell_Signal"]
+
+
+def next_boundary(now, interval):
+    """
+    This function returns the time, in seconds, at which the running candle of an interval
+    (in minutes) closes: the next multiple of the interval, as Kraken aligns its candles.
+    """
+    seconds = interval * 60
+    return (math.floor(now / seconds) + 1) * seconds
+
+
+class FileSink:
+    """
+    Alerts appended to a file as JSON lines.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def send(self, alerts):
+        # One line per alert
+        with self.lock:
+            with open(self.path, "a") as file:
+                for alert in alerts:
+                    file.write(json.dumps(alert) + "\n")
+
+
+class WebhookSink:
+    """
+    Alerts posted as a JSON document ({"alerts": [...]}) to a webhook URL, one request per
+    round, through the shared HTTP session.
+    """
+
+    def __init__(self, url, session, timeout=5):
+        self.url = url
+        self.session = session
+        self.timeout = timeout
+
+    def send(self, alerts):
+        # Errors are raised, the engine reports them and keeps going
+        response = self.session.post(self.url, json={"alerts": alerts}, timeout=self.timeout)
+        if response.status_code >= 400:
+            raise ValueError(f"Webhook answered with status {response.status_code}")
+
+
+class FeedSink:
+    """
+    Most recent alerts kept in memory for the dashboard feed.
+    """
+
+    def __init__(self, max_alerts=100):
+        self.alerts = deque(maxlen=max_alerts)
+        self.lock = threading.Lock()
+
+    def send(self, alerts):
+        with self.lock:
+            self.alerts.extend(alerts)
+
+    def recent(self, n=None):
+        """
+        This method returns the last n alerts (all of them by default), newest first.
+        """
+        with self.lock:
+            alerts = list(self.alerts)[::-1]
+
+        return alerts if n is None else alerts[:n]
+
+
+def sinks_from_config(alerts_config, session):
+    """
+    This function builds the sinks of the "sinks" entry of the "alerts" section of config.yml.
+    """
+    sinks_config = alerts_config.get("sinks", {})
+    sinks = []
+
+    if sinks_config.get("feed"):
+        sinks.append(FeedSink(sinks_config["feed"]))
+    if sinks_config.get("file"):
+        sinks.append(FileSink(sinks_config["file"]))
+    if sinks_config.get("webhook"):
+        sinks.append(WebhookSink(sinks_config["webhook"], session, timeout=sinks_config.get("webhook_timeout", 5)))
+
+    return sinks
+
+
+class AlertEngine:
+    """
+    Scheduler that checks, at each candle close of an interval, which pairs have just fired a
+    crossover signal. For every pair only the newest candles are requested and fed to its
+    incremental stochastic oscillator (see streaming.StochasticState), so a round costs one
+    small request and O(1) work per pair instead of recomputing whole histories. Every alert
+    is sent once (by pair, interval, signal and candle) to every sink.
+    """
+
+    def __init__(
+        self,
+        model,
+        pairs=None,
+        interval=None,
+        sinks=None,
+        signals=None,
+        delay=0.5,
+        fetch=True,
+        max_workers=16,
+        max_seen=10000,
+        clock=time.time,
+    ):
+        self.model = model
+        self.pairs = list(DEFAULT_PAIRS if pairs is None else pairs)
+        self.interval = model.config["data"]["interval"] if interval is None else interval
+        self.sinks = [] if sinks is None else list(sinks)
+        self.signals = list(ALERT_SIGNALS if signals is None else signals)
+        self.delay = delay
+        self.fetch = fetch
+        self.max_workers = max_workers
+        self.max_seen = max_seen
+        self.clock = clock
+
+        # Alerts already sent, oldest first
+        self.seen = OrderedDict()
+
+        # Date of the last closed candle checked of every pair, None before its first one
+        self.checked = {}
+
+        self.rounds = 0
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def warm(self):
+        """
+        This method builds the incremental indicators of every pair from its history, so the
+        rounds only request the newest candles. Returns the number of pairs ready.
+        """
+
+        def build(pair):
+            try:
+                self.start_pair(pair)
+                return True
+            except Exception as e:
+                print(f"Warning: Indicators of {pair} not built. {e}")
+                return False
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return sum(executor.map(build, self.pairs))
+
+    def start_pair(self, pair):
+        # Indicators of a pair, the candles closed before the engine started are not alerted
+        state = self.model.get_indicator_state(pair=pair, interval=self.interval)
+        with state.lock:
+            if pair not in self.checked:
+                self.checked[pair] = None if state.previous is None else pd.Timestamp(state.previous["date"])
+
+        return state
+
+    def check_pair(self, pair):
+        """
+        This method updates the indicators of a pair with its newest candles and returns the
+        alerts of every candle closed since the last check, so the candles of a round where
+        Kraken lagged behind are alerted on the next one.
+        """
+        state = self.start_pair(pair)
+
+        # Newest candles, unless a live feed already merges them
+        if self.fetch:
+            self.model.refresh_candles(pair=pair, interval=self.interval)
+
+        # Closed candles with every indicator computed, after the last one checked
+        with state.lock:
+            last = self.checked[pair]
+            rows = [row for row in state.closed if last is None or pd.Timestamp(row["date"]) > last]
+            if rows:
+                self.checked[pair] = pd.Timestamp(rows[-1]["date"])
+
+        return [
+            {
+                "pair": pair,
+                "interval": self.interval,
+                "signal": signal,
+                "date": pd.Timestamp(row["date"]).isoformat(),
+                "close": row["close"],
+                "pctK": row["pctK"],
+                "pctD": row["pctD"],
+            }
+            for row in rows
+            for signal in self.signals
+            if row.get(signal)
+        ]
+
+    def deduplicate(self, alerts):
+        # Alerts not sent before, remembering a bounded number of them
+        new_alerts = []
+        for alert in alerts:
+            key = (alert["pair"], alert["interval"], alert["signal"], alert["date"])
+            if key in self.seen:
+                continue
+
+            self.seen[key] = True
+            new_alerts.append(alert)
+            if len(self.seen) > self.max_seen:
+                self.seen.popitem(last=False)
+
+        return new_alerts
+
+    def deliver(self, alerts):
+        # Every sink gets the alerts, a failing sink doesn't stop the others
+        for sink in self.sinks:
+            try:
+                sink.send(alerts)
+            except Exception as e:
+                metrics.increment("alert_sink_errors", sink=type(sink).__name__)
+                print(f"Warning: Alerts not sent to {type(sink).__name__}. {e}")
+
+    @metrics.timed("alerts.evaluate")
+    def evaluate(self):
+        """
+        This method checks every pair concurrently, skipping the pairs that fail, and sends
+        the new alerts to the sinks. Returns the alerts sent.
+        """
+
+        def check(pair):
+            try:
+                return self.check_pair(pair)
+            except Exception as e:
+                metrics.increment("alert_pair_errors")
+                print(f"Warning: Alerts of {pair} not checked. {e}")
+                return []
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            alerts = [alert for pair_alerts in executor.map(check, self.pairs) for alert in pair_alerts]
+
+        # Alerts of a candle are sent once
+        alerts = self.deduplicate(alerts)
+        if alerts:
+            metrics.increment("alerts", len(alerts))
+            self.deliver(alerts)
+
+        self.rounds += 1
+        return alerts
+
+    def run(self):
+        # Evaluate shortly after every candle close until stopped
+        self.warm()
+        while not self.stopped.is_set():
+            boundary = next_boundary(self.clock(), self.interval)
+            if self.stopped.wait(max(0, boundary + self.delay - self.clock())):
+                break
+
+            self.evaluate()
+
+            # Time from the candle close to the alerts sent
+            metrics.observe("alerts.latency", self.clock() - boundary)
+
+    def start(self):
+        """
+        This method runs the engine in a background thread.
+        """
+        if self.thread is not None and self.thread.is_alive():
+            return
+
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        # The engine stops while waiting, or after the round being evaluated
+        self.stopped.set()
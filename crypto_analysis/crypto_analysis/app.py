@@ -4,21 +4,27 @@ import streamlit as st
 import os
 
 from crypto_analysis.utils import select_box_date
-from crypto_analysis.model import CryptoAnalysisModel
+from crypto_analysis.model import get_shared_model
+from crypto_analysis.metrics import metrics
 from crypto_analysis.exception import CryptoAnalysisException
 
 
+# Dashboard modes
+SINGLE_MODE = "Single asset"
+COMPARE_MODE = "Compare assets"
+
+
 class CryptoAnalysisApp:
     """
     Main application class for the crypto analysis dashboard.
     """
 
-    def __init__(self):
+    def __init__(self, model=None):
         """
         Initialize the model, config, and other necessary components.
         """
-        # Initialize model
-        self.model = CryptoAnalysisModel()
+        # Initialize model, shared by the whole process by default
+        self.model = get_shared_model() if model is None else model
         self.config = self.model.config
 
     def run(self):
@@ -26,14 +32,42 @@ class CryptoAnalysisApp:
         Dashboard deployment. This is the main entry point for the application.
         Display the main user interface elements in the appropriate order.
         """
-        # Set page layout configuration
-        st.set_page_config(layout="wide")
+        # Time every stage of this rerun
+        trace = metrics.start_trace()
+
+        try:
+            with metrics.span("app.run"):
+                # Set page layout configuration
+                st.set_page_config(layout="wide")
+
+                # Display all the components
+                with metrics.span("app.display_title"):
+                    self.display_title()
 
-        # Display all the components
-        self.display_title()
-        self.display_sidebar()
-        self.display_additional_info()
-        self.display_graph()
+                # One asset, or many assets side by side
+                if self.select_mode() == COMPARE_MODE:
+                    with metrics.span("app.display_comparison_sidebar"):
+                        self.display_comparison_sidebar()
+                    with metrics.span("app.display_comparison"):
+                        self.display_comparison()
+                else:
+                    with metrics.span("app.display_sidebar"):
+                        self.display_sidebar()
+                    with metrics.span("app.display_additional_info"):
+                        self.display_additional_info()
+                    with metrics.span("app.display_graph"):
+                        self.display_graph()
+
+        finally:
+            metrics.stop_trace()
+
+        # Crossover alerts of every pair, if enabled
+        if self.config.get("alerts", {}).get("enabled"):
+            self.display_alerts()
+
+        # Timings of this rerun, if enabled
+        if self.config.get("metrics", {}).get("debug_panel"):
+            self.display_debug_panel(trace)
 
     def display_title(self):
         """
@@ -74,19 +108,19 @@ class CryptoAnalysisApp:
             asset_data = self.model.get_data(pair=self.selected_asset)
             asset_data = self.model.compute_indicators(pair=self.selected_asset)
 
-            # Display date selector
-            start_date, end_date = select_box_date(asset_data)
+            # Display date selector, bounded by the dates of the data
+            date_index = self.model.date_index(asset_data)
+            self.start_date, self.end_date = select_box_date(asset_data, bounds=date_index.bounds())
 
             # Filter data by selected date range
-            self.filtered_data = asset_data[
-                asset_data["date"].between(pd.to_datetime(start_date), pd.to_datetime(end_date))
-            ]
+            self.filtered_data = self.model.filter_dates(asset_data, self.start_date, self.end_date)
 
-            # Display data explorer
+            # Display data explorer, with the indicators of config.yml computed when selected
             with st.expander("💹​ " + self.config["text"]["data_expander"]):
+                indicator_columns = self.model.indicator_columns()
                 showData = st.multiselect(
                     "Filter: ",
-                    self.filtered_data.columns,
+                    list(self.filtered_data.columns) + indicator_columns,
                     default=[
                         "date",
                         "open",
@@ -99,7 +133,15 @@ class CryptoAnalysisApp:
                         "Sell_Signal",
                     ],
                 )
-                st.dataframe(self.filtered_data[showData], use_container_width=True)
+                requested = [column for column in showData if column in indicator_columns]
+                explorer_data = self.filtered_data
+                if requested:
+                    explorer_data = self.model.filter_dates(
+                        self.model.compute_indicators(pair=self.selected_asset, columns=requested),
+                        self.start_date,
+                        self.end_date,
+                    )
+                st.dataframe(explorer_data[showData], use_container_width=True)
 
         # Raise exception if there is a problem with the selected asset
         except Exception as e:
@@ -147,7 +189,99 @@ class CryptoAnalysisApp:
         Display the interactive graph element.
         """
         try:
-            fig = self.model.graph_pair(self.filtered_data, self.selected_asset)
-            st.plotly_chart(fig)
+            # Figure shared by every session showing the same chart, passed as it is
+            figure = self.model.get_figure(
+                pair=self.selected_asset, start_date=self.start_date, end_date=self.end_date
+            )
+            with metrics.span("app.plotly_chart"):
+                st.plotly_chart(figure)
         except Exception as e:
             raise CryptoAnalysisException(e, "GRAPH BUILD")
+
+    def select_mode(self):
+        """
+        Display the mode selector: one asset, or many assets compared.
+        """
+        self.mode = st.sidebar.radio(self.config["text"]["mode_radio"], [SINGLE_MODE, COMPARE_MODE], horizontal=True)
+        return self.mode
+
+    def display_comparison_sidebar(self):
+        """
+        Display the selection of the assets to compare and of the date range. Their data is
+        fetched concurrently and compared over the selected range.
+        """
+        compare_config = self.config.get("compare", {})
+
+        try:
+            # Display assets selection, up to the maximum number of pairs
+            ticker_options = self.model.get_crypto_pairs()
+            self.selected_assets = st.sidebar.multiselect(
+                self.config["text"]["compare_multiselect"],
+                ticker_options,
+                default=[pair for pair in compare_config.get("pairs", []) if pair in ticker_options],
+                max_selections=compare_config.get("max_pairs", 50),
+            )
+            if len(self.selected_assets) < 2:
+                raise ValueError("At least two assets are needed")
+
+            # Aligned data of every asset, and date selector bounded by its dates
+            panel = self.model.compute_indicators_batch(self.selected_assets)
+            dates = pd.to_datetime(panel.dates)
+            start_date, end_date = select_box_date(None, bounds=(dates[0], dates[-1]))
+
+            # Compare over the selected date range
+            self.comparison = self.model.compare_pairs(self.selected_assets, start_date=start_date, end_date=end_date)
+
+        # Raise exception if there is a problem with the selected assets
+        except Exception as e:
+            st.warning(self.config["text"]["asset_warning"], icon="⚠️")
+            raise CryptoAnalysisException(e, "COMPARISON BUILD")
+
+    def display_comparison(self):
+        """
+        Display the normalized prices, the correlation heatmap and the %K ranking of the
+        compared assets.
+        """
+        try:
+            overlay, heatmap, ranking = self.model.graph_comparison(self.comparison)
+            with metrics.span("app.plotly_chart"):
+                st.plotly_chart(overlay)
+
+                left, right = st.columns(2, gap="medium")
+                with left:
+                    st.plotly_chart(heatmap, use_container_width=True)
+                with right:
+                    st.plotly_chart(ranking, use_container_width=True)
+
+        except Exception as e:
+            raise CryptoAnalysisException(e, "COMPARISON GRAPH BUILD")
+
+    def display_alerts(self):
+        """
+        Display the latest Buy/Sell alerts of the alert engine, newest first.
+        """
+        with st.sidebar.expander(f"🔔 {self.config['text']['alerts_expander']}"):
+            alerts = self.model.get_alerts()
+            if alerts:
+                st.dataframe(pd.DataFrame(alerts), use_container_width=True, hide_index=True)
+            else:
+                st.caption("No alerts yet")
+
+    def display_debug_panel(self, trace):
+        """
+        Display the timings of every stage of the last rerun, the data cache counters and the
+        latency of the Kraken endpoints.
+        """
+        with st.sidebar.expander("⏱️ Debug"):
+            # Spans of this rerun in start order, nested spans indented
+            trace = sorted(trace, key=lambda record: record["start"])
+            timings = pd.DataFrame(
+                {
+                    "stage": ["· " * record["depth"] + record["span"] for record in trace],
+                    "ms": [record["seconds"] * 1000 for record in trace],
+                }
+            )
+            st.dataframe(timings, use_container_width=True, hide_index=True)
+
+            # Cache and HTTP metrics
+            st.json({"cache": self.model.data_cache.stats(), "http": self.model.get_http_metrics()})
@@ -0,0 +1,296 @@
+import time
+import random
+import argparse
+import threading
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
+from crypto_analysis.store import OHLC_DTYPE, parse_candles
+from crypto_analysis.transport import RETRY_ERRORS
+from crypto_analysis.exception import CryptoAnalysisException
+
+
+class RateLimiter:
+    """
+    Token bucket modelled on the Kraken API call counter, shared by every worker.
+    Each call adds its cost to the counter, the counter decays at a constant rate and calls
+    wait while the counter would go over its maximum.
+    """
+
+    def __init__(self, max_counter=15, decay=0.33, clock=time.monotonic, sleep=time.sleep):
+        self.max_counter = max_counter
+        self.decay = decay
+        self.clock = clock
+        self.sleep = sleep
+
+        self.counter = 0.0
+        self.updated_at = clock()
+        self.lock = threading.Lock()
+
+    def refill(self):
+        # Decay the counter since the last update
+        now = self.clock()
+        self.counter = max(0.0, self.counter - (now - self.updated_at) * self.decay)
+        self.updated_at = now
+
+    def acquire(self, cost=1):
+        """
+        This method waits until a call of the given cost fits in the counter, and counts it.
+        """
+        while True:
+            with self.lock:
+                self.refill()
+                if self.counter + cost <= self.max_counter:
+                    self.counter += cost
+                    return
+
+                wait = (self.counter + cost - self.max_counter) / self.decay
+
+            self.sleep(wait)
+
+    def penalize(self):
+        """
+        This method fills the counter after a rate limit error, so every worker slows down.
+        """
+        with self.lock:
+            self.refill()
+            self.counter = self.max_counter
+
+
+def trades_to_candles(trades, interval):
+    """
+    This function aggregates trades (time, price, volume arrays sorted by time) into OHLC
+    candles of the given interval in minutes. Returns a candle record array.
+    """
+    times, prices, volumes = trades
+    if len(times) == 0:
+        return np.empty(0, dtype=OHLC_DTYPE)
+
+    # Candle of every trade, and first trade of every candle
+    buckets = (np.asarray(times) // (interval * 60)).astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(buckets)] - 1
+
+    candles = np.empty(len(starts), dtype=OHLC_DTYPE)
+    candles["time"] = buckets[starts] * interval * 60
+    candles["open"] = prices[starts]
+    candles["high"] = np.maximum.reduceat(prices, starts)
+    candles["low"] = np.minimum.reduceat(prices, starts)
+    candles["close"] = prices[ends]
+    candles["volume"] = np.add.reduceat(volumes, starts)
+    candles["count"] = ends - starts + 1
+
+    # Volume weighted average price
+    with np.errstate(divide="ignore", invalid="ignore"):
+        candles["vwap"] = np.add.reduceat(prices * volumes, starts) / candles["volume"]
+
+    return candles
+
+
+class Backfill:
+    """
+    Parallel history download of many pairs into the local candle store.
+    Recent candles come from the OHLC endpoint, paged forward with its "since" cursor.
+    Older history, beyond the last 720 candles that OHLC serves, is rebuilt from the Trades
+    endpoint. All workers share one rate limiter and retry rate limit errors with jitter.
+    """
+
+    def __init__(self, connection, store, limiter=None, workers=4, retries=5, backoff=1.0, sleep=time.sleep):
+        self.connection = connection
+        self.store = store
+        self.limiter = RateLimiter(sleep=sleep) if limiter is None else limiter
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.sleep = sleep
+
+    @classmethod
+    def from_model(cls, model):
+        # Build with the model, which queries Kraken with a client per worker thread, its
+        # store and the "backfill" section of config.yml
+        backfill_config = model.config.get("backfill", {})
+        limiter = RateLimiter(
+            max_counter=backfill_config.get("max_counter", 15),
+            decay=backfill_config.get("decay", 0.33),
+        )
+
+        return cls(
+            model,
+            model.store,
+            limiter=limiter,
+            workers=backfill_config.get("workers", 4),
+            retries=backfill_config.get("retries", 5),
+        )
+
+    def query(self, method, params, cost=1):
+        """
+        This method calls a public endpoint within the rate limit, retrying rate limit and
+        connection errors with exponential backoff and random jitter.
+        """
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire(cost)
+
+            try:
+                response = self.connection.query_public(method, params)
+                if not response["error"]:
+                    return response["result"]
+
+                error = response["error"][0]
+                if error not in RETRY_ERRORS:
+                    raise CryptoAnalysisException(error, "API CALL")
+
+                # Everybody slows down after a rate limit error
+                self.limiter.penalize()
+
+            except CryptoAnalysisException as e:
+                raise e
+
+            except Exception as e:
+                error = e
+
+            if attempt == self.retries:
+                raise CryptoAnalysisException(error, "API CALL")
+
+            self.sleep(random.uniform(0, self.backoff * 2**attempt))
+
+    def backfill_ohlc(self, pair, interval):
+        """
+        This method pages forward through the OHLC endpoint from the stored cursor until the
+        newest candle, appending every page to the store. Returns the number of candles.
+        """
+        total = 0
+        cursor = self.store.get_cursor(pair, interval)
+
+        while True:
+            params = {"pair": pair, "interval": interval}
+            if cursor is not None:
+                params["since"] = cursor
+
+            result = self.query("OHLC", params)
+            asset = list(result.keys())[0]
+            candles = parse_candles(result[asset])
+            self.store.append(pair, interval, candles, last=result.get("last"))
+            total += len(candles)
+
+            # Stop when the cursor doesn't move anymore
+            if result.get("last") is None or result["last"] == cursor or len(candles) <= 1:
+                return total
+            cursor = result["last"]
+
+    def trade_pages(self, pair, since, until=None):
+        """
+        This method pages forward through the Trades endpoint from since (seconds), one request
+        at a time, and yields the (time, price, volume) arrays of every page. Stops at the
+        newest trade, or at the first trade at or after until (seconds) if given. Only one
+        page is held in memory.
+        """
+        cursor = str(int(since * 1e9))
+
+        while True:
+            result = self.query("Trades", {"pair": pair, "since": cursor}, cost=2)
+            asset = [key for key in result if key != "last"][0]
+            rows = result[asset]
+
+            # Trades of this page, as [time, price, volume]
+            page = np.array([[row[2], row[0], row[1]] for row in rows], dtype=np.float64).reshape(-1, 3)
+            if until is not None:
+                page = page[page[:, 0] < until]
+
+            if len(page) > 0:
+                yield tuple(np.ascontiguousarray(page[:, i]) for i in range(3))
+
+            # Stop at the newest trade or at until
+            if len(rows) == 0 or len(page) < len(rows) or result["last"] == cursor:
+                return
+            cursor = result["last"]
+
+    def backfill_trades(self, pair, interval, since, until=None):
+        """
+        This method pages forward through the Trades endpoint from since (seconds) until the
+        first stored candle (or until), aggregating trades into candles page by page. The
+        candles of every page are inserted in the store at once, so the stored history is
+        rewritten a single time. Returns the number of candles.
+        """
+        if until is None:
+            stored = self.store.read(pair, interval, mmap=True)
+            until = int(stored["time"][0]) if len(stored) > 0 else time.time()
+
+        pages = []
+        pending = (np.empty(0), np.empty(0), np.empty(0))
+
+        for page in self.trade_pages(pair, since, until):
+            # Trades of this page, added to the trades of the unfinished candle
+            trades = tuple(np.concatenate([pending[i], page[i]]) for i in range(3))
+
+            # The last candle may continue in the next page
+            keep = trades[0] // (interval * 60) == trades[0][-1] // (interval * 60)
+            pending = tuple(values[keep] for values in trades)
+            trades = tuple(values[~keep] for values in trades)
+
+            pages.append(trades_to_candles(trades, interval))
+
+        # Last candle, once every page is read
+        pages.append(trades_to_candles(pending, interval))
+
+        candles = np.concatenate(pages)
+        if len(candles) > 0:
+            self.store.insert(pair, interval, candles)
+
+        return len(candles)
+
+    def backfill_pair(self, pair, interval, since=None):
+        """
+        This method downloads the history of one pair: OHLC candles up to now, then trades
+        from since (if given) up to the first stored candle. Returns the number of stored candles.
+        """
+        self.backfill_ohlc(pair, interval)
+        if since is not None:
+            self.backfill_trades(pair, interval, since)
+
+        return len(self.store.read(pair, interval, mmap=True))
+
+    def run(self, pairs, interval, since=None):
+        """
+        This method backfills many pairs in parallel. Returns a dictionary with the number
+        of stored candles of each pair, or the error if its backfill failed.
+        """
+
+        def job(pair):
+            try:
+                return self.backfill_pair(pair, interval, since=since)
+            except Exception as e:
+                return CryptoAnalysisException(e, f"BACKFILL {pair}")
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return dict(zip(pairs, executor.map(job, pairs)))
+
+
+def main(argv=None):
+    """
+    Command line entry point: python -m crypto_analysis.backfill BTCUSD ETHUSD --interval 60
+    """
+    parser = argparse.ArgumentParser(description="Download the candle history of many pairs into the local store.")
+    parser.add_argument("pairs", nargs="+", help="Pairs to download, e.g. BTCUSD ETHUSD")
+    parser.add_argument("--interval", type=int, default=None, help="Candle interval in minutes (default: config)")
+    parser.add_argument("--since", default=None, help="Rebuild history from trades since this date, e.g. 2023-01-01")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel workers (default: config)")
+    args = parser.parse_args(argv)
+
+    # Imported here so the module can be used without the model
+    from crypto_analysis.model import CryptoAnalysisModel
+
+    model = CryptoAnalysisModel()
+    backfill = Backfill.from_model(model)
+    if args.workers is not None:
+        backfill.workers = args.workers
+
+    interval = model.config["data"]["interval"] if args.interval is None else args.interval
+    since = None if args.since is None else int(pd.Timestamp(args.since).timestamp())
+
+    for pair, result in backfill.run(args.pairs, interval, since=since).items():
+        print(f"{pair}: {result if isinstance(result, Exception) else f'{result} stored candles'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import os
+import itertools
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from crypto_analysis.indicators import rolling_window, shift
+from crypto_analysis.exception import CryptoAnalysisException
+
+
+# Performance figures of every backtest
+METRICS = ["total_return", "max_drawdown", "trades", "hit_rate", "sharpe", "exposure"]
+
+# Parameters of the grid search
+GRID_PARAMS = ["stochastic_window", "stochastic_nmean", "buy_threshold", "sell_threshold"]
+
+
+def periods_per_year(interval):
+    # Number of candles of the interval in minutes in a year, crypto markets never close
+    return 365 * 1440 / interval
+
+
+def signal_positions(buy, sell):
+    """
+    This function turns (time x strategy) buy and sell signal arrays into positions: long (1)
+    from a buy signal until the next sell signal, flat (0) otherwise.
+    """
+    buy = np.asarray(buy, dtype=bool)
+    sell = np.asarray(sell, dtype=bool)
+
+    # Row of the last signal of each strategy, -1 before the first one
+    rows = np.arange(len(buy)).reshape(-1, *([1] * (buy.ndim - 1)))
+    last_signal = np.maximum.accumulate(np.where(buy | sell, rows, -1), axis=0)
+
+    return np.where(last_signal >= 0, np.take_along_axis(buy, np.maximum(last_signal, 0), axis=0), False).astype(
+        np.float64
+    )
+
+
+def simulate(close, positions, fee=0.0026, slippage=0.0005):
+    """
+    This function returns the net return of every candle of (time x strategy) positions held
+    from the close of each candle to the close of the next one. Every change of position
+    pays the fee and the slippage, as a fraction of the traded value.
+    """
+    close = np.asarray(close, dtype=np.float64).reshape(len(close), *([1] * (positions.ndim - 1)))
+    returns = np.zeros(close.shape)
+    returns[1:] = close[1:] / close[:-1] - 1
+
+    held = np.zeros(positions.shape)
+    held[1:] = positions[:-1]
+    trades = np.abs(np.diff(positions, axis=0, prepend=0))
+
+    return held * returns - trades * (fee + slippage)
+
+
+def performance(net_returns, positions, periods=365):
+    """
+    This function computes the performance of (time x strategy) net returns and positions:
+    compounded total return, maximum drawdown (negative fraction), number of trades, share of
+    winning trades, annualized Sharpe ratio and share of time in the market. Returns a
+    dictionary of arrays with one value per strategy.
+    """
+    # Log equity curve
+    log_equity = np.cumsum(np.log1p(net_returns), axis=0)
+    equity = np.exp(log_equity)
+    drawdown = equity / np.maximum.accumulate(np.maximum(equity, 1), axis=0) - 1
+
+    # Trades start when the position opens and end when it closes, or at the last candle
+    previous = np.zeros(positions.shape)
+    previous[1:] = positions[:-1]
+    entries = (positions > 0) & (previous == 0)
+    exits = (positions == 0) & (previous > 0)
+    exits[-1] |= positions[-1] > 0
+
+    # Return of every trade, from the equity before its entry to its exit
+    rows = np.arange(len(positions)).reshape(-1, *([1] * (positions.ndim - 1)))
+    last_entry = np.maximum.accumulate(np.where(entries, rows, 0), axis=0)
+    equity_before = np.concatenate([np.zeros((1,) + log_equity.shape[1:]), log_equity[:-1]])
+    trade_returns = log_equity - np.take_along_axis(equity_before, last_entry, axis=0)
+
+    trades = exits.sum(axis=0)
+    wins = (exits & (trade_returns > 0)).sum(axis=0)
+
+    # Annualized Sharpe ratio of the candle returns
+    mean = net_returns.mean(axis=0)
+    std = net_returns.std(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        hit_rate = np.where(trades > 0, wins / trades, np.nan)
+        sharpe = np.where(std > 0, mean / std * np.sqrt(periods), np.nan)
+
+    return {
+        "total_return": np.expm1(log_equity[-1]),
+        "max_drawdown": drawdown.min(axis=0),
+        "trades": trades,
+        "hit_rate": hit_rate,
+        "sharpe": sharpe,
+        "exposure": positions.mean(axis=0),
+    }
+
+
+def backtest(data, fee=0.0026, slippage=0.0005, interval=1440):
+    """
+    This function backtests the signals of a compute_indicators result: long from every
+    Buy_Signal until the next Sell_Signal. Returns a dictionary with the performance figures
+    and the equity curve as a pandas.Series indexed by date.
+    """
+    try:
+        positions = signal_positions(data["Buy_Signal"].to_numpy(), data["Sell_Signal"].to_numpy())
+        net_returns = simulate(data["close"].to_numpy(), positions, fee, slippage)
+
+        result = {
+            name: value.item()
+            for name, value in performance(net_returns, positions, periods_per_year(interval)).items()
+        }
+        result["equity"] = pd.Series(np.exp(np.cumsum(np.log1p(net_returns))), index=data["date"], name="equity")
+
+        return result
+
+    except Exception as e:
+        raise CryptoAnalysisException(e, "BACKTEST")
+
+
+def parameter_grid(stochastic_windows, stochastic_nmeans, buy_thresholds=(20,), sell_thresholds=(80,)):
+    """
+    This function returns every combination of the given parameter values as a pandas.DataFrame.
+    """
+    combinations = itertools.product(stochastic_windows, stochastic_nmeans, buy_thresholds, sell_thresholds)
+    return pd.DataFrame(list(combinations), columns=GRID_PARAMS)
+
+
+def grid_backtest(raw_data, grid, window_size_ma=26, fee=0.0026, slippage=0.0005, interval=1440):
+    """
+    This function backtests every parameter combination of grid on the candles of one pair.
+    The oscillator is computed once per (stochastic_window, stochastic_nmean) and the signals
+    of all its thresholds at once, as a (time x combination) array. Every combination is
+    evaluated from the same first candle, where the largest windows are full. Returns the
+    grid with one column per performance figure.
+    """
+    close = raw_data["close"].to_numpy(dtype=np.float64)
+    high = raw_data["high"].to_numpy(dtype=np.float64)
+    low = raw_data["low"].to_numpy(dtype=np.float64)
+
+    # First candle with every window full
+    start = max(window_size_ma, grid["stochastic_window"].max() + grid["stochastic_nmean"].max() - 1) - 1
+
+    results = []
+    oscillators = {}
+    for (stochastic_window, stochastic_nmean), group in grid.groupby(["stochastic_window", "stochastic_nmean"]):
+        # %K of this window, shared by every %D window
+        if stochastic_window not in oscillators:
+            period_high = rolling_window(high, stochastic_window, np.max)
+            period_low = rolling_window(low, stochastic_window, np.min)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                oscillators[stochastic_window] = (close - period_low) / (period_high - period_low) * 100
+
+        # Oscillator and crossovers
+        pct_k = oscillators[stochastic_window]
+        pct_d = rolling_window(pct_k, stochastic_nmean, np.mean)
+        cross_up = (pct_k > pct_d) & (shift(pct_k) < shift(pct_d))
+        cross_down = (pct_k < pct_d) & (shift(pct_k) > shift(pct_d))
+
+        # Signals of every threshold, without previous candle at the first one
+        pct_k = pct_k[start:, None]
+        buy = cross_up[start:, None] & (pct_k < group["buy_threshold"].to_numpy()[None, :])
+        sell = cross_down[start:, None] & (pct_k > group["sell_threshold"].to_numpy()[None, :])
+        buy[0] = sell[0] = False
+
+        positions = signal_positions(buy, sell)
+        net_returns = simulate(close[start:], positions, fee, slippage)
+        metrics = performance(net_returns, positions, periods_per_year(interval))
+        results.append(group.assign(**metrics))
+
+    return pd.concat(results).sort_index()
+
+
+def grid_job(job):
+    # Backtest of one pair in a worker process
+    pair, raw_data, grid, kwargs = job
+    return grid_backtest(raw_data, grid, **kwargs).assign(pair=pair)
+
+
+def optimize(frames, grid, max_workers=None, **kwargs):
+    """
+    This function backtests every parameter combination of grid on the candles of many pairs
+    (dictionary of pair and raw data), one pair per task of a process pool. Returns one row per
+    pair and combination, sorted by Sharpe ratio. Keyword arguments go to grid_backtest.
+    """
+    try:
+        # Only the columns the backtest needs are sent to the workers
+        jobs = [(pair, frame[["close", "high", "low"]], grid, kwargs) for pair, frame in frames.items()]
+        max_workers = min(len(jobs), max_workers or os.cpu_count() or 1)
+
+        if max_workers <= 1:
+            results = list(map(grid_job, jobs))
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(grid_job, jobs))
+
+        results = pd.concat(results, ignore_index=True)
+        return results[["pair"] + GRID_PARAMS + METRICS].sort_values("sharpe", ascending=False, ignore_index=True)
+
+    except Exception as e:
+        raise CryptoAnalysisException(e, "OPTIMIZE")
@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+
+from crypto_analysis.store import PRICE_COLUMNS
+
+
+# Kinds of bars: a new bar every threshold trades, traded volume or traded value
+BAR_KINDS = ["tick", "volume", "dollar"]
+
+# Bars as records, dated at their first trade (seconds with decimals, as Kraken trades)
+BAR_DTYPE = np.dtype(
+    [
+        ("time", "f8"),
+        ("open", "f8"),
+        ("high", "f8"),
+        ("low", "f8"),
+        ("close", "f8"),
+        ("vwap", "f8"),
+        ("volume", "f8"),
+        ("count", "i8"),
+    ]
+)
+
+
+def bar_measure(kind, prices, volumes):
+    # Amount of every trade counted towards the bar threshold
+    if kind == "tick":
+        return np.ones(len(prices))
+    if kind == "volume":
+        return volumes
+    if kind == "dollar":
+        return prices * volumes
+
+    raise ValueError(f"Unknown bar kind {kind}, expected one of {BAR_KINDS}")
+
+
+class BarBuilder:
+    """
+    Tick, volume or dollar-value bars built from a stream of trades, page by page. A bar
+    closes on the trade that takes the running total of the measure (trades, volume or
+    traded value) to the next multiple of the threshold. Only the unfinished bar is kept
+    between pages, so memory doesn't grow with the number of trades, and the bars don't
+    depend on how the trades are split into pages.
+    """
+
+    def __init__(self, kind="tick", threshold=1000):
+        if kind not in BAR_KINDS:
+            raise ValueError(f"Unknown bar kind {kind}, expected one of {BAR_KINDS}")
+        if threshold <= 0:
+            raise ValueError("The bar threshold must be positive")
+
+        self.kind = kind
+        self.threshold = threshold
+
+        # Running total of the measure, and unfinished bar with its number and traded value
+        self.total = 0.0
+        self.partial = None
+        self.partial_number = None
+        self.partial_value = 0.0
+
+    def update(self, trades):
+        """
+        This method adds the trades of a page (time, price, volume arrays sorted by time) and
+        returns the bars they finish, as a record array.
+        """
+        times, prices, volumes = (np.asarray(values, dtype=np.float64) for values in trades)
+        if len(times) == 0:
+            return np.empty(0, dtype=BAR_DTYPE)
+
+        # Running total before and after every trade, added in the same order as in one pass
+        after = np.cumsum(np.r_[self.total, bar_measure(self.kind, prices, volumes)])
+        before, after = after[:-1], after[1:]
+        self.total = after[-1]
+
+        # Bar of every trade, and first and last trade of every bar
+        numbers = np.floor(before / self.threshold)
+        starts = np.flatnonzero(np.r_[True, numbers[1:] != numbers[:-1]])
+        ends = np.r_[starts[1:], len(times)] - 1
+
+        bars = np.empty(len(starts), dtype=BAR_DTYPE)
+        bars["time"] = times[starts]
+        bars["open"] = prices[starts]
+        bars["high"] = np.maximum.reduceat(prices, starts)
+        bars["low"] = np.minimum.reduceat(prices, starts)
+        bars["close"] = prices[ends]
+        bars["volume"] = np.add.reduceat(volumes, starts)
+        bars["count"] = ends - starts + 1
+        values = np.add.reduceat(prices * volumes, starts)
+
+        # The first bar continues the unfinished bar of the previous pages
+        if self.partial is not None and numbers[0] == self.partial_number:
+            for name in ["time", "open"]:
+                bars[name][0] = self.partial[name]
+            bars["high"][0] = max(bars["high"][0], self.partial["high"])
+            bars["low"][0] = min(bars["low"][0], self.partial["low"])
+            bars["volume"][0] += self.partial["volume"]
+            bars["count"][0] += self.partial["count"]
+            values[0] += self.partial_value
+
+        # Volume weighted average price, the close price of bars without volume
+        with np.errstate(divide="ignore", invalid="ignore"):
+            bars["vwap"] = np.where(bars["volume"] > 0, values / bars["volume"], bars["close"])
+
+        # The last bar is unfinished until a trade reaches the next threshold
+        if np.floor(after[-1] / self.threshold) > numbers[-1]:
+            self.partial = None
+            return bars
+
+        self.partial = bars[-1].copy()
+        self.partial_number = numbers[-1]
+        self.partial_value = values[-1]
+        return bars[:-1]
+
+    def flush(self):
+        """
+        This method returns the unfinished bar, like the running candle of the OHLC endpoint,
+        as a record array with zero or one bar.
+        """
+        if self.partial is None:
+            return np.empty(0, dtype=BAR_DTYPE)
+
+        return np.array([self.partial], dtype=BAR_DTYPE)
+
+
+def bars_to_frame(bars):
+    """
+    This function builds a pandas.DataFrame of bars with the columns of process_response, so
+    the indicators are computed on them as on candles.
+    """
+    data = pd.DataFrame({name: bars[name] for name in PRICE_COLUMNS})
+    data.insert(0, "date", pd.to_datetime(bars["time"], unit="s"))
+    data["count"] = bars["count"]
+
+    return data
+
+
+def build_bars(pages, kind="tick", threshold=1000, include_partial=True):
+    """
+    This function builds the bars of an iterable of trade pages (time, price, volume arrays),
+    e.g. Backfill.trade_pages. Yields the bars finished by every page as a record array, and
+    the unfinished bar at the end if include_partial. Pages are consumed one at a time.
+    """
+    builder = BarBuilder(kind, threshold)
+    for page in pages:
+        bars = builder.update(page)
+        if len(bars) > 0:
+            yield bars
+
+    if include_partial and builder.partial is not None:
+        yield builder.flush()
+
+
+def trade_bars(pages, kind="tick", threshold=1000, include_partial=True):
+    """
+    This function builds the bars of an iterable of trade pages and returns them as a
+    pandas.DataFrame with the columns of process_response.
+    """
+    chunks = list(build_bars(pages, kind, threshold, include_partial))
+    return bars_to_frame(np.concatenate(chunks) if chunks else np.empty(0, dtype=BAR_DTYPE))
@@ -0,0 +1,211 @@
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+
+def cache_key(kind, pair, interval, since=None, **kwargs):
+    """
+    This function builds the cache key of a model result. Every query parameter is part of
+    the key, so different intervals or periods of the same pair never share an entry.
+    """
+    return (kind, pair, interval, since, tuple(sorted(kwargs.items())))
+
+
+def size_of(value):
+    """
+    This function estimates the memory used by a cached value, in bytes.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(value.memory_usage(deep=True).sum())
+
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+
+    if isinstance(value, tuple):
+        return sum(size_of(item) for item in value)
+
+    return sys.getsizeof(value)
+
+
+class InFlightRequest:
+    """
+    Result holder of a cache value that is being computed by another thread.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class DataCache:
+    """
+    In-memory cache of model results with expiration time and least recently used eviction.
+    The cache is bounded both by number of entries and by memory, and keeps hit, miss,
+    expiration and eviction counters. It is thread-safe, so one instance can be shared by
+    every session of the dashboard.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=None, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.clock = clock
+
+        # key -> (value, expiration time, size in bytes)
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.lock = threading.RLock()
+
+        # key -> InFlightRequest of the values being computed
+        self.in_flight = {}
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return self.peek(key) is not None
+
+    def peek(self, key):
+        """
+        This method returns a cached value without updating counters or recency.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or (entry[1] is not None and entry[1] <= self.clock()):
+                return None
+
+            return entry[0]
+
+    def get(self, key, default=None):
+        """
+        This method returns a cached value, or the default if it is missing or expired.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+
+            # Missing entry
+            if entry is None:
+                self.misses += 1
+                return default
+
+            # Expired entry
+            value, expires_at, _ = entry
+            if expires_at is not None and expires_at <= self.clock():
+                self.remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            # Mark as most recently used
+            self.entries.move_to_end(key)
+            self.hits += 1
+
+            return value
+
+    def set(self, key, value, ttl=None):
+        """
+        This method stores a value for ttl seconds (forever if ttl is None) and evicts the
+        least recently used entries until the cache is within its limits.
+        """
+        with self.lock:
+            # Replace previous value
+            if key in self.entries:
+                self.remove(key)
+
+            expires_at = None if ttl is None else self.clock() + ttl
+            nbytes = size_of(value)
+            self.entries[key] = (value, expires_at, nbytes)
+            self.nbytes += nbytes
+
+            # Enforce size and memory budget, always keeping the newest entry
+            while len(self.entries) > 1 and (
+                len(self.entries) > self.max_entries or (self.max_bytes is not None and self.nbytes > self.max_bytes)
+            ):
+                oldest_key = next(iter(self.entries))
+                self.remove(oldest_key)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute, ttl=None):
+        """
+        This method returns a cached value, computing and storing it on a miss. Concurrent
+        misses of the same key wait for a single computation instead of repeating it.
+        """
+        with self.lock:
+            value = self.get(key)
+            if value is not None:
+                return value
+
+            # Join the computation already running for this key, or start a new one
+            request = self.in_flight.get(key)
+            is_owner = request is None
+            if is_owner:
+                request = self.in_flight[key] = InFlightRequest()
+            else:
+                self.coalesced += 1
+
+        # Wait for the owner thread result
+        if not is_owner:
+            request.done.wait()
+            if request.error is not None:
+                raise request.error
+            return request.value
+
+        try:
+            request.value = compute()
+            self.set(key, request.value, ttl=ttl)
+            return request.value
+
+        except Exception as e:
+            request.error = e
+            raise e
+
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+            request.done.set()
+
+    def remove(self, key):
+        # Drop an entry if it exists
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                self.nbytes -= entry[2]
+
+    def invalidate(self, pair=None, interval=None, kind=None):
+        """
+        This method drops every entry of a pair, interval and/or kind of result (see
+        cache_key), or the whole cache if no filter is given.
+        """
+        with self.lock:
+            for key in list(self.entries):
+                if (
+                    (pair is None or key[1] == pair)
+                    and (interval is None or key[2] == interval)
+                    and (kind is None or key[0] == kind)
+                ):
+                    self.remove(key)
+
+    def stats(self):
+        """
+        This method returns the cache counters as a dictionary.
+        """
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.nbytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+                "coalesced": self.coalesced,
+            }
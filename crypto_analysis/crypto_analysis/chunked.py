@@ -0,0 +1,187 @@
+import os
+import numpy as np
+import pandas as pd
+
+from crypto_analysis.store import OHLC_DTYPE, OHLC_COLUMNS
+from crypto_analysis.indicators import INDICATOR_COLUMNS, crossover_signals, stochastic_arrays
+
+
+# Signal columns, integers
+SIGNAL_COLUMNS = ["Buy_Signal", "Sell_Signal", "Overbought_Signal", "Oversold_Signal"]
+
+# Record layout of a candle with its indicators, as written by the chunked computation
+INDICATOR_DTYPE = np.dtype(
+    OHLC_DTYPE.descr + [(column, "i8" if column in SIGNAL_COLUMNS else "f8") for column in INDICATOR_COLUMNS]
+)
+
+
+def record_chunks(candles, chunk_size):
+    """
+    This function yields a candle record array (e.g. CandleStore.read with mmap=True) in
+    slices of chunk_size rows. Slices of a memory-mapped array are read from disk on use.
+    """
+    for start in range(0, len(candles), chunk_size):
+        yield candles[start : start + chunk_size]
+
+
+def parquet_chunks(path, chunk_size):
+    """
+    This function reads the candles of a Parquet file (columns of candles_to_frame) in batches
+    of chunk_size rows, yielded as candle record arrays.
+    """
+    # Imported here, Parquet is only needed for Parquet files
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path)
+    for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=OHLC_COLUMNS):
+        data = batch.to_pandas()
+        candles = np.empty(len(data), dtype=OHLC_DTYPE)
+        candles["time"] = data["date"].to_numpy().astype("datetime64[s]").astype(np.int64)
+        for name in OHLC_COLUMNS[1:]:
+            candles[name] = data[name].to_numpy()
+
+        yield candles
+
+
+class ChunkedStochastic:
+    """
+    Stochastic oscillator of one pair computed chunk by chunk. The last candles of every chunk
+    are carried over, as many as the rolling windows look back, so each row is computed from
+    exactly the same candles whatever the chunk size and the results are bit-identical across
+    chunk sizes, and to IndicatorPanel. The rolling means of pandas, used by compute_indicators,
+    sum in another order, so MA and %D may differ from it in the last bits. Memory is bounded
+    by the chunk size.
+    """
+
+    def __init__(self, window_size_ma, stochastic_window, stochastic_nmean):
+        self.window_size_ma = window_size_ma
+        self.stochastic_window = stochastic_window
+        self.stochastic_nmean = stochastic_nmean
+
+        # %D of a row needs stochastic_nmean rows of %K
+        self.lookback = max(window_size_ma - 1, stochastic_window + stochastic_nmean - 1)
+        self.tail = np.empty(0, dtype=OHLC_DTYPE)
+
+        # %K and %D of the last complete row, which may be older than the tail after a flat period
+        self.previous = (np.nan, np.nan)
+
+    def update(self, chunk):
+        """
+        This method computes the indicators of the next chunk of candles (record array sorted
+        by time, following the previous chunk). Returns the rows with every indicator
+        computed, as a record array of INDICATOR_DTYPE.
+        """
+        candles = np.concatenate([self.tail, np.asarray(chunk, dtype=OHLC_DTYPE)])
+        arrays = stochastic_arrays(
+            *(np.ascontiguousarray(candles[name]) for name in ["close", "high", "low"]),
+            self.window_size_ma,
+            self.stochastic_window,
+            self.stochastic_nmean,
+        )
+
+        # Rows of this chunk with every indicator computed
+        rows = np.arange(len(self.tail), len(candles))
+        rows = rows[~np.isnan(arrays["MA"][rows]) & ~np.isnan(arrays["pctD"][rows])]
+
+        output = np.empty(len(rows), dtype=INDICATOR_DTYPE)
+        for name in OHLC_DTYPE.names:
+            output[name] = candles[name][rows]
+        for column in INDICATOR_COLUMNS:
+            output[column] = arrays[column][rows]
+
+        # Signals from the previous complete row, none before the first one, as in compute_indicators
+        pct_k, pct_d = output["pctK"], output["pctD"]
+        prev_k = np.concatenate([[self.previous[0]], pct_k[:-1]])
+        prev_d = np.concatenate([[self.previous[1]], pct_d[:-1]])
+        for column, values in crossover_signals(pct_k, pct_d, prev_k, prev_d).items():
+            output[column] = values
+        if len(rows) > 0:
+            self.previous = (pct_k[-1], pct_d[-1])
+
+        self.tail = candles[max(0, len(candles) - self.lookback) :].copy()
+        return output
+
+
+class RecordWriter:
+    """
+    Rows appended chunk by chunk to a binary file of fixed-size records, which can be read
+    back memory-mapped with numpy.memmap and INDICATOR_DTYPE.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "wb")
+
+    def write(self, rows):
+        self.file.write(np.ascontiguousarray(rows).tobytes())
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    """
+    Rows appended chunk by chunk to a Parquet file, one row group per chunk, with the
+    columns of compute_indicators.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.writer = None
+
+    def write(self, rows):
+        # Imported here, Parquet is only needed for Parquet files
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(rows_to_frame(rows), preserve_index=False)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def rows_to_frame(rows):
+    """
+    This function builds the pandas.DataFrame of rows of INDICATOR_DTYPE, with the columns of
+    compute_indicators.
+    """
+    data = pd.DataFrame({name: rows[name] for name in INDICATOR_DTYPE.names[1:]})
+    data.insert(0, "date", pd.to_datetime(rows["time"], unit="s"))
+
+    return data
+
+
+def open_writer(path):
+    # Parquet or binary records, from the file extension
+    return ParquetWriter(path) if str(path).endswith(".parquet") else RecordWriter(path)
+
+
+def compute_chunked(chunks, path, window_size_ma, stochastic_window, stochastic_nmean):
+    """
+    This function computes the stochastic oscillator of an iterable of candle chunks (see
+    record_chunks and parquet_chunks) and writes the rows of every chunk to path as soon as
+    they are computed, as Parquet (.parquet) or binary records. Returns the number of rows.
+    """
+    state = ChunkedStochastic(window_size_ma, stochastic_window, stochastic_nmean)
+    writer = open_writer(path)
+    written = 0
+
+    try:
+        for chunk in chunks:
+            rows = state.update(chunk)
+            if len(rows) > 0:
+                writer.write(rows)
+                written += len(rows)
+    except Exception:
+        # No partial output is left behind
+        writer.close()
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+
+    writer.close()
+    return written
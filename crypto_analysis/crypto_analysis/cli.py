@@ -0,0 +1,132 @@
+"""
+Headless entry point: computes the indicators and signals of many pairs and writes them to
+a CSV, Parquet or JSON lines file, without Streamlit or Plotly.
+
+    crypto-signals BTCUSD ETHUSD --interval 60 --output signals.parquet
+    python -m crypto_analysis.cli --latest --output - --format jsonl
+"""
+
+import os
+import sys
+import argparse
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
+from crypto_analysis.pairs import DEFAULT_PAIRS
+from crypto_analysis.exception import CryptoAnalysisException
+
+
+# Output formats by file extension
+FORMATS = {".csv": "csv", ".parquet": "parquet", ".jsonl": "jsonl", ".json": "jsonl"}
+
+# config.yml of the project, next to the package, whatever the working directory
+DEFAULT_CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.yml")
+
+
+def compute_signals(model, pairs, interval=None, workers=4, latest=False):
+    """
+    This function computes the indicators of many pairs over a pool of workers. Returns the
+    rows of every pair (only the newest one with latest=True) in a single pandas.DataFrame with
+    a pair column, and a dictionary with the error of every pair that failed.
+    """
+
+    def job(pair):
+        try:
+            data = model.compute_indicators(pair=pair, interval=interval)
+            return data.tail(1) if latest else data
+        except Exception as e:
+            return CryptoAnalysisException(e, f"SIGNALS {pair}")
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = dict(zip(pairs, executor.map(job, pairs)))
+
+    errors = {pair: result for pair, result in results.items() if isinstance(result, Exception)}
+    frames = [result.assign(pair=pair) for pair, result in results.items() if pair not in errors]
+    if len(frames) == 0:
+        return pd.DataFrame(), errors
+
+    signals = pd.concat(frames, ignore_index=True)
+    return signals[["pair"] + [column for column in signals.columns if column != "pair"]], errors
+
+
+def output_format(path, file_format=None):
+    # Format given, or guessed from the file extension
+    if file_format is not None:
+        return file_format
+
+    for extension, name in FORMATS.items():
+        if str(path).endswith(extension):
+            return name
+
+    return "csv"
+
+
+def write_signals(signals, path, file_format=None):
+    """
+    This function writes the signals as CSV, Parquet or JSON lines. The path "-" writes to
+    the standard output (CSV and JSON lines only).
+    """
+    file_format = output_format(path, file_format)
+    target = sys.stdout if path == "-" else path
+
+    try:
+        if file_format == "csv":
+            signals.to_csv(target, index=False)
+        elif file_format == "jsonl":
+            signals.to_json(target, orient="records", lines=True, date_format="iso")
+            if path == "-":
+                sys.stdout.write("\n")
+        elif file_format == "parquet":
+            if path == "-":
+                raise ValueError("Parquet can't be written to the standard output")
+            signals.to_parquet(target, index=False)
+        else:
+            raise ValueError(f"Unknown format {file_format}")
+
+    except Exception as e:
+        raise CryptoAnalysisException(e, "WRITE SIGNALS")
+
+
+def main(argv=None):
+    """
+    Command line entry point, installed as crypto-signals.
+    """
+    parser = argparse.ArgumentParser(description="Compute the stochastic oscillator signals of many pairs.")
+    parser.add_argument(
+        "pairs", nargs="*", default=DEFAULT_PAIRS, help="Pairs, e.g. BTCUSD ETHUSD (default: main pairs)"
+    )
+    parser.add_argument("--interval", type=int, default=None, help="Candle interval in minutes (default: config)")
+    parser.add_argument("--output", default="signals.csv", help="Output file, or - for the standard output")
+    parser.add_argument("--format", default=None, choices=["csv", "parquet", "jsonl"], help="Default: from extension")
+    parser.add_argument("--workers", type=int, default=4, help="Pairs computed in parallel")
+    parser.add_argument("--latest", action="store_true", help="Only the newest row of every pair")
+    parser.add_argument("--config", default=DEFAULT_CONFIG, help="Path of config.yml (default: the project's)")
+    parser.add_argument("--metrics", default=None, help="Write timings and counters to this Prometheus text file")
+    args = parser.parse_args(argv)
+
+    # An installed package has no project config.yml, it has to be given
+    if not os.path.exists(args.config):
+        parser.error(f"config file {args.config} not found, give its path with --config")
+
+    # Imported here so --help doesn't load the model dependencies
+    from crypto_analysis.model import CryptoAnalysisModel
+
+    model = CryptoAnalysisModel(config_path=args.config)
+    signals, errors = compute_signals(model, args.pairs, args.interval, workers=args.workers, latest=args.latest)
+
+    for pair, error in errors.items():
+        print(f"Warning: {pair} skipped. {error}", file=sys.stderr)
+
+    if len(signals) > 0:
+        write_signals(signals, args.output, args.format)
+
+    # Metrics of this run, e.g. for the node exporter textfile collector
+    if args.metrics is not None:
+        with open(args.metrics, "w") as file:
+            file.write(model.export_metrics())
+
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
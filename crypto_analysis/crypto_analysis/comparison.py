@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+
+
+def first_valid(values):
+    """
+    This function returns the row of the first value of every column of a (time x pair)
+    array, or -1 for columns without values.
+    """
+    present = ~np.isnan(values)
+    return np.where(present.any(axis=0), present.argmax(axis=0), -1)
+
+
+def normalize_prices(close):
+    """
+    This function rebases the (time x pair) close prices to 100 at the first candle of every
+    pair, so pairs with very different prices can be overlaid.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    rows = first_valid(close)
+    base = np.where(rows >= 0, close[np.maximum(rows, 0), np.arange(close.shape[1])], np.nan)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return close / base * 100
+
+
+def log_returns(close):
+    """
+    This function returns the (time x pair) log returns of close prices, NaN at the first
+    candle and around missing candles.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    returns = np.full(close.shape, np.nan)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns[1:] = np.log(close[1:] / close[:-1])
+
+    return returns
+
+
+def correlation_matrix(returns, min_periods=2):
+    """
+    This function computes the (pair x pair) correlation matrix of (time x pair) returns,
+    each pair of columns over the rows where both have a value, as pandas.DataFrame.corr.
+    Every sum is a single matrix product over all the pairs at once.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    present = (~np.isnan(returns)).astype(np.float64)
+    values = np.where(present > 0, returns, 0.0)
+
+    # Shared rows, and sums of x, x^2 and x*y over them
+    n = present.T @ present
+    sum_x = values.T @ present
+    sum_xx = (values**2).T @ present
+    sum_xy = values.T @ values
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        covariance = n * sum_xy - sum_x * sum_x.T
+        variance = (n * sum_xx - sum_x**2) * (n * sum_xx - sum_x**2).T
+        correlation = covariance / np.sqrt(variance)
+
+    correlation[(n < min_periods) | ~(variance > 0)] = np.nan
+    return np.clip(correlation, -1, 1)
+
+
+def cross_sectional_rank(values):
+    """
+    This function ranks the pairs of every row of a (time x pair) array, from 0 (lowest) to
+    1 (highest). Ties get their average rank and missing values stay NaN.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    ranks = pd.DataFrame(values).rank(axis=1, method="average").to_numpy()
+    counts = (~np.isnan(values)).sum(axis=1, keepdims=True)
+
+    # A single pair of a row is the highest
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ranks = np.where(counts > 1, (ranks - 1) / (counts - 1), 1.0)
+
+    return np.where(np.isnan(values), np.nan, ranks)
+
+
+def rank_pairs(panel):
+    """
+    This function ranks the pairs of an IndicatorPanel by their last complete %K, lowest
+    (most oversold) first. Returns the latest row of every pair with a rank column.
+    """
+    latest = panel.latest()
+    if len(latest) == 0:
+        return latest
+
+    latest["rank"] = cross_sectional_rank(latest["pctK"].to_numpy()[None, :])[0]
+    return latest
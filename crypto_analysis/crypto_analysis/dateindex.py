@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+
+def to_datetime64(date):
+    # Date, datetime or string as the nanosecond timestamp of the date column
+    return pd.Timestamp(date).to_datetime64().astype("datetime64[ns]")
+
+
+class DateIndex:
+    """
+    Sorted timestamps of a pandas.DataFrame of candles, with its date bounds computed once.
+    Date ranges are found by binary search and returned as row slices of the frame, which
+    share its memory instead of scanning the whole column and copying the matching rows.
+    """
+
+    def __init__(self, data):
+        # Candles are sorted by time, so the date column can be searched directly
+        if not data["date"].is_monotonic_increasing:
+            raise ValueError("Dates are not sorted")
+
+        self.times = data["date"].to_numpy()
+        self.min = data["date"].iloc[0] if len(data) > 0 else None
+        self.max = data["date"].iloc[-1] if len(data) > 0 else None
+
+    def __len__(self):
+        return len(self.times)
+
+    def bounds(self):
+        """
+        This method returns the oldest and the newest date, or (None, None) if empty.
+        """
+        return self.min, self.max
+
+    def positions(self, start=None, end=None):
+        """
+        This method returns the first and the last + 1 row dated between start and end,
+        both included. Missing bounds are open.
+        """
+        first = 0 if start is None else int(np.searchsorted(self.times, to_datetime64(start), side="left"))
+        last = len(self.times) if end is None else int(np.searchsorted(self.times, to_datetime64(end), side="right"))
+        return first, max(first, last)
+
+    def slice(self, data, start=None, end=None):
+        """
+        This method returns the rows of data, the frame of the index, dated between start and
+        end (both included), as a view sharing its memory.
+        """
+        first, last = self.positions(start, end)
+        return data.iloc[first:last]
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+# Signal columns whose rows are always kept in downsampled lines
+SIGNAL_COLUMNS = ["Buy_Signal", "Sell_Signal"]
+
+
+def bucket_starts(n, n_buckets):
+    """
+    This function splits n consecutive rows into at most n_buckets buckets of ceil(n / n_buckets)
+    rows each, only the last bucket may be shorter. Uniform buckets keep aggregated candles of
+    the same length. Returns the index of the first row of every bucket.
+    """
+    size = max(1, -(-n // max(1, n_buckets)))
+    return np.arange(0, n, size, dtype=np.int64)
+
+
+def aggregate_ohlc(data, n_buckets):
+    """
+    This function aggregates consecutive candles into at most n_buckets coarser candles of
+    the same number of candles (see bucket_starts): first open, highest high, lowest low,
+    last close and total volume. Other columns keep the value of the last candle, and signal
+    columns are set if any candle of the bucket has the signal. Returns a new
+    pandas.DataFrame dated at the first candle of each bucket.
+    """
+    if len(data) <= n_buckets:
+        return data
+
+    starts = bucket_starts(len(data), n_buckets)
+    ends = np.r_[starts[1:], len(data)] - 1
+
+    # Last value of every bucket by default
+    aggregated = data.iloc[ends].reset_index(drop=True)
+    aggregated["date"] = data["date"].to_numpy()[starts]
+    aggregated["open"] = data["open"].to_numpy()[starts]
+    aggregated["high"] = np.maximum.reduceat(data["high"].to_numpy(), starts)
+    aggregated["low"] = np.minimum.reduceat(data["low"].to_numpy(), starts)
+    aggregated["volume"] = np.add.reduceat(data["volume"].to_numpy(), starts)
+
+    for column in SIGNAL_COLUMNS:
+        if column in data.columns:
+            aggregated[column] = np.maximum.reduceat(data[column].to_numpy(), starts)
+
+    return aggregated
+
+
+def lttb_indices(x, y, n_out):
+    """
+    This function selects n_out points of the line (x, y) with the Largest-Triangle-Three-Buckets
+    algorithm, which keeps the visual shape of the line. Returns the sorted indices of the points.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+
+    # Missing values don't drive the selection
+    y = pd.Series(y, dtype=np.float64).bfill().ffill().fillna(0).to_numpy()
+
+    # First and last points are always kept, the others are split into n_out - 2 buckets
+    edges = np.floor(np.linspace(1, n - 1, n_out - 1)).astype(np.int64)
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+
+        # Average point of the next bucket, or the last point
+        if i < n_out - 3:
+            next_x = x[end : edges[i + 2]].mean()
+            next_y = y[end : edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+
+        # Point making the largest triangle with the previous selected point
+        prev_x, prev_y = x[indices[i]], y[indices[i]]
+        area = np.abs((prev_x - next_x) * (y[start:end] - prev_y) - (prev_x - x[start:end]) * (next_y - prev_y))
+        indices[i + 1] = start + np.argmax(area)
+
+    return indices
+
+
+def downsample_lines(data, column, n_out):
+    """
+    This function downsamples the rows of data to about n_out points following the shape of
+    the given column, keeping every Buy/Sell signal row and the row before it, so crossovers
+    stay visible. Returns a new pandas.DataFrame.
+    """
+    if len(data) <= n_out:
+        return data
+
+    dates = data["date"].to_numpy().astype(np.int64)
+    indices = lttb_indices(dates, data[column].to_numpy(), n_out)
+
+    # Signal rows
+    signals = np.zeros(len(data), dtype=bool)
+    for name in SIGNAL_COLUMNS:
+        if name in data.columns:
+            signals |= data[name].to_numpy() != 0
+    signal_rows = np.flatnonzero(signals)
+    indices = np.union1d(indices, np.r_[signal_rows, signal_rows[signal_rows > 0] - 1])
+
+    return data.iloc[indices].reset_index(drop=True)
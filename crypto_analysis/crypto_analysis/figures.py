@@ -0,0 +1,67 @@
+import threading
+
+from crypto_analysis.pairs import DEFAULT_PAIRS
+from crypto_analysis.utils import default_dates
+
+
+class FigureWarmer:
+    """
+    Background thread that keeps the figure cache of the most visited pairs warm. Every
+    period it renders the default date range of each pair, which is only rebuilt when the
+    pair has new candles, so the first visitor after an update doesn't pay for the figure.
+    """
+
+    def __init__(self, model, pairs=None, interval=None, period=60):
+        self.model = model
+        self.pairs = list(DEFAULT_PAIRS if pairs is None else pairs)
+        self.interval = interval
+        self.period = period
+
+        self.rounds = 0
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def warm(self):
+        """
+        This method renders the figure of every pair over the dates the dashboard selects by
+        default, skipping the pairs that fail. Returns the number of figures in the cache.
+        """
+        warmed = 0
+        for pair in self.pairs:
+            if self.stopped.is_set():
+                break
+
+            try:
+                # Same rows as the default date range of the app
+                data = self.model.compute_indicators(pair=pair, interval=self.interval)
+                start_date, end_date = default_dates(self.model.date_index(data).bounds())
+                self.model.get_figure_json(
+                    pair=pair, interval=self.interval, start_date=start_date, end_date=end_date
+                )
+                warmed += 1
+            except Exception as e:
+                print(f"Warning: Figure of {pair} not warmed. {e}")
+
+        self.rounds += 1
+        return warmed
+
+    def run(self):
+        # Warm every period until stopped
+        while not self.stopped.is_set():
+            self.warm()
+            self.stopped.wait(self.period)
+
+    def start(self):
+        """
+        This method runs the warmer in a background thread.
+        """
+        if self.thread is not None and self.thread.is_alive():
+            return
+
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        # The warmer stops after the figure being rendered
+        self.stopped.set()
@@ -0,0 +1,332 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from crypto_analysis.dateindex import to_datetime64
+from crypto_analysis.exception import CryptoAnalysisException
+
+# Columns added by the stochastic oscillator
+INDICATOR_COLUMNS = [
+    "MA",
+    "period_high",
+    "period_low",
+    "pctK",
+    "pctD",
+    "Buy_Signal",
+    "Sell_Signal",
+    "Overbought_Signal",
+    "Oversold_Signal",
+]
+
+
+def stochastic_oscillator(raw_data, window_size_ma, stochastic_window, stochastic_nmean):
+    """
+    This function calculates the moving average, the stochastic oscillator and its signals
+    for the candles of one pair, returning a new pandas.DataFrame.
+    """
+    # Shallow copy, new columns don't modify the raw data
+    data = raw_data.copy(deep=False)
+
+    # Moving average
+    data["MA"] = data["close"].rolling(window=window_size_ma).mean()
+
+    # Period highest and lowest value
+    data["period_high"] = data["high"].rolling(stochastic_window).max()
+    data["period_low"] = data["low"].rolling(stochastic_window).min()
+
+    # Compute %K and %D
+    data["pctK"] = ((data["close"] - data["period_low"]) / (data["period_high"] - data["period_low"])) * 100
+    data["pctD"] = data["pctK"].rolling(stochastic_nmean).mean()
+
+    data = data.dropna().reset_index(drop=True)
+
+    # Define buy and sell signals based on %K and %D crossover
+    # %D line crosses below %K line with values below 20% -> But signal
+    data["Buy_Signal"] = (
+        (data["pctK"] > data["pctD"]) & (data["pctK"].shift(1) < data["pctD"].shift(1)) & (data["pctK"] < 20)
+    ).astype(int)
+
+    # %K line crosses below %D line with values above 80% -> Sell signal
+    data["Sell_Signal"] = (
+        (data["pctK"] < data["pctD"]) & (data["pctK"].shift(1) > data["pctD"].shift(1)) & (data["pctK"] > 80)
+    ).astype(int)
+
+    # Define overbought and oversold signals (Other methodology, not in use)
+    data["Overbought_Signal"] = np.where((data["pctK"] > 80) & (data["pctK"].shift(1) < 80), 1, 0)
+    data["Oversold_Signal"] = np.where((data["pctK"] < 20) & (data["pctK"].shift(1) > 20), 1, 0)
+
+    return data
+
+
+def data_version(raw_data):
+    """
+    This function returns a token of the candles of one pair that changes whenever they
+    change: number of rows, first and last date, and the values of the last candle, which
+    Kraken keeps updating until it closes.
+    """
+    if len(raw_data) == 0:
+        return (0,)
+
+    return (
+        len(raw_data),
+        raw_data["date"].iat[0],
+        raw_data["date"].iat[-1],
+        *(raw_data[column].iat[-1] for column in ["open", "high", "low", "close", "volume"]),
+    )
+
+
+def extends_version(version, raw_data):
+    """
+    This function checks whether raw_data holds the candles of version followed by newer
+    candles, with only the last candle of version possibly updated.
+    """
+    if version[0] == 0 or len(raw_data) < version[0]:
+        return False
+
+    return raw_data["date"].iat[0] == version[1] and raw_data["date"].iat[version[0] - 1] == version[2]
+
+
+def extend_stochastic_oscillator(data, raw_data, start_date, window_size_ma, stochastic_window, stochastic_nmean):
+    """
+    This function extends a stochastic_oscillator result with the candles of raw_data from
+    start_date onwards. Only those rows are computed, from the candles their rolling windows
+    and signals need, and the rows of data before start_date are kept as they are.
+    """
+    # Candles needed before start_date by the windows and the crossover signals
+    lookback = window_size_ma + stochastic_window + stochastic_nmean
+    position = int(raw_data["date"].searchsorted(start_date, side="left"))
+
+    tail = stochastic_oscillator(
+        raw_data.iloc[max(0, position - lookback) :], window_size_ma, stochastic_window, stochastic_nmean
+    )
+    tail = tail[tail["date"] >= start_date]
+
+    return pd.concat([data[data["date"] < start_date], tail], ignore_index=True)
+
+
+def rolling_window(values, window, reduce):
+    """
+    This function applies a reduction (np.mean, np.max, np.min...) over a sliding window along
+    the first axis of a 1-D or 2-D array. The window is a strided view, so no data is copied,
+    and the first window - 1 rows are NaN, like pandas rolling with a full window.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    output = np.full(values.shape, np.nan)
+
+    if window <= len(values):
+        output[window - 1 :] = reduce(sliding_window_view(values, window, axis=0), axis=-1)
+
+    return output
+
+
+def shift(values, periods=1):
+    """
+    This function shifts an array forward along the first axis, filling with NaN.
+    """
+    output = np.full(values.shape, np.nan)
+    output[periods:] = values[:-periods]
+
+    return output
+
+
+def previous_complete(values, complete):
+    """
+    This function returns, for every row of an array, the value of the last complete row
+    before it along the first axis, NaN if there is none. Rows dropped as incomplete are
+    skipped, like the shifted columns of stochastic_oscillator after dropna.
+    """
+    rows = np.arange(len(values)).reshape((-1,) + (1,) * (values.ndim - 1))
+    last = np.maximum.accumulate(np.where(complete, rows, -1), axis=0)
+
+    # Last complete row strictly before each row
+    before = np.full(last.shape, -1)
+    before[1:] = last[:-1]
+
+    output = np.take_along_axis(values, np.maximum(before, 0), axis=0)
+    output[before < 0] = np.nan
+    return output
+
+
+def crossover_signals(pct_k, pct_d, prev_k, prev_d):
+    """
+    This function calculates the signals of the stochastic oscillator from %K and %D and
+    their values on the previous row. Comparisons with NaN are False, as with the shifted
+    pandas columns.
+    """
+    return {
+        "Buy_Signal": ((pct_k > pct_d) & (prev_k < prev_d) & (pct_k < 20)).astype(np.int64),
+        "Sell_Signal": ((pct_k < pct_d) & (prev_k > prev_d) & (pct_k > 80)).astype(np.int64),
+        "Overbought_Signal": ((pct_k > 80) & (prev_k < 80)).astype(np.int64),
+        "Oversold_Signal": ((pct_k < 20) & (prev_k > 20)).astype(np.int64),
+    }
+
+
+def stochastic_arrays(close, high, low, window_size_ma, stochastic_window, stochastic_nmean):
+    """
+    This function calculates the stochastic oscillator columns over NumPy arrays.
+    Every pair is a column of the (time x pair) input arrays and all of them are computed
+    at once. Returns a dictionary of arrays with the same shape as the input.
+    """
+    output = {}
+
+    # Moving average
+    output["MA"] = rolling_window(close, window_size_ma, np.mean)
+
+    # Period highest and lowest value
+    output["period_high"] = rolling_window(high, stochastic_window, np.max)
+    output["period_low"] = rolling_window(low, stochastic_window, np.min)
+
+    # Compute %K and %D
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct_k = (close - output["period_low"]) / (output["period_high"] - output["period_low"]) * 100
+    output["pctK"] = pct_k
+    output["pctD"] = pct_d = rolling_window(pct_k, stochastic_nmean, np.mean)
+
+    # Previous values, from the previous row with every indicator computed of each pair. A flat
+    # period (same high and low) has no %K, and its rows are skipped as in stochastic_oscillator
+    complete = ~np.isnan(output["MA"]) & ~np.isnan(pct_d)
+    prev_k = previous_complete(pct_k, complete)
+    prev_d = previous_complete(pct_d, complete)
+
+    # Crossover signals
+    output.update(crossover_signals(pct_k, pct_d, prev_k, prev_d))
+
+    return output
+
+
+def align_frames(frames, columns=("open", "high", "low", "close", "vwap", "volume", "count")):
+    """
+    This function aligns the candles of many pairs on their shared timestamps.
+    Returns the sorted timestamps and a dictionary with one (time x pair) array per column,
+    with NaN where a pair has no candle. Columns missing in any frame are skipped.
+    """
+    pairs = list(frames)
+    columns = [column for column in columns if all(column in frame for frame in frames.values())]
+    dates = np.unique(np.concatenate([frame["date"].to_numpy(dtype="datetime64[ns]") for frame in frames.values()]))
+
+    # Fill every column of every pair at its position on the shared timestamps
+    arrays = {column: np.full((len(dates), len(pairs)), np.nan) for column in columns}
+    for j, pair in enumerate(pairs):
+        rows = np.searchsorted(dates, frames[pair]["date"].to_numpy(dtype="datetime64[ns]"))
+        for column in columns:
+            arrays[column][rows, j] = frames[pair][column].to_numpy(dtype=np.float64)
+
+    return dates, arrays
+
+
+class IndicatorPanel:
+    """
+    Candles and stochastic oscillator of many pairs, stored as (time x pair) arrays, NaN where
+    a pair has no candle. The indicators of every pair are computed over its own candles.
+    Per-pair DataFrames are only built when requested.
+    """
+
+    def __init__(self, dates, pairs, arrays):
+        self.dates = dates
+        self.pairs = list(pairs)
+        self.arrays = arrays
+        self.columns = {pair: j for j, pair in enumerate(self.pairs)}
+
+    @classmethod
+    def from_frames(cls, frames, window_size_ma, stochastic_window, stochastic_nmean):
+        """
+        This method aligns the candles of many pairs and computes all their indicators at once.
+        """
+        try:
+            dates, arrays = align_frames(frames)
+            arrays.update(
+                stochastic_arrays(
+                    arrays["close"],
+                    arrays["high"],
+                    arrays["low"],
+                    window_size_ma,
+                    stochastic_window,
+                    stochastic_nmean,
+                )
+            )
+
+            # A pair missing candles inside its range would have every window over the gap
+            # voided, so it is computed on its own candles and placed on the shared timestamps
+            present = ~np.isnan(arrays["close"])
+            for j in range(len(frames)):
+                rows = np.flatnonzero(present[:, j])
+                if len(rows) == 0 or rows[-1] - rows[0] + 1 == len(rows):
+                    continue
+
+                pair_arrays = stochastic_arrays(
+                    arrays["close"][rows, j],
+                    arrays["high"][rows, j],
+                    arrays["low"][rows, j],
+                    window_size_ma,
+                    stochastic_window,
+                    stochastic_nmean,
+                )
+                for column, values in pair_arrays.items():
+                    arrays[column][:, j] = 0 if values.dtype.kind == "i" else np.nan
+                    arrays[column][rows, j] = values
+
+            return cls(dates, frames, arrays)
+
+        except Exception as e:
+            raise CryptoAnalysisException(e, "COMPUTE INDICATORS BATCH")
+
+    def __len__(self):
+        return len(self.pairs)
+
+    @property
+    def nbytes(self):
+        # Memory of the timestamps and arrays, used by the data cache
+        return self.dates.nbytes + sum(values.nbytes for values in self.arrays.values())
+
+    def slice(self, start=None, end=None):
+        """
+        This method returns the panel of the rows dated between start and end, both included,
+        found by binary search on the sorted timestamps. Its arrays are views of this panel.
+        """
+        first = 0 if start is None else int(np.searchsorted(self.dates, to_datetime64(start), side="left"))
+        last = len(self.dates) if end is None else int(np.searchsorted(self.dates, to_datetime64(end), side="right"))
+        last = max(first, last)
+
+        return IndicatorPanel(
+            self.dates[first:last], self.pairs, {column: values[first:last] for column, values in self.arrays.items()}
+        )
+
+    def frame(self, pair):
+        """
+        This method builds the DataFrame of one pair, with the same columns and rows
+        (complete indicators only) as CryptoAnalysisModel.compute_indicators.
+        """
+        j = self.columns[pair]
+        data = pd.DataFrame({"date": self.dates})
+        for column, values in self.arrays.items():
+            data[column] = values[:, j]
+
+        # Keep rows with every indicator computed
+        valid = ~np.isnan(self.arrays["pctD"][:, j]) & ~np.isnan(self.arrays["MA"][:, j])
+        data = data[valid].reset_index(drop=True)
+        if "count" in data:
+            data["count"] = data["count"].astype(np.int64)
+
+        # Signals start on the row after the first complete row
+        if len(data) > 0:
+            data.loc[0, ["Buy_Signal", "Sell_Signal", "Overbought_Signal", "Oversold_Signal"]] = 0
+
+        return data
+
+    def latest(self):
+        """
+        This method returns the last complete indicators of every pair, one row per pair,
+        sorted by %K. Useful to rank pairs by their current stochastic state.
+        """
+        rows = []
+        for pair, j in self.columns.items():
+            valid = np.flatnonzero(~np.isnan(self.arrays["pctD"][:, j]) & ~np.isnan(self.arrays["MA"][:, j]))
+            if len(valid) == 0:
+                continue
+
+            i = valid[-1]
+            row = {"pair": pair, "date": self.dates[i]}
+            row.update({column: self.arrays[column][i, j] for column in ["close"] + INDICATOR_COLUMNS})
+            rows.append(row)
+
+        return pd.DataFrame(rows).sort_values("pctK").reset_index(drop=True)
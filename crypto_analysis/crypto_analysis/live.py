@@ -0,0 +1,126 @@
+import json
+import asyncio
+import threading
+import websockets
+
+from crypto_analysis.store import parse_candles
+from crypto_analysis.exception import CryptoAnalysisException
+
+# Kraken public websocket endpoint
+WS_URL = "wss://ws.kraken.com"
+
+
+class LiveOHLCFeed:
+    """
+    Asyncio service that subscribes to the Kraken websocket OHLC channels of a set of pairs
+    and merges every candle update into the model: the local store, the cached raw data
+    returned by get_data and the incremental indicators. Cached indicators of the pair stay
+    in the cache but no longer match the version of the merged candles, so the next
+    compute_indicators call extends them with the new candle.
+    """
+
+    def __init__(self, model, pairs, interval=None, url=WS_URL, reconnect_delay=5):
+        self.model = model
+        self.pairs = list(pairs)
+        self.interval = model.config["data"]["interval"] if interval is None else interval
+        self.url = url
+        self.reconnect_delay = reconnect_delay
+
+        # Websocket name (XBT/USD) -> dashboard pair name (BTCUSD)
+        self.ws_names = {self.ws_name(pair): pair for pair in self.pairs}
+
+        self.messages = 0
+        self.updates = 0
+        self.stopped = False
+        self.thread = None
+
+    def ws_name(self, pair):
+        # Websocket name from the AssetPairs metadata, the pair name as is if unknown
+        info = self.model.get_pair_info(pair)
+        return pair if info is None or not info.get("wsname") else info["wsname"]
+
+    def subscription(self):
+        """
+        This method returns the subscription message of the OHLC channels.
+        """
+        return {
+            "event": "subscribe",
+            "pair": list(self.ws_names),
+            "subscription": {"name": "ohlc", "interval": self.interval},
+        }
+
+    def handle_message(self, message):
+        """
+        This method processes a websocket message. OHLC updates are merged into the model,
+        events (heartbeats, status) are ignored. Returns the updated pair, if any.
+        """
+        self.messages += 1
+
+        # Events are dictionaries, channel updates are lists
+        if isinstance(message, dict):
+            if message.get("event") == "subscriptionStatus" and message.get("status") == "error":
+                print(f"Warning: Websocket subscription failed. {message.get('errorMessage')}")
+            return None
+
+        # [channelID, [time, etime, open, high, low, close, vwap, volume, count], "ohlc-1440", "XBT/USD"]
+        if len(message) < 4 or not str(message[-2]).startswith("ohlc"):
+            return None
+
+        pair = self.ws_names.get(message[-1], message[-1])
+        values = message[1]
+
+        # Candles are identified by their start time
+        start = int(float(values[1])) - self.interval * 60
+        candles = parse_candles([[start] + values[2:]])
+
+        self.model.merge_candles(candles, pair=pair, interval=self.interval)
+        self.updates += 1
+
+        return pair
+
+    async def listen(self, max_messages=None):
+        """
+        This method connects to the websocket, subscribes and processes messages until the
+        connection is closed, the feed is stopped or max_messages are received.
+        """
+        async with websockets.connect(self.url) as websocket:
+            await websocket.send(json.dumps(self.subscription()))
+
+            received = 0
+            async for message in websocket:
+                try:
+                    self.handle_message(json.loads(message))
+                except Exception as e:
+                    print(f"Warning: Ignoring websocket message. {CryptoAnalysisException(e, 'LIVE FEED')}")
+
+                received += 1
+                if self.stopped or (max_messages is not None and received >= max_messages):
+                    break
+
+    async def run(self):
+        """
+        This method keeps the feed listening, reconnecting after connection errors.
+        """
+        self.stopped = False
+        while not self.stopped:
+            try:
+                await self.listen()
+            except Exception as e:
+                print(f"Warning: Websocket connection lost. {e}")
+
+            if not self.stopped:
+                await asyncio.sleep(self.reconnect_delay)
+
+    def start(self):
+        """
+        This method runs the feed in a background thread with its own event loop.
+        """
+        if self.thread is not None and self.thread.is_alive():
+            return
+
+        self.thread = threading.Thread(target=asyncio.run, args=(self.run(),), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        # The feed stops after the next message
+        self.stopped = True
@@ -0,0 +1,189 @@
+import json
+import time
+import logging
+import functools
+import threading
+from contextlib import contextmanager
+
+# Upper bounds of the span duration histogram buckets, in seconds
+BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+# JSON lines of every span, when enabled
+logger = logging.getLogger("crypto_analysis.metrics")
+
+
+def format_labels(labels):
+    # Prometheus label set, e.g. {span="model.get_data"}
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels) + "}"
+
+
+class Metrics:
+    """
+    Process-wide timings and counters of the model and the dashboard. Spans time a block of
+    code into a duration histogram per name, and are also kept in the trace of the current
+    thread (one dashboard rerun) and optionally logged as JSON lines. Counters are labelled
+    totals, e.g. cache hits or payload bytes. Everything can be exported as Prometheus text.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.json_logs = False
+
+        # span name -> count, sum, max and cumulative bucket counts
+        self.spans = {}
+        # (counter name, labels) -> value
+        self.counters = {}
+        self.lock = threading.Lock()
+
+        # Trace and span depth of every thread
+        self.local = threading.local()
+
+    def observe(self, name, seconds):
+        """
+        This method adds a duration, in seconds, to the histogram of a span.
+        """
+        with self.lock:
+            span = self.spans.get(name)
+            if span is None:
+                span = self.spans[name] = {"count": 0, "sum": 0.0, "max": 0.0, "buckets": [0] * len(BUCKETS)}
+
+            span["count"] += 1
+            span["sum"] += seconds
+            span["max"] = max(span["max"], seconds)
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    span["buckets"][i] += 1
+
+    def increment(self, name, value=1, **labels):
+        """
+        This method adds value to a labelled counter.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """
+        This method times the block of code of a with statement as the span name.
+        """
+        depth = getattr(self.local, "depth", 0)
+        self.local.depth = depth + 1
+        error = None
+        start = self.clock()
+
+        try:
+            yield
+
+        except Exception as e:
+            error = e
+            raise e
+
+        finally:
+            seconds = self.clock() - start
+            self.local.depth = depth
+            self.observe(name, seconds)
+
+            record = {"span": name, "start": start, "seconds": seconds, "depth": depth, **attributes}
+            if error is not None:
+                record["error"] = str(error)
+
+            trace = getattr(self.local, "trace", None)
+            if trace is not None:
+                trace.append(record)
+
+            if self.json_logs:
+                logger.info(json.dumps(record, default=str))
+
+    def timed(self, name):
+        """
+        This method returns a decorator that runs a function inside a span.
+        """
+
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return function(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def start_trace(self):
+        """
+        This method starts collecting the spans of the current thread, e.g. for one dashboard
+        rerun. Returns the list the spans are added to, in the order they end (see "start"
+        for the order they begin).
+        """
+        self.local.trace = []
+        return self.local.trace
+
+    def stop_trace(self):
+        # Stop collecting the spans of the current thread
+        trace = getattr(self.local, "trace", None)
+        self.local.trace = None
+        return trace
+
+    def snapshot(self):
+        """
+        This method returns the spans and counters as a dictionary.
+        """
+        with self.lock:
+            return {
+                "spans": {
+                    name: {"count": span["count"], "sum": span["sum"], "max": span["max"]}
+                    for name, span in self.spans.items()
+                },
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in self.counters.items()
+                ],
+            }
+
+    def prometheus_text(self, gauges=None, prefix="crypto_analysis"):
+        """
+        This method renders the spans, the counters and the given gauges (dictionary of gauge
+        name and list of (labels dictionary, value)) in the Prometheus text format.
+        """
+        lines = []
+        with self.lock:
+            # Span durations
+            lines.append(f"# TYPE {prefix}_span_seconds histogram")
+            for name, span in sorted(self.spans.items()):
+                for bound, count in zip(BUCKETS, span["buckets"]):
+                    lines.append(
+                        f"{prefix}_span_seconds_bucket{format_labels([('span', name), ('le', bound)])} {count}"
+                    )
+                lines.append(
+                    f"{prefix}_span_seconds_bucket{format_labels([('span', name), ('le', '+Inf')])} {span['count']}"
+                )
+                lines.append(f"{prefix}_span_seconds_sum{format_labels([('span', name)])} {span['sum']}")
+                lines.append(f"{prefix}_span_seconds_count{format_labels([('span', name)])} {span['count']}")
+
+            # Counters
+            for counter in sorted({name for name, _ in self.counters}):
+                lines.append(f"# TYPE {prefix}_{counter}_total counter")
+                for (name, labels), value in sorted(self.counters.items()):
+                    if name == counter:
+                        lines.append(f"{prefix}_{name}_total{format_labels(labels)} {value}")
+
+        # Gauges
+        for name, samples in sorted((gauges or {}).items()):
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            for labels, value in samples:
+                lines.append(f"{prefix}_{name}{format_labels(sorted(labels.items()))} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        # Drop every span and counter
+        with self.lock:
+            self.spans = {}
+            self.counters = {}
+
+
+# Metrics shared by every model and session of the process
+metrics = Metrics()
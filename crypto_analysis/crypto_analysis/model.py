@@ -1,24 +1,114 @@
-import yaml
-import requests
-import krakenex
 import numpy as np
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+import pandas as pd
 
 from crypto_analysis.utils import process_response
+from crypto_analysis.store import CandleStore, OHLC_COLUMNS, parse_candles, candles_to_frame, frame_to_candles
+from crypto_analysis.cache import DataCache, cache_key
+from crypto_analysis.pairs import PairCatalogue
+from crypto_analysis.transport import get_shared_transport
+from crypto_analysis.metrics import metrics
+from crypto_analysis.indicators import (
+    IndicatorPanel,
+    stochastic_oscillator,
+    data_version,
+    extends_version,
+    extend_stochastic_oscillator,
+)
+from crypto_analysis.streaming import StochasticState
+from crypto_analysis.registry import compile_indicators
+from crypto_analysis.pyramid import PYRAMID_INTERVALS, CandlePyramid
+from crypto_analysis.downsample import aggregate_ohlc, downsample_lines, bucket_starts
+from crypto_analysis.dateindex import DateIndex
+from crypto_analysis.bars import trade_bars
+from crypto_analysis.comparison import normalize_prices, log_returns, correlation_matrix, rank_pairs
 from crypto_analysis.exception import CryptoAnalysisException
 
 import os
+import json
+import time
+import weakref
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Model instance shared by every session and rerun of the dashboard
+shared_model = {}
+shared_model_lock = threading.Lock()
+
+
+def get_shared_model():
+    """
+    This function returns the process-wide model, creating it on first use. Streamlit runs
+    every session and rerun in the same process, so the config, the API connection and
+    the data cache are created only once.
+    """
+    with shared_model_lock:
+        if "model" not in shared_model:
+            shared_model["model"] = CryptoAnalysisModel()
+
+            # Live candles, if enabled
+            if shared_model["model"].config.get("live", {}).get("enabled"):
+                shared_model["model"].start_live_feed()
+
+            # Figures of the default pairs rendered in the background, if enabled
+            if shared_model["model"].config.get("figures", {}).get("warm"):
+                shared_model["model"].start_figure_warmer()
+
+            # Crossover alerts at every candle close, if enabled
+            if shared_model["model"].config.get("alerts", {}).get("enabled"):
+                shared_model["model"].start_alert_engine()
+
+        return shared_model["model"]
 
 
 class CryptoAnalysisModel:
-    def __init__(self):
-        self.get_conection()
-        self.load_config()
-        self.data_cache = {}
+    def __init__(self, config_path="config.yml"):
+        self._connection = None
+        self.thread_connections = threading.local()
+        self.load_config(config_path)
+        self.load_metrics()
+        self.load_transport()
+        self.load_store()
+        self.load_cache()
+        self.load_pair_catalogue()
+        self.load_pyramids()
+        self.load_indicator_graph()
+        self.indicator_states = {}
+        self.indicator_states_lock = threading.Lock()
+        self.date_indexes = {}
+        self.date_indexes_lock = threading.Lock()
 
     def get_conection(self):
-        self.connection = krakenex.API()
+        # Imported here, the API client is only needed once data is requested
+        import krakenex
+
+        # Client of the calling thread, requests go through the shared pooled session
+        connection = krakenex.API()
+        connection.session = self.transport.session
+        self.thread_connections.connection = connection
+
+        return connection
+
+    @property
+    def connection(self):
+        # Kraken API client of the calling thread, created on first use. krakenex keeps the
+        # last HTTP response on the client, so threads querying at once never share one
+        if self._connection is not None:
+            return self._connection
+
+        connection = getattr(self.thread_connections, "connection", None)
+        return connection if connection is not None else self.get_conection()
+
+    @connection.setter
+    def connection(self, connection):
+        # Client used by every thread instead, e.g. an offline stand-in
+        self._connection = connection
+
+    def query_public(self, method, data=None):
+        """
+        This method calls a public Kraken endpoint with the client of the calling thread.
+        """
+        return self.connection.query_public(method, data)
 
     def load_config(self, config_path="config.yml"):
         # Get config path
@@ -26,11 +116,68 @@ class CryptoAnalysisModel:
             config_path = os.path.join("crypto_analysis", config_path)
 
         # Read and parse config file
+        import yaml
+
         with open(config_path, "r") as file:
             config = yaml.load(file, Loader=yaml.FullLoader)
 
         self.config = config
 
+    def load_metrics(self):
+        # Spans are also logged as JSON lines if enabled
+        metrics.json_logs = self.config.get("metrics", {}).get("json_logs", False)
+
+    def load_transport(self):
+        # HTTP session, timeouts, retries and latency metrics shared by every Kraken call
+        self.transport = get_shared_transport(self.config)
+
+    def load_store(self):
+        # Local candle store. Disabled if no path is configured
+        store_path = self.config.get("store", {}).get("path")
+        self.store = CandleStore(store_path) if store_path else None
+
+    def load_cache(self):
+        # In-memory cache of raw data and indicators
+        cache_config = self.config.get("cache", {})
+        max_mb = cache_config.get("max_mb")
+        self.data_cache = DataCache(
+            max_entries=cache_config.get("max_entries", 256),
+            max_bytes=None if max_mb is None else max_mb * 1024**2,
+        )
+
+    def load_pair_catalogue(self):
+        # Supported pairs, cached in memory and on disk
+        pairs_config = self.config.get("pairs", {})
+        self.pair_catalogue = PairCatalogue(
+            path=pairs_config.get("path"),
+            ttl=pairs_config.get("ttl", 3600),
+            timeout=pairs_config.get("timeout", 10),
+            session=self.transport,
+        )
+
+    def load_pyramids(self):
+        # Multi-resolution candles of every pair, built from the finest interval
+        pyramid_config = self.config.get("pyramid", {})
+        self.pyramid_intervals = sorted(pyramid_config.get("intervals", PYRAMID_INTERVALS))
+        self.pyramid_enabled = pyramid_config.get("enabled", False)
+        self.pyramids = {}
+        self.pyramids_lock = threading.Lock()
+
+    def load_indicator_graph(self):
+        # Indicators declared in config.yml, besides the stochastic oscillator
+        self.indicator_graph = compile_indicators(self.config.get("indicators", []))
+
+    def cache_ttl(self, interval):
+        """
+        This method returns how long cached data of an interval stays valid, in seconds.
+        Data can't be older than one candle, and never older than the configured maximum.
+        """
+        max_ttl = self.config.get("cache", {}).get("max_ttl")
+        ttl = interval * 60
+
+        return ttl if max_ttl is None else min(ttl, max_ttl)
+
+    @metrics.timed("model.get_data")
     def get_data(self, pair="BTCUSD", interval=None, **kwargs):
         """
         This function allows us to obtain the historical asset data.
@@ -43,133 +190,846 @@ class CryptoAnalysisModel:
             interval = self.config["data"]["interval"]
 
         try:
-            # Get data from cache
-            data = self.data_cache.get(pair, {}).get("raw", "NO_DATA")
+            # Get data from cache, or from the source if not found.
+            # Concurrent requests of the same data wait for a single fetch
+            data = self.data_cache.get_or_compute(
+                cache_key("raw", pair, interval, **kwargs),
+                lambda: self.fetch_data(pair, interval, **kwargs),
+                ttl=self.cache_ttl(interval),
+            )
 
-            # Obtain data if asset not found in cache
-            if isinstance(data, str):
-                # Set API request parameters
-                params = {
-                    "pair": pair,
-                    "interval": interval,
-                    **kwargs,
-                }
+            return data
 
-                # Get response from API
-                response = self.connection.query_public("OHLC", params)
+        except Exception as e:
+            raise CryptoAnalysisException(e, "GET DATA")
 
-                # Response error raise
-                if response["error"]:
-                    raise CryptoAnalysisException(response["error"][0], "API CALL")
+    @metrics.timed("model.fetch_data")
+    def fetch_data(self, pair, interval, **kwargs):
+        """
+        This method obtains the historical asset data from the local store, or from the
+        API if there is no store.
+        """
+        # Aggregate coarser intervals from the finest candles, if they go back far enough
+        if self.pyramid_enabled and interval in self.pyramid_intervals[1:]:
+            data = self.get_pyramid_data(pair, interval, **kwargs)
+            if data is not None:
+                return data
 
-                # Process response
-                data = process_response(response)
+        # Read from the local store, fetching only the new candles
+        if self.store is not None:
+            return self.get_stored_data(pair, interval, **kwargs)
 
-                # Save data in cache memory
-                self.data_cache[pair] = {"raw": data}
+        # Set API request parameters
+        params = {
+            "pair": pair,
+            "interval": interval,
+            **kwargs,
+        }
 
-            return data
+        # Get response from API and process it
+        return process_response(self.query_ohlc(params))
+
+    @metrics.timed("model.query_ohlc")
+    def query_ohlc(self, params):
+        """
+        This method requests OHLC candles from the Kraken API and returns the raw response.
+        """
+        # Get response from API, waiting and retrying while Kraken is busy. The transport
+        # counts the size of every HTTP response it receives
+        response = self.transport.query(lambda: self.connection.query_public("OHLC", params))
+
+        # Response error raise
+        if response["error"]:
+            raise CryptoAnalysisException(response["error"][0], "API CALL")
+
+        return response
+
+    def get_http_metrics(self):
+        """
+        This method returns the latency metrics of every Kraken endpoint called so far.
+        """
+        return self.transport.metrics.snapshot()
+
+    def metric_gauges(self):
+        """
+        This method returns the data cache counters and the HTTP latency of every endpoint as
+        Prometheus gauges (name and list of labels and value).
+        """
+        gauges = {f"cache_{name}": [({}, value)] for name, value in self.data_cache.stats().items()}
+
+        for name in ["requests", "errors", "mean", "max", "p50", "p95", "p99"]:
+            gauges[f"http_{name}"] = [
+                ({"endpoint": endpoint}, endpoint_metrics[name])
+                for endpoint, endpoint_metrics in self.get_http_metrics().items()
+            ]
+
+        return gauges
+
+    def export_metrics(self, format="prometheus"):
+        """
+        This method exports the spans, counters, cache and HTTP metrics as Prometheus text,
+        or as a JSON document with format="json".
+        """
+        if format == "json":
+            return json.dumps(
+                {**metrics.snapshot(), "cache": self.data_cache.stats(), "http": self.get_http_metrics()}, default=str
+            )
+
+        return metrics.prometheus_text(gauges=self.metric_gauges())
+
+    @metrics.timed("model.get_stored_data")
+    def get_stored_data(self, pair, interval, **kwargs):
+        """
+        This method reads the candles of a pair from the local store. Only the candles after
+        the stored Kraken cursor are requested from the API and appended to the store; if the
+        request fails, the stored candles are served as they are.
+        """
+        # Set API request parameters, starting from the stored cursor if there is one
+        cursor = self.store.get_cursor(pair, interval)
+        params = {
+            "pair": pair,
+            "interval": interval,
+            **kwargs,
+        }
+        if cursor is not None:
+            params["since"] = cursor
+
+        try:
+            # Get new candles and append them to the store
+            response = self.query_ohlc(params)
+            asset = list(response["result"].keys())[0]
+            candles = parse_candles(response["result"][asset])
+            self.store.append(pair, interval, candles, last=response["result"].get("last"))
 
         except Exception as e:
-            raise CryptoAnalysisException(e, "GET DATA")
+            # Without stored candles there is nothing to serve
+            if cursor is None:
+                raise e
+            print(f"Warning: Serving stored data for {pair}. {e}")
+
+        # Read stored candles, keeping only the requested period
+        candles = self.store.read(pair, interval)
+        if kwargs.get("since") is not None:
+            candles = candles[candles["time"] > int(kwargs["since"])]
+
+        if len(candles) == 0:
+            raise CryptoAnalysisException("Empty response data", "PROCESS RESPONSE")
+
+        return candles_to_frame(candles)
+
+    def get_pyramid(self, pair="BTCUSD"):
+        """
+        This method returns the candle pyramid of a pair, brought up to date with the candles
+        of the finest interval (from the store and the API, see get_data).
+        """
+        with self.pyramids_lock:
+            pyramid = self.pyramids.get(pair)
+            if pyramid is None:
+                pyramid = self.pyramids[pair] = CandlePyramid(self.pyramid_intervals)
+
+        # Merge the finest candles from the newest one already in the pyramid
+        base_data = self.get_data(pair=pair, interval=pyramid.base_interval)
+        last_timestamp = pyramid.last_timestamp()
+        if last_timestamp is not None:
+            base_data = base_data[base_data["date"] >= pd.to_datetime(last_timestamp, unit="s")]
+        pyramid.update(frame_to_candles(base_data))
+
+        return pyramid
 
+    @metrics.timed("model.get_pyramid_data")
+    def get_pyramid_data(self, pair, interval, **kwargs):
+        """
+        This method returns the candles of a pair at a coarser interval, aggregated locally from
+        the finest candles instead of requested from the API. Returns None when the finest
+        candles don't cover the period a request of the interval would return (see
+        CandlePyramid.covers), e.g. daily candles from the last 720 minutes.
+        """
+        pyramid = self.get_pyramid(pair)
+        if not pyramid.covers(interval, since=kwargs.get("since")):
+            return None
+
+        candles = pyramid.level(interval, since=kwargs.get("since"))
+        if len(candles) == 0:
+            raise CryptoAnalysisException("Empty response data", "PROCESS RESPONSE")
+
+        return candles_to_frame(candles)
+
+    @metrics.timed("model.get_crypto_pairs")
     def get_crypto_pairs(self):
         """
         This method obtains a list of supported cryptocurrency pairs from the Kraken API.
+        The list is served from the pairs catalogue, which refreshes itself in the background.
         """
-        # Get the list of cryptography pairs from the Kraken API
-        url = "https://api.kraken.com/0/public/AssetPairs"
-        response = requests.get(url)
+        return self.pair_catalogue.get_pairs()
 
-        # Default and most common pairs
-        default_pairs = ["ETHUSD", "BTCUSD", "USDTUSD", "XRPUSD", "USDCUSD", "SOLUSD", "ADAUSD", "DOGEUSD", "TRXUSD"]
+    def get_pair_info(self, pair):
+        """
+        This method returns the Kraken AssetPairs metadata of a pair (altname, wsname, base,
+        quote, tick size...), or None if the pair is unknown.
+        """
+        return self.pair_catalogue.get_info(pair)
 
-        try:
-            # Get pairs as a list
-            pairs_data = response.json()
-            pairs = list(pairs_data["result"].keys())
+    def indicator_params(self, window_size_ma=None, stochastic_window=None, stochastic_nmean=None):
+        """
+        This method returns the stochastic oscillator parameters, taken from config.yml
+        unless given.
+        """
+        return {
+            "window_size_ma": self.config["data"]["window_size_ma"] if window_size_ma is None else window_size_ma,
+            "stochastic_window": (
+                self.config["model"]["stochastic_window"] if stochastic_window is None else stochastic_window
+            ),
+            "stochastic_nmean": (
+                self.config["model"]["stochastic_nmean"] if stochastic_nmean is None else stochastic_nmean
+            ),
+        }
+
+    def indicator_key(self, pair, interval, params, **kwargs):
+        # Cache key of the indicators of a pair with a parameter set
+        return cache_key("data", pair, interval, **params, **kwargs)
+
+    def indicator_columns(self):
+        """
+        This method returns the columns of the indicators declared in config.yml, which
+        compute_indicators adds on request.
+        """
+        return list(self.indicator_graph.columns)
+
+    def add_indicator_columns(self, data, raw_data, version, columns, pair, interval, **kwargs):
+        """
+        This method adds indicator columns of the graph to a compute_indicators result. Every
+        column is cached by version of the candles, and the missing ones are computed together,
+        so the nodes they share are computed once.
+        """
+        # Cached columns, computed over every candle
+        keys = {column: cache_key("indicator", pair, interval, column=column, **kwargs) for column in columns}
+        values = {}
+        for column, key in keys.items():
+            cached = self.data_cache.get(key)
+            if cached is not None and cached[0] == version:
+                values[column] = cached[1]
+
+        missing = [column for column in columns if column not in values]
+        metrics.increment("indicator_columns", len(columns) - len(missing), result="hit")
+        metrics.increment("indicator_columns", len(missing), result="miss")
+        if missing:
+            with metrics.span("model.indicator_graph", columns=len(missing)):
+                computed = self.indicator_graph.evaluate(raw_data, missing)
+            for column in missing:
+                self.data_cache.set(keys[column], (version, computed[column]))
+            values.update(computed)
 
-            # Show common pairs first
-            pairs = default_pairs + pairs
-            return pairs
+        # Rows of the result among the candles
+        positions = raw_data["date"].searchsorted(data["date"])
+        data = data.copy(deep=False)
+        for column in columns:
+            data[column] = values[column][positions]
 
-        except:
-            # Return default pairs if the request fails
-            print("Warning: Getting default pairs")
-            return default_pairs
+        return data
 
-    def compute_indicators(self, pair="BTCUSD", interval=None, **kwargs):
+    @metrics.timed("model.compute_indicators")
+    def compute_indicators(
+        self,
+        pair="BTCUSD",
+        interval=None,
+        window_size_ma=None,
+        stochastic_window=None,
+        stochastic_nmean=None,
+        columns=None,
+        **kwargs,
+    ):
         """
         This function allows us to calculate the stochastic Oscillator.
         The second argument refers to the time interval for the data
         in seconds; for example, to display daily data we need
         indicates how many seconds there are in a day.
+        Results are memoized by parameter set and version of the candles: unchanged candles
+        return the cached result, and new candles only extend it.
+        Columns of the indicators declared in config.yml (see indicator_columns) are only
+        added when requested in columns.
         """
         # Time interval. If None, get from config
         if interval is None:
             interval = self.config["data"]["interval"]
 
-        # Get data from cache
-        raw_data = self.data_cache.get(pair, {}).get("raw", "NO_DATA")
+        params = self.indicator_params(window_size_ma, stochastic_window, stochastic_nmean)
+
+        # Get data from cache, or from the API if not found
+        raw_data = self.get_data(pair=pair, interval=interval, **kwargs)
+
+        try:
+            # Result computed with the same candles and parameters
+            key = self.indicator_key(pair, interval, params, **kwargs)
+            version = data_version(raw_data)
+            cached = self.data_cache.get(key)
+            if cached is not None and cached[0] == version:
+                metrics.increment("indicator_results", result="hit")
+                data = cached[1]
 
-        # Obtain data if asset not found in cache
-        if isinstance(raw_data, str):
-            print(f"Warning. No existing raw data for {pair}")
-            raw_data = self.get_data(kwargs, pair=pair, interval=interval)
+            # Compute stochastic oscillator, only for the new candles if there is a previous result
+            else:
+                if cached is not None and extends_version(cached[0], raw_data):
+                    metrics.increment("indicator_results", result="extend")
+                    data = extend_stochastic_oscillator(cached[1], raw_data, cached[0][2], **params)
+                else:
+                    metrics.increment("indicator_results", result="miss")
+                    data = stochastic_oscillator(raw_data, **params)
 
-        data = raw_data.copy()
+                # Save data in cache memory. It can't go stale, entries are checked by version
+                self.data_cache.set(key, (version, data))
+
+            # Requested indicators of the graph
+            if columns:
+                data = self.add_indicator_columns(data, raw_data, version, columns, pair, interval, **kwargs)
+
+            return data
+
+        except Exception as e:
+            raise CryptoAnalysisException(e, "COMPUTE INDICATORS")
+
+    @metrics.timed("model.compute_indicators_chunked")
+    def compute_indicators_chunked(self, pair="BTCUSD", interval=None, path=None, source=None, chunk_rows=None):
+        """
+        This method computes the stochastic oscillator of a history that doesn't need to fit
+        in memory. The candles are read in chunks of chunk_rows, memory-mapped from the local
+        store or from a Parquet file (source), and the rows of every chunk are written to path
+        (Parquet or binary records of chunked.INDICATOR_DTYPE) as soon as they are computed.
+        The rows are bit-identical whatever the chunk size and equal to IndicatorPanel; %D
+        and MA may differ from compute_indicators in the last bits. Returns the path.
+        """
+        # Imported here, chunked computation is only needed for large histories
+        from crypto_analysis.chunked import record_chunks, parquet_chunks, compute_chunked
+
+        # Time interval and chunk size. If None, get from config
+        if interval is None:
+            interval = self.config["data"]["interval"]
+        if chunk_rows is None:
+            chunk_rows = self.config.get("chunked", {}).get("chunk_rows", 1_000_000)
 
         try:
-            # Compute stochastic oscillator
+            if source is None and self.store is None:
+                raise ValueError("Chunked computation needs a local store or a source file")
+
+            # Candles of the store, or of a Parquet file
+            if source is None:
+                chunks = record_chunks(self.store.read(pair, interval, mmap=True), chunk_rows)
+            else:
+                chunks = parquet_chunks(source, chunk_rows)
+
+            # In an indicators directory of the store by default, apart from the candle files
+            if path is None:
+                directory = self.config.get("chunked", {}).get("path")
+                if directory is None:
+                    directory = os.path.join("." if self.store is None else self.store.path, "indicators")
+                os.makedirs(directory, exist_ok=True)
+                path = os.path.join(directory, f"{pair}_{interval}.bin")
+
+            rows = compute_chunked(chunks, path, **self.indicator_params())
+            metrics.increment("chunked_rows", rows)
+
+            return path
+
+        except Exception as e:
+            raise CryptoAnalysisException(e, "COMPUTE INDICATORS CHUNKED")
 
-            # Moving average
-            data["MA"] = data["close"].rolling(window=self.config["data"]["window_size_ma"]).mean()
+    @metrics.timed("model.compute_indicators_batch")
+    def compute_indicators_batch(self, pairs, interval=None, max_workers=8, **kwargs):
+        """
+        This function calculates the stochastic oscillator of many pairs at once.
+        The data of the pairs is obtained concurrently, aligned on the shared timestamps
+        and computed as a single (time x pair) array. Returns an IndicatorPanel, from which
+        the DataFrame of each pair is built only when requested.
+        """
+        # Time interval. If None, get from config
+        if interval is None:
+            interval = self.config["data"]["interval"]
+
+        # Get data of every pair
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            frames = executor.map(lambda pair: self.get_data(pair=pair, interval=interval, **kwargs), pairs)
+            frames = dict(zip(pairs, frames))
+
+        # Panel computed with the same candles of every pair
+        key = cache_key("panel", ",".join(pairs), interval, **kwargs)
+        versions = tuple(data_version(frame) for frame in frames.values())
+        cached = self.data_cache.get(key)
+        if cached is not None and cached[0] == versions:
+            metrics.increment("indicator_results", result="hit")
+            return cached[1]
+
+        metrics.increment("indicator_results", result="miss")
+        panel = IndicatorPanel.from_frames(
+            frames,
+            self.config["data"]["window_size_ma"],
+            self.config["model"]["stochastic_window"],
+            self.config["model"]["stochastic_nmean"],
+        )
+        self.data_cache.set(key, (versions, panel))
 
-            # Period highest and lowest value
-            data["period_high"] = data["high"].rolling(self.config["model"]["stochastic_window"]).max()
-            data["period_low"] = data["low"].rolling(self.config["model"]["stochastic_window"]).min()
+        return panel
 
-            # Compute %K and %D
-            data["pctK"] = ((data["close"] - data["period_low"]) / (data["period_high"] - data["period_low"])) * 100
-            data["pctD"] = data["pctK"].rolling(self.config["model"]["stochastic_nmean"]).mean()
+    def compare_pairs(self, pairs, interval=None, start_date=None, end_date=None, window=None, **kwargs):
+        """
+        This method compares many pairs over a date range: close prices rebased to 100, the
+        correlation matrix of the log returns of the last window candles (config by default)
+        and the pairs ranked by their last %K. The pairs are fetched concurrently and aligned
+        on their shared timestamps, every figure is computed over the (time x pair) arrays.
+        Returns a dictionary with the panel of the range and the three results.
+        """
+        if window is None:
+            window = self.config.get("compare", {}).get("correlation_window", 90)
 
-            data = data.dropna().reset_index(drop=True)
+        panel = self.compute_indicators_batch(pairs, interval=interval, **kwargs).slice(start_date, end_date)
 
-            # Define buy and sell signals based on %K and %D crossover
-            # %D line crosses below %K line with values below 20% -> But signal
-            data["Buy_Signal"] = (
-                (data["pctK"] > data["pctD"]) & (data["pctK"].shift(1) < data["pctD"].shift(1)) & (data["pctK"] < 20)
-            ).astype(int)
+        try:
+            close = panel.arrays["close"]
+            return {
+                "panel": panel,
+                "normalized": normalize_prices(close),
+                "correlation": correlation_matrix(log_returns(close[-(window + 1) :])),
+                "ranking": rank_pairs(panel),
+            }
 
-            # %K line crosses below %D line with values above 80% -> Sell signal
-            data["Sell_Signal"] = (
-                (data["pctK"] < data["pctD"]) & (data["pctK"].shift(1) > data["pctD"].shift(1)) & (data["pctK"] > 80)
-            ).astype(int)
+        except Exception as e:
+            raise CryptoAnalysisException(e, "COMPARE PAIRS")
 
-            # Define overbought and oversold signals (Other methodology, not in use)
-            data["Overbought_Signal"] = np.where((data["pctK"] > 80) & (data["pctK"].shift(1) < 80), 1, 0)
-            data["Oversold_Signal"] = np.where((data["pctK"] < 20) & (data["pctK"].shift(1) > 20), 1, 0)
+    @metrics.timed("model.get_bars")
+    def get_bars(self, pair="BTCUSD", kind=None, threshold=None, since=None, until=None):
+        """
+        This method builds tick, volume or dollar-value bars of a pair from its trades since
+        since (seconds, by default the last "bars" days of config.yml), paged through the
+        Trades endpoint with the backfill rate limiter. Pages are turned into bars as they
+        arrive, so trades are never all in memory. Returns a pandas.DataFrame with the
+        columns of process_response.
+        """
+        bars_config = self.config.get("bars", {})
+        if kind is None:
+            kind = bars_config.get("kind", "tick")
+        if threshold is None:
+            threshold = bars_config.get("thresholds", {}).get(kind, 1000)
 
-            # Save data in cache memory
-            self.data_cache[pair]["data"] = data
+        # Default start on the hour, so reruns within the hour share the cached bars
+        if since is None:
+            since = int(time.time()) // 3600 * 3600 - bars_config.get("days", 1) * 86400
 
+        # Get data from cache
+        key = cache_key("bars", pair, kind, since=since, threshold=threshold, until=until)
+        data = self.data_cache.get(key)
+        if data is not None:
             return data
 
+        # Imported here, trades are only needed for bars
+        from crypto_analysis.backfill import Backfill
+
+        try:
+            pages = Backfill.from_model(self).trade_pages(pair, since, until)
+            data = trade_bars(pages, kind, threshold)
+
         except Exception as e:
-            raise CryptoAnalysisException(e, "COMPUTE INDICATORS")
+            raise CryptoAnalysisException(e, "GET BARS")
+
+        # Bars up to now get new trades, bars of a closed period don't change
+        self.data_cache.set(key, data, ttl=self.config.get("cache", {}).get("max_ttl") if until is None else None)
+
+        return data
+
+    def compute_bar_indicators(
+        self,
+        pair="BTCUSD",
+        kind=None,
+        threshold=None,
+        since=None,
+        until=None,
+        window_size_ma=None,
+        stochastic_window=None,
+        stochastic_nmean=None,
+    ):
+        """
+        This method calculates the stochastic oscillator and its signals on the bars of a
+        pair (see get_bars) instead of time candles. The result has the columns of
+        compute_indicators.
+        """
+        bars = self.get_bars(pair=pair, kind=kind, threshold=threshold, since=since, until=until)
+
+        params = self.indicator_params(window_size_ma, stochastic_window, stochastic_nmean)
+
+        try:
+            return stochastic_oscillator(bars, **params)
+
+        except Exception as e:
+            raise CryptoAnalysisException(e, "COMPUTE BAR INDICATORS")
+
+    def backtest(self, pair="BTCUSD", interval=None, **kwargs):
+        """
+        This method backtests the buy and sell signals of a pair, with the fee and slippage of
+        the "backtest" section of config.yml. Keyword arguments go to compute_indicators.
+        """
+        # Time interval. If None, get from config
+        if interval is None:
+            interval = self.config["data"]["interval"]
 
+        # Imported here, only needed for backtests
+        from crypto_analysis.backtest import backtest
+
+        backtest_config = self.config.get("backtest", {})
+        return backtest(
+            self.compute_indicators(pair=pair, interval=interval, **kwargs),
+            fee=backtest_config.get("fee", 0.0026),
+            slippage=backtest_config.get("slippage", 0.0005),
+            interval=interval,
+        )
+
+    def optimize_parameters(self, pairs, interval=None, grid=None, max_workers=None, **kwargs):
+        """
+        This method backtests a grid of oscillator parameters and thresholds on many pairs, over
+        a process pool. The grid of the "backtest" section of config.yml is used by default.
+        Returns one row per pair and parameter combination, the best Sharpe ratio first.
+        """
+        # Time interval. If None, get from config
+        if interval is None:
+            interval = self.config["data"]["interval"]
+
+        # Imported here, only needed for backtests
+        from crypto_analysis.backtest import optimize, parameter_grid
+
+        backtest_config = self.config.get("backtest", {})
+        if grid is None:
+            grid_config = backtest_config.get("grid", {"stochastic_windows": [14], "stochastic_nmeans": [3]})
+            grid = parameter_grid(**grid_config)
+
+        # Get data of every pair
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            frames = executor.map(lambda pair: self.get_data(pair=pair, interval=interval, **kwargs), pairs)
+            frames = dict(zip(pairs, frames))
+
+        return optimize(
+            frames,
+            grid,
+            max_workers=max_workers,
+            window_size_ma=self.config["data"]["window_size_ma"],
+            fee=backtest_config.get("fee", 0.0026),
+            slippage=backtest_config.get("slippage", 0.0005),
+            interval=interval,
+        )
+
+    def date_index(self, data):
+        """
+        This method returns the DateIndex of a frame of candles, built once per frame. Memoized
+        indicator results are the same frame on every rerun, so their bounds and timestamps are
+        not computed again. Indexes are dropped with their frame.
+        """
+        with self.date_indexes_lock:
+            entry = self.date_indexes.get(id(data))
+            if entry is not None and entry[0]() is data:
+                return entry[1]
+
+            index = DateIndex(data)
+            self.date_indexes[id(data)] = (weakref.ref(data), index)
+            weakref.finalize(data, self.drop_date_index, id(data))
+
+            return index
+
+    def drop_date_index(self, key):
+        # Frame collected, drop its index
+        with self.date_indexes_lock:
+            entry = self.date_indexes.get(key)
+            if entry is not None and entry[0]() is None:
+                del self.date_indexes[key]
+
+    def filter_dates(self, data, start_date=None, end_date=None):
+        """
+        This method returns the candles of data dated between start_date and end_date, both
+        included, found by binary search on the date index. The result is a view of data,
+        which must not be modified.
+        """
+        try:
+            return self.date_index(data).slice(data, start_date, end_date)
+
+        except Exception as e:
+            raise CryptoAnalysisException(e, "FILTER DATES")
+
+    def get_indicator_state(self, pair="BTCUSD", interval=None, **kwargs):
+        """
+        This method returns the incremental stochastic oscillator of a pair and interval.
+        It is created on first use and warmed up with the historical data of the pair.
+        """
+        # Time interval. If None, get from config
+        if interval is None:
+            interval = self.config["data"]["interval"]
+
+        with self.indicator_states_lock:
+            state = self.indicator_states.get((pair, interval))
+
+            if state is None:
+                # Feed the history, the last candle stays as the running candle
+                state = StochasticState.from_config(self.config)
+                for candle in self.get_data(pair=pair, interval=interval, **kwargs).to_dict("records"):
+                    state.update(candle)
+
+                self.indicator_states[(pair, interval)] = state
+
+        return state
+
+    def update_indicators(self, candle, pair="BTCUSD", interval=None):
+        """
+        This method updates the stochastic oscillator of a pair with a new or updated candle
+        in O(1), without recomputing the history. Returns the indicators row of the candle,
+        or None while there is not enough data.
+        """
+        try:
+            return self.get_indicator_state(pair=pair, interval=interval).update(candle)
+
+        except Exception as e:
+            raise CryptoAnalysisException(e, "UPDATE INDICATORS")
+
+    @metrics.timed("model.merge_candles")
+    def merge_candles(self, candles, pair="BTCUSD", interval=None):
+        """
+        This method merges new or updated candles (record array, see store.OHLC_DTYPE) of a pair
+        into the local store, the cached raw data and the incremental indicators. Memoized
+        indicators are extended with the new candles on their next computation.
+        """
+        # Time interval. If None, get from config
+        if interval is None:
+            interval = self.config["data"]["interval"]
+
+        try:
+            if len(candles) == 0:
+                return
+
+            # Save in the local store, once its history was downloaded. Otherwise the newest
+            # candle would become the cursor and the history would never be requested
+            if self.store is not None and self.store.has_cursor(pair, interval):
+                self.store.append(pair, interval, candles)
+
+            # Replace cached candles from the first new one onwards
+            key = cache_key("raw", pair, interval)
+            new_data = candles_to_frame(candles)
+            data = self.data_cache.peek(key)
+            if data is not None:
+                first = data["date"].searchsorted(new_data["date"].iloc[0])
+                data = pd.concat([data.iloc[:first], new_data], ignore_index=True)
+                self.data_cache.set(key, data, ttl=self.cache_ttl(interval))
+
+            # Coarser intervals aggregated from these candles are outdated too
+            pyramid = self.pyramids.get(pair)
+            if pyramid is not None and interval == pyramid.base_interval:
+                pyramid.update(candles)
+                for coarser in pyramid.intervals[1:]:
+                    self.data_cache.invalidate(pair=pair, interval=coarser, kind="raw")
+                    self.data_cache.invalidate(pair=pair, interval=coarser, kind="figure")
+
+            # Figures of the pair show outdated candles
+            self.data_cache.invalidate(pair=pair, interval=interval, kind="figure")
+
+            # Update incremental indicators in place. Candles older than the running one were
+            # already fed by another consumer (live feed or alert engine) merging the same pair
+            state = self.indicator_states.get((pair, interval))
+            if state is not None:
+                with state.lock:
+                    for date, candle in zip(new_data["date"], candles.tolist()):
+                        if state.candle is None or date >= state.candle["date"]:
+                            state.update(dict(zip(OHLC_COLUMNS, (date,) + candle[1:])))
+
+        except Exception as e:
+            raise CryptoAnalysisException(e, "MERGE CANDLES")
+
+    @metrics.timed("model.refresh_candles")
+    def refresh_candles(self, pair="BTCUSD", interval=None):
+        """
+        This method requests the candles of a pair from the running candle of its incremental
+        indicators onwards and merges them, closing the running candle once a newer one has
+        started. Returns the number of candles merged.
+        """
+        # Time interval. If None, get from config
+        if interval is None:
+            interval = self.config["data"]["interval"]
+
+        state = self.get_indicator_state(pair=pair, interval=interval)
+
+        try:
+            # since is exclusive, start one candle before the running one
+            params = {"pair": pair, "interval": interval}
+            running = None
+            if state.candle is not None:
+                running = int(pd.Timestamp(state.candle["date"]).timestamp())
+                params["since"] = running - interval * 60
+
+            response = self.query_ohlc(params)
+            asset = list(response["result"].keys())[0]
+            candles = parse_candles(response["result"][asset])
+
+            # Candles before the running one are already committed
+            if running is not None:
+                candles = candles[candles["time"] >= running]
+
+            self.merge_candles(candles, pair=pair, interval=interval)
+
+            return len(candles)
+
+        except Exception as e:
+            raise CryptoAnalysisException(e, "REFRESH CANDLES")
+
+    def start_live_feed(self, pairs=None, interval=None):
+        """
+        This method starts the websocket feed of live candles in a background thread.
+        By default the pairs of the "live" section of config.yml are subscribed.
+        """
+        # Imported here, the websocket client is only needed for live data
+        from crypto_analysis.live import LiveOHLCFeed
+
+        live_config = self.config.get("live", {})
+        if pairs is None:
+            pairs = live_config.get("pairs", [])
+
+        self.live_feed = LiveOHLCFeed(
+            self, pairs, interval=interval, url=live_config.get("url", "wss://ws.kraken.com")
+        )
+        self.live_feed.start()
+
+        return self.live_feed
+
+    def start_figure_warmer(self, pairs=None, interval=None):
+        """
+        This method starts rendering the figures of the default pairs in a background thread,
+        every warm_period seconds of the "figures" section of config.yml.
+        """
+        # Imported here, the warmer is only needed by the dashboard
+        from crypto_analysis.figures import FigureWarmer
+
+        figures_config = self.config.get("figures", {})
+        self.figure_warmer = FigureWarmer(
+            self,
+            pairs=figures_config.get("warm_pairs") if pairs is None else pairs,
+            interval=interval,
+            period=figures_config.get("warm_period", 60),
+        )
+        self.figure_warmer.start()
+
+        return self.figure_warmer
+
+    def start_alert_engine(self, pairs=None, interval=None):
+        """
+        This method starts checking the crossover signals of the pairs of the "alerts" section
+        of config.yml at every candle close, in a background thread.
+        """
+        # Imported here, alerts are only needed when enabled
+        from crypto_analysis.alerts import AlertEngine, sinks_from_config
+
+        alerts_config = self.config.get("alerts", {})
+        self.alert_engine = AlertEngine(
+            self,
+            pairs=alerts_config.get("pairs") if pairs is None else pairs,
+            interval=alerts_config.get("interval") if interval is None else interval,
+            sinks=sinks_from_config(alerts_config, self.transport),
+            signals=alerts_config.get("signals"),
+            delay=alerts_config.get("delay", 0.5),
+            fetch=alerts_config.get("fetch", True),
+            max_workers=alerts_config.get("workers", 16),
+        )
+        self.alert_engine.start()
+
+        return self.alert_engine
+
+    def get_alerts(self, n=None):
+        """
+        This method returns the last n alerts of the in-app feed, newest first, or an empty
+        list if the alert engine is not running or has no feed.
+        """
+        # Imported here, alerts are only needed when enabled
+        from crypto_analysis.alerts import FeedSink
+
+        engine = getattr(self, "alert_engine", None)
+        if engine is None:
+            return []
+
+        feeds = [sink for sink in engine.sinks if isinstance(sink, FeedSink)]
+        return feeds[0].recent(n) if feeds else []
+
+    @metrics.timed("model.get_figure_json")
+    def get_figure_json(self, pair="BTCUSD", interval=None, start_date=None, end_date=None):
+        """
+        This method returns the chart of a pair over a date range as Plotly figure JSON. The
+        JSON is cached by pair, interval, rows of the range and version of the indicators, so
+        every session showing the same chart shares one build and serialization. New candles
+        change the version, and merge_candles drops the figures of the pair.
+        """
+        return self.cached_figure(pair, interval, start_date, end_date)[0]
+
+    @metrics.timed("model.get_figure")
+    def get_figure(self, pair="BTCUSD", interval=None, start_date=None, end_date=None):
+        """
+        This method returns the chart of a pair over a date range as a Plotly figure, cached
+        with its JSON (see get_figure_json), so displaying it doesn't rebuild the figure. The
+        figure is shared by every session and must not be modified.
+        """
+        return self.cached_figure(pair, interval, start_date, end_date)[1]
+
+    def cached_figure(self, pair, interval, start_date, end_date):
+        # Figure JSON and figure of the chart, built on a miss
+        if interval is None:
+            interval = self.config["data"]["interval"]
+
+        data = self.compute_indicators(pair=pair, interval=interval)
+
+        try:
+            # Dates picking the same rows share the figure
+            first, last = self.date_index(data).positions(start_date, end_date)
+            key = cache_key("figure", pair, interval, rows=(first, last))
+            version = data_version(data)
+
+            cached = self.data_cache.get(key)
+            if cached is not None and cached[0] == version:
+                metrics.increment("figure_results", result="hit")
+                return cached[1:]
+
+            metrics.increment("figure_results", result="miss")
+            figure = self.graph_pair(data.iloc[first:last], pair)
+            figure_json = figure.to_json()
+            self.data_cache.set(key, (version, figure_json, figure))
+
+            return figure_json, figure
+
+        except Exception as e:
+            raise CryptoAnalysisException(e, "GET FIGURE")
+
+    def level_of_detail(self, data):
+        """
+        This method reduces the rows of data to the points the chart can show, with a budget
+        taken from the plot width: about one point or candle per pixel. Candles are only
+        aggregated, into buckets of the same number of candles, when there are more candles
+        than pixels. Returns the candles, the moving average line and the oscillator lines
+        (downsampled, keeping every Buy/Sell signal).
+        """
+        max_points = self.config["visual"]["w_plot"]
+
+        candles = aggregate_ohlc(data, max_points)
+        moving_average = downsample_lines(data, "MA", max_points)
+        oscillator = downsample_lines(data, "pctK", max_points)
+
+        return candles, moving_average, oscillator
+
+    @metrics.timed("model.graph_pair")
     def graph_pair(self, data, pair):
+        # Imported here, charts are only needed by the dashboard
+        import plotly.graph_objects as go
+        from plotly.subplots import make_subplots
+
+        # Points that fit in the chart
+        candles, moving_average, oscillator = self.level_of_detail(data)
+        metrics.increment("figure_points", 2 * len(candles) + len(moving_average) + 2 * len(oscillator))
+
         # Define multiple plots
         fig = make_subplots(rows=3, cols=1, shared_xaxes=True, vertical_spacing=0.1, row_heights=[2, 0.7, 0.5])
 
         # Asset behavior
         fig.add_trace(
             go.Candlestick(
-                x=data["date"],
-                open=data["open"],
-                high=data["high"],
-                low=data["low"],
-                close=data["close"],
+                x=candles["date"],
+                open=candles["open"],
+                high=candles["high"],
+                low=candles["low"],
+                close=candles["close"],
                 name="Candlestick",
             ),
             row=1,
@@ -179,18 +1039,32 @@ class CryptoAnalysisModel:
         # Moving average
         fig.add_trace(
             go.Scatter(
-                x=data["date"], y=data["MA"], mode="lines", name="MA", line=dict(color="black", dash="dashdot")
+                x=moving_average["date"],
+                y=moving_average["MA"],
+                mode="lines",
+                name="MA",
+                line=dict(color="black", dash="dashdot"),
             ),
             row=1,
             col=1,
         )
 
         # Sthochastic Oscilator
-        fig.add_trace(go.Scatter(x=data["date"], y=data["pctK"], name="%K", line=dict(color="#FF8300")), row=2, col=1)
-        fig.add_trace(go.Scatter(x=data["date"], y=data["pctD"], name="%D", line=dict(color="green")), row=2, col=1)
+        fig.add_trace(
+            go.Scatter(x=oscillator["date"], y=oscillator["pctK"], name="%K", line=dict(color="#FF8300")),
+            row=2,
+            col=1,
+        )
+        fig.add_trace(
+            go.Scatter(x=oscillator["date"], y=oscillator["pctD"], name="%D", line=dict(color="green")),
+            row=2,
+            col=1,
+        )
 
         # Volume
-        fig.add_trace(go.Bar(x=data["date"], y=data["volume"], name="Volume", marker_color="#875E5E"), row=3, col=1)
+        fig.add_trace(
+            go.Bar(x=candles["date"], y=candles["volume"], name="Volume", marker_color="#875E5E"), row=3, col=1
+        )
 
         # Plot oscilators thresholds, in 80% and 20%
         fig.add_hline(y=80, row=2, col=1, line=dict(color="red", dash="dot"))
@@ -235,3 +1109,71 @@ class CryptoAnalysisModel:
         )
 
         return fig
+
+    @metrics.timed("model.graph_comparison")
+    def graph_comparison(self, comparison):
+        """
+        This method builds the charts of a compare_pairs result: normalized price overlay,
+        correlation heatmap and %K ranking. Returns the three figures.
+        """
+        # Imported here, charts are only needed by the dashboard
+        import plotly.graph_objects as go
+
+        panel = comparison["panel"]
+        dates = panel.dates
+        w_plot = self.config["visual"]["w_plot"]
+
+        # Normalized prices at the last candle of as many buckets as fit in the chart, the same rows for every line
+        rows = slice(None)
+        if len(dates) > w_plot:
+            rows = np.r_[bucket_starts(len(dates), w_plot)[1:], len(dates)] - 1
+        normalized = comparison["normalized"][rows]
+        overlay = go.Figure(
+            [
+                go.Scattergl(x=dates[rows], y=normalized[:, j], mode="lines", name=pair)
+                for j, pair in enumerate(panel.pairs)
+            ]
+        )
+        metrics.increment("figure_points", normalized.size)
+
+        overlay.update_layout(
+            title_text=" 📈 Normalized price (first candle = 100)",
+            height=self.config["visual"]["h_plot"],
+            width=w_plot,
+            hovermode="x unified",
+        )
+
+        # Correlation of the returns of every pair of pairs
+        heatmap = go.Figure(
+            go.Heatmap(
+                z=comparison["correlation"],
+                x=panel.pairs,
+                y=panel.pairs,
+                zmin=-1,
+                zmax=1,
+                colorscale="RdBu",
+                reversescale=True,
+            )
+        )
+        heatmap.update_layout(
+            title_text=" 🔗 Correlation of returns",
+            height=self.config["visual"]["h_plot"],
+            width=w_plot,
+            yaxis=dict(autorange="reversed"),
+        )
+
+        # Pairs by last %K, oversold and overbought highlighted
+        ranking = comparison["ranking"]
+        colors = ["green" if k < 20 else "red" if k > 80 else "#FF8300" for k in ranking["pctK"]]
+        bars = go.Figure(go.Bar(x=ranking["pctK"], y=ranking["pair"], orientation="h", marker_color=colors))
+        bars.add_vline(x=80, line=dict(color="red", dash="dot"))
+        bars.add_vline(x=20, line=dict(color="green", dash="dot"))
+        bars.update_layout(
+            title_text=" 🏁 Ranking by %K",
+            height=max(300, 20 * len(ranking)),
+            width=w_plot,
+            xaxis=dict(title_text="%K", range=[0, 100]),
+            yaxis=dict(autorange="reversed"),
+        )
+
+        return overlay, heatmap, bars
@@ -0,0 +1,174 @@
+import os
+import json
+import time
+import threading
+
+# Kraken pair catalogue endpoint
+ASSET_PAIRS_URL = "https://api.kraken.com/0/public/AssetPairs"
+
+# Default and most common pairs
+DEFAULT_PAIRS = ["ETHUSD", "BTCUSD", "USDTUSD", "XRPUSD", "USDCUSD", "SOLUSD", "ADAUSD", "DOGEUSD", "TRXUSD"]
+
+# Kraken names of assets that the dashboard calls differently
+ASSET_ALIASES = {"BTC": "XBT", "DOGE": "XDG"}
+
+# AssetPairs fields kept for every pair
+PAIR_FIELDS = [
+    "altname",
+    "wsname",
+    "base",
+    "quote",
+    "tick_size",
+    "pair_decimals",
+    "lot_decimals",
+    "cost_decimals",
+    "ordermin",
+]
+
+
+class PairCatalogue:
+    """
+    Catalogue of the pairs supported by Kraken, with their AssetPairs metadata.
+    The catalogue is kept in memory and on disk. Once it is older than its time to live
+    it is refreshed in a background thread, while the last good catalogue keeps being served.
+    """
+
+    def __init__(self, path=None, ttl=3600, retry=60, timeout=10, url=ASSET_PAIRS_URL, session=None, clock=time.time):
+        self.path = path
+        self.ttl = ttl
+        self.retry = retry
+        self.timeout = timeout
+        self.url = url
+        self.session = session
+        self.clock = clock
+
+        # pair -> metadata
+        self.metadata = {}
+        self.next_refresh = 0
+        self.lock = threading.Lock()
+        self.refresh_thread = None
+
+        # Load last saved catalogue
+        self.load()
+
+    def load(self):
+        """
+        This method reads the catalogue saved on disk, if there is one.
+        """
+        if self.path is None or not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path, "r") as file:
+                saved = json.load(file)
+
+            self.metadata = saved["metadata"]
+            self.next_refresh = saved["updated_at"] + self.ttl
+
+        except Exception as e:
+            print(f"Warning: Ignoring saved pairs catalogue. {e}")
+
+    def save(self, updated_at):
+        """
+        This method writes the catalogue to disk.
+        """
+        if self.path is None:
+            return
+
+        # Write to a temporary file first so readers never see a partial file
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump({"updated_at": updated_at, "metadata": self.metadata}, file)
+        os.replace(tmp_path, self.path)
+
+    def refresh(self):
+        """
+        This method downloads the AssetPairs catalogue from Kraken and replaces the current one.
+        """
+        try:
+            # HTTP session, imported and created on first download
+            if self.session is None:
+                import requests
+
+                self.session = requests.Session()
+
+            response = self.session.get(self.url, timeout=self.timeout)
+            pairs_data = response.json()
+            if pairs_data.get("error"):
+                raise ValueError(pairs_data["error"][0])
+
+            # Keep the metadata of every pair
+            metadata = {
+                pair: {field: info.get(field) for field in PAIR_FIELDS} for pair, info in pairs_data["result"].items()
+            }
+
+            with self.lock:
+                self.metadata = metadata
+                self.next_refresh = self.clock() + self.ttl
+                self.save(self.clock())
+
+        except Exception as e:
+            # Retry later, the previous catalogue is still valid
+            with self.lock:
+                self.next_refresh = self.clock() + self.retry
+            raise e
+
+    def refresh_in_background(self):
+        """
+        This method starts a background refresh, unless one is already running.
+        """
+        with self.lock:
+            if self.refresh_thread is not None and self.refresh_thread.is_alive():
+                return
+
+            self.refresh_thread = threading.Thread(target=self.background_refresh, daemon=True)
+            self.refresh_thread.start()
+
+    def background_refresh(self):
+        # Refresh without raising, the last good catalogue is served meanwhile
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"Warning: Pairs catalogue refresh failed. {e}")
+
+    def is_stale(self):
+        return self.clock() >= self.next_refresh
+
+    def get_pairs(self):
+        """
+        This method returns the pair names, with the most common pairs first.
+        Only the first call without a saved catalogue waits for the API.
+        """
+        if not self.metadata:
+            # Nothing to serve yet, wait for the first download
+            if self.is_stale():
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"Warning: Getting default pairs. {e}")
+
+        elif self.is_stale():
+            self.refresh_in_background()
+
+        # Show common pairs first
+        return DEFAULT_PAIRS + list(self.metadata)
+
+    def get_info(self, pair):
+        """
+        This method returns the AssetPairs metadata of a pair, looked up by Kraken name,
+        alternative name or websocket name. Returns None if the pair is unknown.
+        """
+        if pair in self.metadata:
+            return self.metadata[pair]
+
+        # Kraken names of the assets (BTCUSD -> XBTUSD)
+        names = {pair}
+        for asset, kraken_asset in ASSET_ALIASES.items():
+            names.add(pair.replace(asset, kraken_asset))
+
+        for info in self.metadata.values():
+            if info["altname"] in names or info["wsname"] in names:
+                return info
+
+        return None
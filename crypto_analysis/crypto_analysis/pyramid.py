@@ -0,0 +1,163 @@
+import threading
+import numpy as np
+
+from crypto_analysis.store import OHLC_DTYPE
+
+
+# Intervals of the pyramid, in minutes, from the finest to the coarsest
+PYRAMID_INTERVALS = [1, 5, 15, 60, 240, 1440, 10080]
+
+# Candles of an interval returned by a single OHLC request
+OHLC_MAX_CANDLES = 720
+
+# Weekly candles start on Monday, the Unix epoch is a Thursday
+WEEK_OFFSET = 4 * 86400
+
+
+def interval_offset(interval):
+    # Shift of the bucket boundaries of an interval, in seconds
+    return WEEK_OFFSET if interval % 10080 == 0 else 0
+
+
+def bucket_start(timestamp, interval):
+    """
+    This function returns the start time (seconds) of the candle of the given interval in
+    minutes that contains timestamp.
+    """
+    offset = interval_offset(interval)
+    return (timestamp - offset) // (interval * 60) * (interval * 60) + offset
+
+
+def aggregate_candles(candles, interval):
+    """
+    This function aggregates finer candles (record array sorted by time) into candles of the
+    given interval in minutes: first open, highest high, lowest low, last close, total volume
+    and trade count, and volume weighted vwap. Returns a candle record array.
+    """
+    if len(candles) == 0:
+        return np.empty(0, dtype=OHLC_DTYPE)
+
+    # Candle of every row, and first row of every candle
+    times = bucket_start(candles["time"], interval)
+    starts = np.flatnonzero(np.r_[True, times[1:] != times[:-1]])
+    ends = np.r_[starts[1:], len(candles)] - 1
+
+    aggregated = np.empty(len(starts), dtype=OHLC_DTYPE)
+    aggregated["time"] = times[starts]
+    aggregated["open"] = candles["open"][starts]
+    aggregated["high"] = np.maximum.reduceat(candles["high"], starts)
+    aggregated["low"] = np.minimum.reduceat(candles["low"], starts)
+    aggregated["close"] = candles["close"][ends]
+    aggregated["volume"] = np.add.reduceat(candles["volume"], starts)
+    aggregated["count"] = np.add.reduceat(candles["count"], starts)
+
+    # Volume weighted average price, the close price of candles without volume
+    traded = np.add.reduceat(candles["vwap"] * candles["volume"], starts)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        aggregated["vwap"] = np.where(aggregated["volume"] > 0, traded / aggregated["volume"], aggregated["close"])
+
+    return aggregated
+
+
+class CandlePyramid:
+    """
+    Candles of one pair at several resolutions, all built from the finest interval. Every
+    level is aggregated from the level below it, and updates only rebuild the candles touched
+    by the new data, so switching interval is an array lookup instead of an API request.
+    """
+
+    def __init__(self, intervals=PYRAMID_INTERVALS):
+        self.intervals = sorted(intervals)
+        self.base_interval = self.intervals[0]
+
+        # Every level must be made of whole candles of the level below
+        for finer, coarser in zip(self.intervals, self.intervals[1:]):
+            if coarser % finer != 0:
+                raise ValueError(f"Interval {coarser} is not a multiple of {finer}")
+
+        # Growable record buffers, filled up to their size
+        self.buffers = {interval: np.empty(0, dtype=OHLC_DTYPE) for interval in self.intervals}
+        self.sizes = {interval: 0 for interval in self.intervals}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        # Number of candles of the finest level
+        return self.sizes[self.base_interval]
+
+    def last_timestamp(self):
+        """
+        This method returns the time of the newest candle of the finest level, or None if empty.
+        """
+        with self.lock:
+            size = self.sizes[self.base_interval]
+            return int(self.buffers[self.base_interval]["time"][size - 1]) if size > 0 else None
+
+    def covers(self, interval, since=None):
+        """
+        This method tells whether the finest candles go back as far as an OHLC request of the
+        interval would: to since (seconds) if given, otherwise OHLC_MAX_CANDLES candles of the
+        interval before the newest one.
+        """
+        with self.lock:
+            size = self.sizes[self.base_interval]
+            if size == 0:
+                return False
+            times = self.buffers[self.base_interval]["time"]
+            first, last = int(times[0]), int(times[size - 1])
+
+        # First candle needed, since is exclusive
+        if since is None:
+            start = last - (OHLC_MAX_CANDLES - 1) * interval * 60
+        else:
+            start = int(since) + self.base_interval * 60
+
+        return first <= start
+
+    def write(self, interval, timestamp, candles):
+        # Replace the candles of a level from timestamp onwards, growing its buffer if needed
+        buffer = self.buffers[interval]
+        offset = int(np.searchsorted(buffer["time"][: self.sizes[interval]], timestamp, side="left"))
+        size = offset + len(candles)
+
+        if size > len(buffer):
+            grown = np.empty(max(size, 2 * len(buffer)), dtype=OHLC_DTYPE)
+            grown[:offset] = buffer[:offset]
+            buffer = self.buffers[interval] = grown
+
+        buffer[offset:size] = candles
+        self.sizes[interval] = size
+
+    def update(self, candles):
+        """
+        This method merges candles of the finest interval (record array sorted by time). As in
+        the candle store, candles at or after the first new one are replaced. Coarser levels
+        are rebuilt from the first candle that contains new data.
+        """
+        candles = np.asarray(candles, dtype=OHLC_DTYPE)
+        if len(candles) == 0:
+            return
+
+        with self.lock:
+            changed = int(candles["time"][0])
+            self.write(self.base_interval, changed, candles)
+
+            for finer, interval in zip(self.intervals, self.intervals[1:]):
+                # Finer candles of the first touched candle onwards
+                changed = int(bucket_start(changed, interval))
+                source = self.buffers[finer][: self.sizes[finer]]
+                start = int(np.searchsorted(source["time"], changed, side="left"))
+
+                self.write(interval, changed, aggregate_candles(source[start:], interval))
+
+    def level(self, interval, since=None):
+        """
+        This method returns a copy of the candles of an interval, only those after since
+        (seconds) if given.
+        """
+        if interval not in self.buffers:
+            raise ValueError(f"Interval {interval} is not in the pyramid")
+
+        with self.lock:
+            candles = self.buffers[interval][: self.sizes[interval]]
+            start = 0 if since is None else int(np.searchsorted(candles["time"], int(since), side="right"))
+            return candles[start:].copy()
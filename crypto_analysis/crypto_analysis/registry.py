@@ -0,0 +1,254 @@
+import numpy as np
+import pandas as pd
+
+from crypto_analysis.indicators import rolling_window, shift
+
+
+def ewm_mean(values, alpha, min_periods=0):
+    """
+    This function calculates the exponentially weighted mean (recursive form, as pandas
+    ewm with adjust=False) along the first axis of a 1-D or 2-D array.
+    """
+    frame = pd.DataFrame(np.asarray(values, dtype=np.float64))
+    output = frame.ewm(alpha=alpha, adjust=False, min_periods=min_periods).mean().to_numpy()
+
+    return output.reshape(np.shape(values))
+
+
+def clip(values, lower=None, upper=None):
+    # Values limited to a range, NaN kept
+    return np.clip(values, -np.inf if lower is None else lower, np.inf if upper is None else upper)
+
+
+# Operations of the graph nodes, applied to the values of their inputs
+OPERATIONS = {
+    "rolling_mean": lambda values, window: rolling_window(values, window, np.mean),
+    "rolling_sum": lambda values, window: rolling_window(values, window, np.sum),
+    "rolling_max": lambda values, window: rolling_window(values, window, np.max),
+    "rolling_min": lambda values, window: rolling_window(values, window, np.min),
+    "rolling_std": lambda values, window: rolling_window(values, window, np.std),
+    "ewm": ewm_mean,
+    "shift": lambda values, periods=1: shift(values, periods),
+    "diff": lambda values: values - shift(values),
+    "clip": clip,
+    "abs": np.abs,
+    "scale": lambda values, factor=1, offset=0: values * factor + offset,
+    "add": np.add,
+    "sub": np.subtract,
+    "mul": np.multiply,
+    "div": np.divide,
+    "maximum": np.fmax,
+}
+
+
+class IndicatorGraph:
+    """
+    Computation graph of a set of indicators. Every indicator declares its columns as nodes,
+    an operation with its inputs and parameters, and equal nodes are only added once: a
+    rolling window or moving average used by several indicators is computed once, so adding
+    indicators doesn't multiply the cost of the ones they share nodes with. Only the nodes
+    the requested columns depend on are evaluated.
+    """
+
+    def __init__(self):
+        # Nodes in the order they were added, and output column -> node
+        self.nodes = {}
+        self.columns = {}
+
+    def node(self, operation, *inputs, **params):
+        """
+        This method returns the node of an operation over input nodes, adding it if new.
+        """
+        if operation != "column" and operation not in OPERATIONS:
+            raise ValueError(f"Unknown operation {operation}")
+
+        key = (operation, inputs, tuple(sorted(params.items())))
+        self.nodes.setdefault(key, len(self.nodes))
+
+        return key
+
+    def column(self, name):
+        # Node of a candle column (open, high, low, close, vwap, volume...)
+        return self.node("column", name=name)
+
+    def add_columns(self, columns):
+        # Output columns declared by an indicator
+        for name, node in columns.items():
+            if name in self.columns and self.columns[name] != node:
+                raise ValueError(f"Indicator column {name} is declared twice")
+            self.columns[name] = node
+
+    def dependencies(self, columns=None):
+        """
+        This method returns the nodes needed to compute the given columns (all of them by
+        default), inputs before the nodes that use them.
+        """
+        columns = list(self.columns) if columns is None else columns
+        needed = []
+        seen = set()
+
+        def visit(node):
+            if node in seen:
+                return
+            seen.add(node)
+            for input_node in node[1]:
+                visit(input_node)
+            needed.append(node)
+
+        for name in columns:
+            if name not in self.columns:
+                raise KeyError(f"Unknown indicator column {name}")
+            visit(self.columns[name])
+
+        return needed
+
+    def evaluate(self, data, columns=None):
+        """
+        This method computes the given columns (all of them by default) from the candle
+        columns of data, a DataFrame or a dictionary of 1-D or (time x pair) arrays.
+        Returns a dictionary of arrays.
+        """
+        values = {}
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for node in self.dependencies(columns):
+                operation, inputs, params = node
+                if operation == "column":
+                    values[node] = np.asarray(data[dict(params)["name"]], dtype=np.float64)
+                else:
+                    values[node] = OPERATIONS[operation](
+                        *(values[input_node] for input_node in inputs), **dict(params)
+                    )
+
+        return {name: values[self.columns[name]] for name in (list(self.columns) if columns is None else columns)}
+
+
+# Indicator kind -> function declaring its columns in a graph
+INDICATORS = {}
+
+
+def register_indicator(kind):
+    """
+    This function registers an indicator under a kind, the name used in the "indicators"
+    section of config.yml. The indicator is a function of the graph and its parameters that
+    returns its output columns as a dictionary of nodes.
+    """
+
+    def decorator(function):
+        INDICATORS[kind] = function
+        return function
+
+    return decorator
+
+
+@register_indicator("ma")
+def moving_average(graph, window=26):
+    # Simple moving average of the close price
+    return {f"MA_{window}": graph.node("rolling_mean", graph.column("close"), window=window)}
+
+
+@register_indicator("stochastic")
+def stochastic(graph, window=14, nmean=3):
+    # %K of the close within the period range, and its moving average %D
+    close = graph.column("close")
+    period_high = graph.node("rolling_max", graph.column("high"), window=window)
+    period_low = graph.node("rolling_min", graph.column("low"), window=window)
+    pct_k = graph.node(
+        "scale",
+        graph.node("div", graph.node("sub", close, period_low), graph.node("sub", period_high, period_low)),
+        factor=100,
+    )
+
+    return {
+        f"pctK_{window}": pct_k,
+        f"pctD_{window}_{nmean}": graph.node("rolling_mean", pct_k, window=nmean),
+    }
+
+
+@register_indicator("rsi")
+def rsi(graph, window=14):
+    # Relative strength index, gains and losses smoothed as Wilder did
+    change = graph.node("diff", graph.column("close"))
+    gain = graph.node("ewm", graph.node("clip", change, lower=0), alpha=1 / window, min_periods=window)
+    loss = graph.node("ewm", graph.node("clip", change, upper=0), alpha=1 / window, min_periods=window)
+    loss = graph.node("abs", loss)
+
+    return {f"RSI_{window}": graph.node("scale", graph.node("div", gain, graph.node("add", gain, loss)), factor=100)}
+
+
+@register_indicator("macd")
+def macd(graph, fast=12, slow=26, signal=9):
+    # Difference of a fast and a slow exponential moving average, its signal line and histogram
+    close = graph.column("close")
+    fast_ema = graph.node("ewm", close, alpha=2 / (fast + 1), min_periods=fast)
+    slow_ema = graph.node("ewm", close, alpha=2 / (slow + 1), min_periods=slow)
+    line = graph.node("sub", fast_ema, slow_ema)
+    signal_line = graph.node("ewm", line, alpha=2 / (signal + 1), min_periods=signal)
+
+    return {
+        f"MACD_{fast}_{slow}": line,
+        f"MACD_signal_{fast}_{slow}_{signal}": signal_line,
+        f"MACD_hist_{fast}_{slow}_{signal}": graph.node("sub", line, signal_line),
+    }
+
+
+@register_indicator("bollinger")
+def bollinger(graph, window=20, width=2):
+    # Moving average of the close price and bands width standard deviations away
+    close = graph.column("close")
+    middle = graph.node("rolling_mean", close, window=window)
+    deviation = graph.node("scale", graph.node("rolling_std", close, window=window), factor=width)
+
+    return {
+        f"BB_middle_{window}": middle,
+        f"BB_upper_{window}_{width}": graph.node("add", middle, deviation),
+        f"BB_lower_{window}_{width}": graph.node("sub", middle, deviation),
+    }
+
+
+@register_indicator("atr")
+def atr(graph, window=14):
+    # Average true range, the true range smoothed as Wilder did
+    high = graph.column("high")
+    low = graph.column("low")
+    previous_close = graph.node("shift", graph.column("close"), periods=1)
+    true_range = graph.node(
+        "maximum",
+        graph.node("sub", high, low),
+        graph.node(
+            "maximum",
+            graph.node("abs", graph.node("sub", high, previous_close)),
+            graph.node("abs", graph.node("sub", low, previous_close)),
+        ),
+    )
+
+    return {f"ATR_{window}": graph.node("ewm", true_range, alpha=1 / window, min_periods=window)}
+
+
+@register_indicator("vwap")
+def vwap(graph, window=26):
+    # Volume weighted average price over the window, from the vwap of every candle
+    volume = graph.column("volume")
+    traded = graph.node("mul", graph.column("vwap"), volume)
+    return {
+        f"VWAP_{window}": graph.node(
+            "div", graph.node("rolling_sum", traded, window=window), graph.node("rolling_sum", volume, window=window)
+        )
+    }
+
+
+def compile_indicators(specs):
+    """
+    This function builds the graph of a list of indicators, as declared in the "indicators"
+    section of config.yml: one dictionary per indicator with its kind and parameters, e.g.
+    {"kind": "rsi", "window": 14}.
+    """
+    graph = IndicatorGraph()
+    for spec in specs or []:
+        params = dict(spec)
+        kind = params.pop("kind", None)
+        if kind not in INDICATORS:
+            raise ValueError(f"Unknown indicator {kind}, expected one of {sorted(INDICATORS)}")
+
+        graph.add_columns(INDICATORS[kind](graph, **params))
+
+    return graph
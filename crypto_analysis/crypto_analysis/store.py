@@ -0,0 +1,218 @@
+import os
+import threading
+from operator import itemgetter
+from itertools import chain
+import numpy as np
+import pandas as pd
+
+from crypto_analysis.exception import CryptoAnalysisException
+
+
+# Record layout of a Kraken OHLC candle, one fixed-size record per row
+OHLC_DTYPE = np.dtype(
+    [
+        ("time", "i8"),
+        ("open", "f8"),
+        ("high", "f8"),
+        ("low", "f8"),
+        ("close", "f8"),
+        ("vwap", "f8"),
+        ("volume", "f8"),
+        ("count", "i8"),
+    ]
+)
+
+
+# Columns of the candles DataFrame, in Kraken order
+OHLC_COLUMNS = ["date", "open", "high", "low", "close", "vwap", "volume", "count"]
+
+# Floating point columns
+PRICE_COLUMNS = ["open", "high", "low", "close", "vwap", "volume"]
+
+
+def parse_ohlc_rows(rows):
+    """
+    This function converts the list of OHLC rows returned by the Kraken API (strings for
+    prices, integers for time and count) into typed NumPy arrays, with a single conversion
+    pass per type. Returns the times (int64), the (rows x 6) prices and volume (float64) and
+    the trade counts (int64).
+    """
+    n = len(rows)
+    times = np.fromiter(map(itemgetter(0), rows), dtype=np.int64, count=n)
+    counts = np.fromiter(map(itemgetter(7), rows), dtype=np.int64, count=n)
+
+    # Prices and volume of every row, converted one by one into a preallocated array
+    fields = chain.from_iterable(map(itemgetter(1, 2, 3, 4, 5, 6), rows))
+    values = np.fromiter(map(float, fields), dtype=np.float64, count=n * len(PRICE_COLUMNS))
+    values = values.reshape(n, len(PRICE_COLUMNS))
+
+    return times, values, counts
+
+
+def parse_candles(rows):
+    """
+    This function converts the list of OHLC rows returned by the Kraken API into a typed record array.
+    """
+    times, values, counts = parse_ohlc_rows(rows)
+
+    candles = np.empty(len(rows), dtype=OHLC_DTYPE)
+    candles["time"] = times
+    for i, name in enumerate(PRICE_COLUMNS):
+        candles[name] = values[:, i]
+    candles["count"] = counts
+
+    return candles
+
+
+def candles_to_frame(candles):
+    """
+    This function builds the pandas.DataFrame used by the model from a candle record array.
+    The price columns are views of the record array, not copies.
+    """
+    columns = {"date": pd.to_datetime(candles["time"], unit="s")}
+    columns.update({name: candles[name] for name in OHLC_COLUMNS[1:]})
+
+    return pd.DataFrame(columns, copy=False)
+
+
+def frame_to_candles(data):
+    """
+    This function converts a candles pandas.DataFrame (see candles_to_frame) back into a
+    candle record array.
+    """
+    candles = np.empty(len(data), dtype=OHLC_DTYPE)
+    candles["time"] = data["date"].to_numpy().astype("datetime64[s]").astype(np.int64)
+    for name in OHLC_COLUMNS[1:]:
+        candles[name] = data[name].to_numpy()
+
+    return candles
+
+
+class CandleStore:
+    """
+    On-disk store of OHLC candles. Every pair and interval has its own binary file of
+    fixed-size records, so new candles are appended without rewriting the history and
+    the file can be read back as a memory-mapped NumPy array.
+    """
+
+    def __init__(self, path="data"):
+        self.path = path
+        self.lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+
+    def file_path(self, pair, interval):
+        # Candle records file
+        return os.path.join(self.path, f"{pair}_{interval}.bin")
+
+    def cursor_path(self, pair, interval):
+        # Kraken "last" cursor file
+        return os.path.join(self.path, f"{pair}_{interval}.last")
+
+    def __len__(self):
+        # Number of stored series
+        return len([name for name in os.listdir(self.path) if name.endswith(".bin")])
+
+    def read(self, pair, interval, mmap=False):
+        """
+        This method returns the stored candles of a pair and interval. With mmap=True the
+        records are memory-mapped instead of loaded, which keeps large histories out of RAM.
+        """
+        file_path = self.file_path(pair, interval)
+
+        # Nothing stored yet
+        if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
+            return np.empty(0, dtype=OHLC_DTYPE)
+
+        if mmap:
+            return np.memmap(file_path, dtype=OHLC_DTYPE, mode="r")
+
+        return np.fromfile(file_path, dtype=OHLC_DTYPE)
+
+    def last_timestamp(self, pair, interval):
+        """
+        This method returns the time of the newest stored candle, or None if the store is empty.
+        """
+        file_path = self.file_path(pair, interval)
+        if not os.path.exists(file_path) or os.path.getsize(file_path) < OHLC_DTYPE.itemsize:
+            return None
+
+        # Read only the last record
+        with open(file_path, "rb") as file:
+            file.seek(-OHLC_DTYPE.itemsize, os.SEEK_END)
+            record = np.frombuffer(file.read(OHLC_DTYPE.itemsize), dtype=OHLC_DTYPE)
+
+        return int(record["time"][0])
+
+    def get_cursor(self, pair, interval):
+        """
+        This method returns the "since" value to use for the next OHLC request. Kraken's
+        "last" cursor is preferred; the newest stored candle time is used otherwise.
+        """
+        cursor_path = self.cursor_path(pair, interval)
+        if os.path.exists(cursor_path):
+            with open(cursor_path, "r") as file:
+                return int(file.read().strip())
+
+        return self.last_timestamp(pair, interval)
+
+    def has_cursor(self, pair, interval):
+        # Whether the candles of a pair were already requested from the API
+        return os.path.exists(self.cursor_path(pair, interval))
+
+    def append(self, pair, interval, candles, last=None):
+        """
+        This method merges new candles into the store. Stored rows at or after the first new
+        candle are overwritten (Kraken keeps updating the running candle), the rest is appended.
+        """
+        try:
+            with self.lock:
+                self.write_candles(pair, interval, candles, last)
+
+        except Exception as e:
+            raise CryptoAnalysisException(e, "STORE APPEND")
+
+    def insert(self, pair, interval, candles):
+        """
+        This method merges candles anywhere in the stored history, for example older candles
+        from a backfill. New candles replace stored candles with the same time. Unlike append,
+        the whole file is rewritten.
+        """
+        try:
+            with self.lock:
+                stored = self.read(pair, interval)
+                candles = np.asarray(candles, dtype=OHLC_DTYPE)
+
+                # Keep stored candles not replaced by the new ones, sorted by time
+                merged = np.concatenate([stored[~np.isin(stored["time"], candles["time"])], candles])
+                merged = merged[np.argsort(merged["time"], kind="stable")]
+
+                # Replace the file at once so readers never see a partial file
+                tmp_path = f"{self.file_path(pair, interval)}.tmp"
+                merged.tofile(tmp_path)
+                os.replace(tmp_path, self.file_path(pair, interval))
+
+        except Exception as e:
+            raise CryptoAnalysisException(e, "STORE INSERT")
+
+    def write_candles(self, pair, interval, candles, last):
+        # Merge candles into the records file and save the cursor
+        if len(candles) > 0:
+            file_path = self.file_path(pair, interval)
+            candles = np.ascontiguousarray(candles, dtype=OHLC_DTYPE)
+
+            # Position of the first stored row replaced by the new candles
+            stored_times = self.read(pair, interval, mmap=True)["time"]
+            offset = int(np.searchsorted(stored_times, candles["time"][0], side="left"))
+            del stored_times
+
+            # Write in place from the overlap onwards and drop any leftover rows
+            mode = "r+b" if os.path.exists(file_path) else "wb"
+            with open(file_path, mode) as file:
+                file.seek(offset * OHLC_DTYPE.itemsize)
+                file.write(candles.tobytes())
+                file.truncate()
+
+        # Save the cursor for the next incremental request
+        if last is not None:
+            with open(self.cursor_path(pair, interval), "w") as file:
+                file.write(str(int(last)))
@@ -0,0 +1,195 @@
+import math
+import threading
+from collections import deque
+
+# Fields of an input candle, vwap and count are optional
+CANDLE_FIELDS = ["date", "open", "high", "low", "close", "vwap", "volume", "count"]
+
+
+class RollingMean:
+    """
+    Mean over a sliding window, updated in O(1). Holds the last window - 1 committed values,
+    so the mean including a new value can be computed before the value is committed.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+        self.nans = 0
+        self.pushes = 0
+
+    def peek(self, value):
+        # Mean of the committed values and a new one, NaN until the window is full
+        if len(self.values) < self.window - 1 or self.nans > 0 or math.isnan(value):
+            return math.nan
+
+        return (self.total + value) / self.window
+
+    def push(self, value):
+        # Commit a value, dropping the oldest one
+        self.add(value, 1)
+        if len(self.values) > self.window - 1:
+            self.add(self.values.popleft(), -1)
+
+        # Recompute the sum now and then so rounding errors don't accumulate
+        self.pushes += 1
+        if self.pushes % self.window == 0:
+            self.total = math.fsum(value for value in self.values if not math.isnan(value))
+
+    def add(self, value, sign):
+        # Update the sum and the NaN counter
+        if sign > 0:
+            self.values.append(value)
+
+        if math.isnan(value):
+            self.nans += sign
+        else:
+            self.total += sign * value
+
+
+class RollingExtreme:
+    """
+    Maximum or minimum over a sliding window, updated in O(1) amortized with a monotonic deque.
+    As with RollingMean, the result including a new value is available before committing it.
+    """
+
+    def __init__(self, window, reduce=max):
+        self.window = window
+        self.reduce = reduce
+        self.items = deque()
+        self.count = 0
+
+    def peek(self, value):
+        # Extreme of the committed values and a new one, NaN until the window is full
+        if self.count < self.window - 1:
+            return math.nan
+
+        if not self.items:
+            return value
+
+        return self.reduce(self.items[0][1], value)
+
+    def push(self, value):
+        # Drop values dominated by the new one, they can't be the extreme anymore
+        while self.items and self.reduce(self.items[-1][1], value) == value:
+            self.items.pop()
+        self.items.append((self.count, value))
+        self.count += 1
+
+        # Drop values out of the window
+        while self.items and self.items[0][0] < self.count - (self.window - 1):
+            self.items.popleft()
+
+
+class StochasticState:
+    """
+    Incremental stochastic oscillator of one pair and interval. Candles are fed one at a
+    time and every update costs O(1) amortized, giving the same values and signals as
+    indicators.stochastic_oscillator over the whole history.
+
+    The last candle fed is the running candle: feeding a candle with the same date replaces
+    it, and it is committed to the rolling windows when a candle with a newer date arrives.
+    Updates hold the lock of the state, which consumers feeding it from several threads
+    (live feed, alert engine) also hold to feed a sequence of candles at once. The last
+    max_closed committed rows are kept for the consumers that check every closed candle.
+    """
+
+    def __init__(self, window_size_ma, stochastic_window, stochastic_nmean, max_closed=100):
+        self.close_mean = RollingMean(window_size_ma)
+        self.high_max = RollingExtreme(stochastic_window, max)
+        self.low_min = RollingExtreme(stochastic_window, min)
+        self.pct_k_mean = RollingMean(stochastic_nmean)
+
+        # Running candle and its indicators
+        self.candle = None
+        self.row = None
+        self.pct_k = math.nan
+
+        # Last committed row with every indicator computed, and the ones before it, oldest first
+        self.previous = None
+        self.closed = deque(maxlen=max_closed)
+
+        # Held while the windows and rows are updated
+        self.lock = threading.RLock()
+
+    @classmethod
+    def from_config(cls, config):
+        # Build with the windows of config.yml
+        return cls(
+            config["data"]["window_size_ma"],
+            config["model"]["stochastic_window"],
+            config["model"]["stochastic_nmean"],
+        )
+
+    def update(self, candle):
+        """
+        This method feeds a candle (a mapping with date, open, high, low, close and volume)
+        and returns its row of indicators, or None while the indicator windows are not full.
+        """
+        candle = {
+            field: candle[field] if field in ("date", "count") else float(candle[field])
+            for field in CANDLE_FIELDS
+            if field in candle
+        }
+
+        with self.lock:
+            # A newer candle closes the running one
+            if self.candle is not None and candle["date"] != self.candle["date"]:
+                if candle["date"] < self.candle["date"]:
+                    raise ValueError(f"Candle {candle['date']} is older than {self.candle['date']}")
+                self.commit()
+
+            self.candle = candle
+            self.row = self.compute(candle)
+
+            return self.row
+
+    def commit(self):
+        # Add the running candle to the rolling windows
+        self.close_mean.push(self.candle["close"])
+        self.high_max.push(self.candle["high"])
+        self.low_min.push(self.candle["low"])
+        self.pct_k_mean.push(self.pct_k)
+
+        if self.row is not None:
+            self.previous = self.row
+            self.closed.append(self.row)
+
+    def compute(self, candle):
+        """
+        This method computes the indicators of a candle on top of the committed windows.
+        """
+        row = dict(candle)
+
+        # Moving average
+        row["MA"] = self.close_mean.peek(candle["close"])
+
+        # Period highest and lowest value
+        row["period_high"] = self.high_max.peek(candle["high"])
+        row["period_low"] = self.low_min.peek(candle["low"])
+
+        # Compute %K and %D
+        try:
+            self.pct_k = (candle["close"] - row["period_low"]) / (row["period_high"] - row["period_low"]) * 100
+        except ZeroDivisionError:
+            self.pct_k = math.nan
+        row["pctK"] = self.pct_k
+        row["pctD"] = self.pct_k_mean.peek(self.pct_k)
+
+        # Rows without every indicator are not returned
+        if any(math.isnan(row[column]) for column in ["MA", "pctK", "pctD"]):
+            return None
+
+        # Crossover signals against the previous complete row
+        pct_k, pct_d = row["pctK"], row["pctD"]
+        prev_k, prev_d = (
+            (math.nan, math.nan) if self.previous is None else (self.previous["pctK"], self.previous["pctD"])
+        )
+
+        row["Buy_Signal"] = int(pct_k > pct_d and prev_k < prev_d and pct_k < 20)
+        row["Sell_Signal"] = int(pct_k < pct_d and prev_k > prev_d and pct_k > 80)
+        row["Overbought_Signal"] = int(pct_k > 80 and prev_k < 80)
+        row["Oversold_Signal"] = int(pct_k < 20 and prev_k > 20)
+
+        return row
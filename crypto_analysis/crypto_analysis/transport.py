@@ -0,0 +1,201 @@
+import time
+import random
+import threading
+from collections import deque
+from urllib.parse import urlparse
+
+from crypto_analysis.metrics import metrics
+
+
+# Kraken API errors worth retrying after waiting
+RETRY_ERRORS = ["EAPI:Rate limit exceeded", "EGeneral:Too many requests", "EService:Unavailable", "EService:Busy"]
+
+# HTTP statuses retried with backoff: rate limit and server errors
+RETRY_STATUS = [429, 500, 502, 503, 504]
+
+
+class LatencyMetrics:
+    """
+    Latency of the HTTP requests of every endpoint: number of requests and errors, mean and
+    maximum, and percentiles over the most recent requests.
+    """
+
+    def __init__(self, window=1000):
+        self.window = window
+        self.endpoints = {}
+        self.lock = threading.Lock()
+
+    def record(self, endpoint, seconds, error=False):
+        # Add one request of an endpoint
+        with self.lock:
+            metrics = self.endpoints.get(endpoint)
+            if metrics is None:
+                metrics = self.endpoints[endpoint] = {
+                    "requests": 0,
+                    "errors": 0,
+                    "total": 0.0,
+                    "max": 0.0,
+                    "recent": deque(maxlen=self.window),
+                }
+
+            metrics["requests"] += 1
+            metrics["errors"] += int(error)
+            metrics["total"] += seconds
+            metrics["max"] = max(metrics["max"], seconds)
+            metrics["recent"].append(seconds)
+
+    def snapshot(self):
+        """
+        This method returns the metrics of every endpoint as a dictionary, times in seconds.
+        """
+        with self.lock:
+            snapshot = {}
+            for endpoint, metrics in self.endpoints.items():
+                recent = sorted(metrics["recent"])
+                snapshot[endpoint] = {
+                    "requests": metrics["requests"],
+                    "errors": metrics["errors"],
+                    "mean": metrics["total"] / metrics["requests"],
+                    "max": metrics["max"],
+                    **{f"p{q}": recent[min(len(recent) - 1, len(recent) * q // 100)] for q in (50, 95, 99)},
+                }
+
+            return snapshot
+
+
+class Transport:
+    """
+    HTTP layer shared by every Kraken call: one pooled keep-alive requests session with
+    compression, connect/read timeouts applied to every request that doesn't set its own,
+    retries with exponential backoff on rate limits and server errors, and latency metrics
+    per endpoint. The session is created on first use.
+    """
+
+    def __init__(
+        self,
+        connect_timeout=3.05,
+        read_timeout=10,
+        retries=3,
+        backoff=0.5,
+        pool_size=10,
+        clock=time.perf_counter,
+        sleep=time.sleep,
+    ):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self.clock = clock
+        self.sleep = sleep
+
+        self.metrics = LatencyMetrics()
+        self._session = None
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        # Build with the "http" section of config.yml
+        http_config = config.get("http", {})
+        return cls(
+            connect_timeout=http_config.get("connect_timeout", 3.05),
+            read_timeout=http_config.get("read_timeout", 10),
+            retries=http_config.get("retries", 3),
+            backoff=http_config.get("backoff", 0.5),
+            pool_size=http_config.get("pool_size", 10),
+        )
+
+    @property
+    def session(self):
+        # Pooled session, created on first use
+        with self.lock:
+            if self._session is None:
+                self._session = self.open_session()
+            return self._session
+
+    def open_session(self):
+        """
+        This method creates the requests session, with connection pool, retries and timed requests.
+        """
+        # Imported here, HTTP is only needed once data is requested
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        retry = Retry(
+            total=self.retries,
+            backoff_factor=self.backoff,
+            status_forcelist=RETRY_STATUS,
+            allowed_methods=None,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=retry)
+
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers["Accept-Encoding"] = "gzip, deflate"
+
+        # Every request of the session goes through request
+        session.send_request = session.request
+        session.request = self.request
+
+        return session
+
+    def request(self, method, url, **kwargs):
+        """
+        This method sends a request with the default timeouts and records its latency and
+        the size of the response it received, by endpoint (e.g. "OHLC").
+        """
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = (self.connect_timeout, self.read_timeout)
+
+        endpoint = urlparse(url).path
+        start = self.clock()
+        try:
+            response = self.session.send_request(method, url, **kwargs)
+        except Exception as e:
+            self.metrics.record(endpoint, self.clock() - start, error=True)
+            raise e
+
+        self.metrics.record(endpoint, self.clock() - start, error=response.status_code >= 400)
+        metrics.increment("payload_bytes", len(response.content), endpoint=endpoint.rsplit("/", 1)[-1])
+        return response
+
+    def get(self, url, **kwargs):
+        # GET request on the shared session
+        return self.session.get(url, **kwargs)
+
+    def post(self, url, **kwargs):
+        # POST request on the shared session
+        return self.session.post(url, **kwargs)
+
+    def query(self, call):
+        """
+        This method runs a Kraken API call (function returning the JSON response), retrying
+        with exponential backoff and jitter while Kraken answers with a rate limit or busy error.
+        """
+        for attempt in range(self.retries + 1):
+            response = call()
+            if not response.get("error") or response["error"][0] not in RETRY_ERRORS or attempt == self.retries:
+                return response
+
+            self.sleep(random.uniform(0, self.backoff * 2**attempt))
+
+
+# Transport shared by every model of the process, so connections are reused
+shared_transport = {}
+shared_transport_lock = threading.Lock()
+
+
+def get_shared_transport(config):
+    """
+    This function returns the process-wide transport for the "http" section of config.yml.
+    """
+    key = tuple(sorted(config.get("http", {}).items()))
+    with shared_transport_lock:
+        if key not in shared_transport:
+            shared_transport[key] = Transport.from_config(config)
+
+        return shared_transport[key]
@@ -1,63 +1,72 @@
-import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
 
+from crypto_analysis.store import parse_ohlc_rows, PRICE_COLUMNS
+from crypto_analysis.metrics import metrics
 from crypto_analysis.exception import CryptoAnalysisException
 
 
+@metrics.timed("utils.process_response")
 def process_response(response):
     """
     This function processes the response from the API and returns a pandas.DataFrame.
+    The rows are parsed straight into typed arrays, which the DataFrame uses without copying.
     """
-    # Create pandas DataFrame
+    # Get asset rows
     asset = list(response["result"].keys())[0]
-    data = pd.DataFrame(response["result"][asset])
+    rows = response["result"][asset]
 
-    if data.empty:
+    if len(rows) == 0:
         raise CryptoAnalysisException("Empty response data", "PROCESS RESPONSE")
 
-    # Data columns
-    data.columns = [
-        "date",
-        "open",
-        "high",
-        "low",
-        "close",
-        "vwap",
-        "volume",
-        "count",
-    ]
-
-    # Processing columns
-    ohlc_columns = ["open", "high", "low", "close", "volume"]
-    data["date"] = pd.to_datetime(data["date"], unit="s")
-    data[ohlc_columns] = data[ohlc_columns].apply(pd.to_numeric, errors="coerce")
-    data = data[["date"] + ohlc_columns].copy()
+    # Parse columns: date, open, high, low, close, vwap, volume and count
+    times, values, counts = parse_ohlc_rows(rows)
+
+    # Create pandas DataFrame on the parsed arrays
+    data = pd.DataFrame(values, columns=PRICE_COLUMNS, copy=False)
+    data.insert(0, "date", pd.to_datetime(times, unit="s"))
+    data["count"] = counts
 
     return data
 
 
+def default_dates(bounds):
+    """
+    This function returns the dates the date selector shows by default for data with the
+    given oldest and newest date: the oldest date, and today or the newest date if older.
+    """
+    min_date, max_date = bounds
+    return (pd.Timestamp(min_date).date(), pd.Timestamp(min(datetime.today(), max_date)).date())
+
+
 # Select date and asset
-def select_box_date(asset_data):
+def select_box_date(asset_data, bounds=None):
     """
     This function generates the box to select a specific range of dates.
+    The oldest and newest dates can be given as bounds, e.g. from the DateIndex of the data.
     """
+    # Imported here, utils is also used without the dashboard
+    import streamlit as st
+
+    # Date bounds of the data
+    min_date, max_date = (asset_data["date"].min(), asset_data["date"].max()) if bounds is None else bounds
 
     # Get start date, default to oldest date
+    default_start, default_end = default_dates((min_date, max_date))
     start_date = st.sidebar.date_input(
         "Start date",
-        asset_data["date"].min(),
-        min_value=asset_data["date"].min(),
-        max_value=asset_data["date"].max(),
+        default_start,
+        min_value=min_date,
+        max_value=max_date,
     )
 
     try:
-        # Get end date, default to today
+        # Get end date, default to today, or to the newest date if there is no data for today yet
         end_date = st.sidebar.date_input(
             "End date",
-            datetime.today(),
-            min_value=asset_data["date"].min(),
-            max_value=asset_data["date"].max(),
+            default_end,
+            min_value=min_date,
+            max_value=max_date,
         )
 
     # Sometimes the user make a query when the data is not available because the API have not shown the data yet.
@@ -65,8 +74,8 @@ def select_box_date(asset_data):
         end_date = st.sidebar.date_input(
             "End date",
             datetime.today() - timedelta(days=1),
-            min_value=asset_data["date"].min(),
-            max_value=asset_data["date"].max(),
+            min_value=min_date,
+            max_value=max_date,
         )
 
     return (start_date, end_date)
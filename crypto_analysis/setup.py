@@ -27,4 +27,9 @@ setup(
     author_email="",
     packages=find_packages(),
     install_requirements=get_requirements("requirements.txt"),
+    entry_points={
+        "console_scripts": [
+            "crypto-signals=crypto_analysis.cli:main",
+        ],
+    },
 )
@@ -0,0 +1,74 @@
+import threading
+import numpy as np
+import pandas as pd
+
+from crypto_analysis.model import CryptoAnalysisModel
+from crypto_analysis.cache import cache_key
+
+
+def random_candles(n, seed, start="2023-01-01"):
+    # Random walk candles
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.normal(0, 1, n).cumsum()
+    spread = rng.uniform(0.1, 2, n)
+    return pd.DataFrame(
+        {
+            "date": pd.date_range(start, periods=n, freq="D"),
+            "open": close + rng.normal(0, 0.5, n),
+            "high": close + spread,
+            "low": close - spread,
+            "close": close,
+            "volume": rng.uniform(1, 100, n),
+        }
+    )
+
+
+def offline_model(frames=None, interval=1440, model=None):
+    # Model without local store, serving the candles of every pair (pair -> DataFrame) from its cache
+    model = CryptoAnalysisModel() if model is None else model
+    model.store = None
+    for pair, data in (frames or {}).items():
+        model.data_cache.set(cache_key("raw", pair, interval), data)
+
+    return model
+
+
+# Offline stand-in for the Kraken connection, replays the given OHLC responses
+class StubConnection:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def query_public(self, method, data=None):
+        self.calls.append((method, dict(data or {})))
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+# Offline Kraken stand-in answering OHLC and paged Trades requests of any pair
+class FakeKraken:
+    def __init__(self, trades, ohlc, rate_limit_errors=0, page_size=4):
+        self.trades = trades
+        self.ohlc = ohlc
+        self.rate_limit_errors = rate_limit_errors
+        self.page_size = page_size
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def query_public(self, method, data=None):
+        with self.lock:
+            self.calls.append((method, dict(data)))
+            if self.rate_limit_errors > 0:
+                self.rate_limit_errors -= 1
+                return {"error": ["EAPI:Rate limit exceeded"]}
+
+        if method == "OHLC":
+            return {"error": [], "result": {data["pair"]: self.ohlc, "last": self.ohlc[-2][0]}}
+
+        # Trades after the cursor, one page at a time
+        since = int(data["since"])
+        page = [trade for trade in self.trades if trade[2] * 1e9 > since][: self.page_size]
+        last = str(int(page[-1][2] * 1e9)) if page else data["since"]
+        return {"error": [], "result": {data["pair"]: page, "last": last}}
@@ -0,0 +1,160 @@
+import os
+import json
+import tempfile
+import unittest
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from helpers import random_candles, offline_model
+
+from crypto_analysis.transport import Transport
+from crypto_analysis.indicators import stochastic_oscillator
+from crypto_analysis.alerts import AlertEngine, FeedSink, FileSink, WebhookSink, next_boundary
+
+
+def ohlc_rows(data):
+    # Candles as rows of the Kraken OHLC endpoint
+    return [
+        [
+            int(row.date.timestamp()),
+            str(row.open),
+            str(row.high),
+            str(row.low),
+            str(row.close),
+            str(row.vwap),
+            str(row.volume),
+            int(row.count),
+        ]
+        for row in data.itertuples()
+    ]
+
+
+class PairConnection:
+    # Kraken stub answering the OHLC request of every pair with its candles
+    def __init__(self, candles):
+        self.candles = candles
+        self.calls = []
+
+    def query_public(self, method, data=None):
+        self.calls.append((method, dict(data or {})))
+        rows = ohlc_rows(self.candles[data["pair"]])
+        return {"error": [], "result": {data["pair"]: rows, "last": rows[-1][0]}}
+
+
+class Handler(BaseHTTPRequestHandler):
+    # Local webhook keeping the posted documents, /fail answers with an error
+    posted = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        Handler.posted.append(json.loads(body))
+        self.send_response(500 if self.path == "/fail" else 200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class TestAlerts(unittest.TestCase):
+    def setUp(self):
+        # Offline model with the candles before a signal candle cached, the signal candle running
+        self.candles = random_candles(400, 7).assign(vwap=lambda data: data["close"], count=1)
+        signals = stochastic_oscillator(self.candles, 26, 14, 3)
+        signal_row = signals[(signals["Buy_Signal"] == 1) | (signals["Sell_Signal"] == 1)].iloc[0]
+        self.signal = "Buy_Signal" if signal_row["Buy_Signal"] else "Sell_Signal"
+        self.index = int(self.candles.index[self.candles["date"] == signal_row["date"]][0])
+
+        cached = self.candles.iloc[: self.index + 1]
+        self.model = offline_model({pair: cached.copy() for pair in ["BTCUSD", "ETHUSD"]})
+
+        # Next request: the signal candle closed and a new one running
+        new_candles = self.candles.iloc[self.index : self.index + 2]
+        self.model.connection = PairConnection({"BTCUSD": new_candles, "ETHUSD": new_candles})
+
+    def test_next_boundary(self):
+        # Candles close at multiples of the interval
+        self.assertTrue(next_boundary(86400 * 10 + 5, 1440) == 86400 * 11)
+        self.assertTrue(next_boundary(86400 * 10, 1440) == 86400 * 11)
+        self.assertTrue(next_boundary(125, 1) == 180)
+
+    def test_evaluate(self):
+        # One alert per pair for the closed candle, sent to every sink
+        feed = FeedSink()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "alerts.jsonl")
+            engine = AlertEngine(self.model, pairs=["BTCUSD", "ETHUSD"], interval=1440, sinks=[feed, FileSink(path)])
+            alerts = engine.evaluate()
+
+            self.assertTrue(sorted(alert["pair"] for alert in alerts) == ["BTCUSD", "ETHUSD"])
+            self.assertTrue(all(alert["signal"] == self.signal for alert in alerts))
+            self.assertTrue(alerts[0]["date"] == self.candles["date"].iloc[self.index].isoformat())
+            with open(path, "r") as file:
+                self.assertTrue([json.loads(line) for line in file] == alerts)
+        self.assertTrue(feed.recent() == alerts[::-1] and len(feed.recent(1)) == 1)
+
+        # Only the newest candles are requested
+        since = int(self.candles["date"].iloc[self.index - 1].timestamp())
+        self.assertTrue(all(call[1]["since"] == since for call in self.model.connection.calls))
+
+        # The same candle doesn't alert twice
+        self.assertTrue(engine.evaluate() == [])
+        self.assertTrue(len(feed.recent()) == 2)
+
+    def test_lagging(self):
+        # Kraken lags a round behind: the signal candle closes with the next one, both are checked
+        engine = AlertEngine(self.model, pairs=["BTCUSD"], interval=1440)
+        self.model.connection = PairConnection({"BTCUSD": self.candles.iloc[self.index : self.index + 1]})
+        self.assertTrue(engine.evaluate() == [])
+
+        self.model.connection = PairConnection({"BTCUSD": self.candles.iloc[self.index : self.index + 3]})
+        alerts = engine.evaluate()
+        self.assertTrue([alert["signal"] for alert in alerts] == [self.signal])
+        self.assertTrue(alerts[0]["date"] == self.candles["date"].iloc[self.index].isoformat())
+        self.assertTrue(engine.checked["BTCUSD"] == self.candles["date"].iloc[self.index + 1])
+        self.assertTrue(engine.evaluate() == [])
+
+    def test_failures(self):
+        # Failing pairs and sinks are skipped
+        class FailingSink:
+            def send(self, alerts):
+                raise ValueError("Sink down")
+
+        feed = FeedSink()
+        engine = AlertEngine(self.model, pairs=["BTCUSD", "XXXUSD"], interval=1440, sinks=[FailingSink(), feed])
+        alerts = engine.evaluate()
+        self.assertTrue(len(alerts) == 1 and feed.recent() == alerts)
+
+    def test_webhook(self):
+        # Alerts posted to a local webhook through the shared session
+        server = ThreadingHTTPServer(("localhost", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        uri = f"http://localhost:{server.server_address[1]}"
+        Handler.posted = []
+
+        try:
+            alerts = [{"pair": "BTCUSD", "signal": "Buy_Signal"}]
+            WebhookSink(f"{uri}/alerts", Transport()).send(alerts)
+            self.assertTrue(Handler.posted == [{"alerts": alerts}])
+
+            with self.assertRaises(ValueError):
+                WebhookSink(f"{uri}/fail", Transport()).send(alerts)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_scheduler(self):
+        # Indicators built before the first round, the engine stops while waiting
+        engine = AlertEngine(self.model, pairs=["BTCUSD", "ETHUSD"], interval=1440, fetch=False)
+        engine.start()
+        engine.stop()
+        engine.thread.join(timeout=5)
+        self.assertTrue(not engine.thread.is_alive())
+        self.assertTrue(("ETHUSD", 1440) in self.model.indicator_states)
+
+        # Alerts of the in-app feed of the model
+        self.assertTrue(self.model.get_alerts() == [])
+
+
+if __name__ == "__main__":
+    unittest.main()
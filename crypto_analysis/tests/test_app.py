@@ -15,6 +15,12 @@ class TestCryptoAnalysisApp(unittest.TestCase):
         self.assertTrue(self.app.config is not None)
         self.assertTrue(isinstance(self.app.config, dict))
 
+    def test_shared_model(self):
+        # Check every app instance uses the same model and cache
+        other_app = CryptoAnalysisApp()
+        self.assertTrue(other_app.model is self.app.model)
+        self.assertTrue(other_app.model.data_cache is self.app.model.data_cache)
+
     def test_display_title(self):
         # Display title method test
         self.app.display_title()
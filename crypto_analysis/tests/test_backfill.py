@@ -0,0 +1,119 @@
+import tempfile
+import unittest
+import numpy as np
+
+from helpers import FakeKraken
+
+from crypto_analysis.backfill import Backfill, RateLimiter, trades_to_candles
+from crypto_analysis.store import CandleStore
+
+
+# Manual clock, sleeping moves it forward
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.slept = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+        self.slept += seconds
+
+
+class TestBackfill(unittest.TestCase):
+    def setUp(self):
+        # Temporary store
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store = CandleStore(self.tmp_dir.name)
+        self.clock = FakeClock()
+
+        # Trades of three hours before the stored candles: [price, volume, time, side, type, misc, id]
+        self.trades = [
+            ["10.0", "1.0", 3600.5, "b", "l", "", 1],
+            ["12.0", "1.0", 3700.0, "b", "l", "", 2],
+            ["9.0", "2.0", 4000.0, "s", "l", "", 3],
+            ["11.0", "1.0", 7300.0, "b", "l", "", 4],
+            ["13.0", "3.0", 7400.0, "s", "l", "", 5],
+            ["14.0", "1.0", 10900.0, "b", "l", "", 6],
+            ["15.0", "1.0", 14500.0, "b", "l", "", 7],
+        ]
+        self.ohlc = [
+            [14400, "15", "15", "15", "15", "15", "1", 1],
+            [18000, "15", "16", "15", "16", "15.5", "2", 2],
+        ]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_rate_limiter(self):
+        # Calls wait once the counter is full
+        limiter = RateLimiter(max_counter=3, decay=1.0, clock=self.clock, sleep=self.clock.sleep)
+        for _ in range(3):
+            limiter.acquire()
+        self.assertTrue(self.clock.slept == 0)
+        limiter.acquire(2)
+        self.assertTrue(self.clock.slept == 2.0)
+
+    def test_trades_to_candles(self):
+        # Check hourly candles
+        trades = np.array([[trade[2], float(trade[0]), float(trade[1])] for trade in self.trades]).T
+        candles = trades_to_candles(tuple(trades), 60)
+        self.assertTrue(list(candles["time"]) == [3600, 7200, 10800, 14400])
+        self.assertTrue(list(candles["open"][:2]) == [10.0, 11.0])
+        self.assertTrue(list(candles["high"][:2]) == [12.0, 13.0])
+        self.assertTrue(list(candles["low"][:2]) == [9.0, 11.0])
+        self.assertTrue(list(candles["count"]) == [3, 2, 1, 1])
+        self.assertTrue(candles["vwap"][1] == 12.5)
+
+    def test_backfill_pair(self):
+        # Recent candles from OHLC, older history from trades across pages
+        connection = FakeKraken(self.trades, self.ohlc, rate_limit_errors=2)
+        limiter = RateLimiter(clock=self.clock, sleep=self.clock.sleep)
+        backfill = Backfill(connection, self.store, limiter=limiter, sleep=self.clock.sleep)
+        backfill.backfill_pair("BTCUSD", 60, since=0)
+
+        candles = self.store.read("BTCUSD", 60)
+        self.assertTrue(list(candles["time"]) == [3600, 7200, 10800, 14400, 18000])
+        self.assertTrue(candles["volume"][0] == 4.0)
+        self.assertTrue(candles["close"][3] == 15.0)
+
+        # Rate limit errors were retried
+        self.assertTrue(connection.calls[0] == connection.calls[2])
+        self.assertTrue(self.clock.slept > 0)
+
+    def test_backfill_trades_single_write(self):
+        # Candles of every page are inserted at once
+        connection = FakeKraken(self.trades, self.ohlc, page_size=1)
+        backfill = Backfill(connection, self.store, limiter=RateLimiter(max_counter=100))
+        inserts = []
+        insert = self.store.insert
+        self.store.insert = lambda pair, interval, candles: inserts.append(len(candles)) or insert(
+            pair, interval, candles
+        )
+
+        self.assertTrue(backfill.backfill_trades("BTCUSD", 60, 0, until=18000) == 4)
+        self.assertTrue(inserts == [4])
+        self.assertTrue(list(self.store.read("BTCUSD", 60)["time"]) == [3600, 7200, 10800, 14400])
+
+    def test_run(self):
+        # Backfill many pairs in parallel
+        connection = FakeKraken(self.trades, self.ohlc)
+        backfill = Backfill(connection, self.store, limiter=RateLimiter(max_counter=100), workers=4)
+        pairs = ["BTCUSD", "ETHUSD", "XRPUSD", "SOLUSD", "ADAUSD"]
+        results = backfill.run(pairs, 60)
+        self.assertTrue(all(results[pair] == 2 for pair in pairs))
+        self.assertTrue(len(self.store) == len(pairs))
+
+    def test_not_retried_errors(self):
+        # Unknown pair errors are not retried
+        connection = FakeKraken(self.trades, self.ohlc)
+        connection.query_public = lambda method, data=None: {"error": ["EQuery:Unknown asset pair"]}
+        backfill = Backfill(connection, self.store, limiter=RateLimiter(max_counter=100))
+        results = backfill.run(["NOPAIR"], 60)
+        self.assertTrue("Unknown asset pair" in str(results["NOPAIR"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import time
+import unittest
+import numpy as np
+import pandas as pd
+
+from helpers import random_candles
+from crypto_analysis.indicators import stochastic_oscillator
+from crypto_analysis.backtest import (
+    backtest,
+    grid_backtest,
+    optimize,
+    parameter_grid,
+    performance,
+    signal_positions,
+    simulate,
+)
+
+
+class TestBacktest(unittest.TestCase):
+    def setUp(self):
+        # Candles of many pairs
+        self.frames = {f"PAIR{i}": random_candles(720, i) for i in range(4)}
+        self.data = stochastic_oscillator(self.frames["PAIR0"], 26, 14, 3)
+
+    def test_signal_positions(self):
+        # Long from buy to sell
+        buy = np.array([0, 1, 0, 1, 0, 0, 0], dtype=bool)
+        sell = np.array([0, 0, 0, 0, 1, 1, 0], dtype=bool)
+        self.assertTrue(signal_positions(buy, sell).tolist() == [0, 1, 1, 1, 0, 0, 0])
+
+    def test_simulate(self):
+        # Position held from the next candle, fees paid on every change
+        close = np.array([100.0, 110.0, 121.0, 121.0])
+        positions = np.array([1.0, 1.0, 0.0, 0.0])
+        net_returns = simulate(close, positions, fee=0.01, slippage=0.0)
+        self.assertTrue(np.allclose(net_returns, [-0.01, 0.1, 0.1 - 0.01, 0.0]))
+
+    def test_performance(self):
+        # One winning and one losing trade
+        net_returns = np.array([[0.0], [0.1], [0.1], [0.0], [-0.2], [0.0]])
+        positions = np.array([[1.0], [1.0], [0.0], [1.0], [0.0], [0.0]])
+        metrics = performance(net_returns, positions)
+        self.assertTrue(metrics["trades"][0] == 2)
+        self.assertTrue(metrics["hit_rate"][0] == 0.5)
+        self.assertTrue(np.isclose(metrics["total_return"][0], 1.1 * 1.1 * 0.8 - 1))
+        self.assertTrue(np.isclose(metrics["max_drawdown"][0], -0.2))
+
+    def test_backtest(self):
+        # Check performance figures
+        result = backtest(self.data)
+        self.assertTrue(0 < result["trades"] <= self.data["Buy_Signal"].sum())
+        self.assertTrue(-1 <= result["max_drawdown"] <= 0)
+        self.assertTrue(0 <= result["hit_rate"] <= 1)
+        self.assertTrue(np.isclose(result["equity"].iloc[-1], 1 + result["total_return"]))
+
+    def test_grid_backtest(self):
+        # The default parameters give the same result as the signals of compute_indicators
+        grid = parameter_grid([14], [3], [20], [80])
+        result = grid_backtest(self.frames["PAIR0"], grid, window_size_ma=26)
+        expected = backtest(self.data)
+        for metric in ["total_return", "max_drawdown", "trades", "hit_rate", "sharpe"]:
+            self.assertTrue(np.isclose(result[metric].iloc[0], expected[metric]))
+
+        # Every combination is evaluated
+        grid = parameter_grid([5, 14, 21], [2, 3], [10, 20], [80, 90])
+        result = grid_backtest(self.frames["PAIR0"], grid)
+        self.assertTrue(len(result) == 24)
+        self.assertTrue(
+            result[["stochastic_window", "stochastic_nmean"]].equals(grid[["stochastic_window", "stochastic_nmean"]])
+        )
+
+    def test_optimize(self):
+        # Same results in a process pool and in this process
+        grid = parameter_grid([5, 14], [3], [20, 30], [70, 80])
+        pooled = optimize(self.frames, grid, max_workers=2)
+        local = optimize(self.frames, grid, max_workers=1)
+        self.assertTrue(len(pooled) == 4 * len(grid))
+        pd.testing.assert_frame_equal(pooled, local)
+        self.assertTrue(pooled["sharpe"].dropna().is_monotonic_decreasing)
+
+    def test_grid_speed(self):
+        # A thousand combinations on one pair stay well under a second
+        grid = parameter_grid(range(5, 25, 2), range(2, 7), range(10, 40, 5)[:4], range(65, 95, 5)[:5])
+        start = time.perf_counter()
+        grid_backtest(self.frames["PAIR1"], grid)
+        self.assertTrue(len(grid) == 1000)
+        self.assertTrue(time.perf_counter() - start < 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
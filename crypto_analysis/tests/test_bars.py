@@ -0,0 +1,113 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+from helpers import FakeKraken
+
+from crypto_analysis.model import CryptoAnalysisModel
+from crypto_analysis.utils import process_response
+from crypto_analysis.backfill import Backfill, RateLimiter
+from crypto_analysis.bars import BarBuilder, build_bars, trade_bars
+
+
+def random_trades(n, seed):
+    # Random walk trades, a few per second
+    rng = np.random.default_rng(seed)
+    times = 1700000000 + rng.exponential(0.3, n).cumsum()
+    prices = 30000 + rng.normal(0, 5, n).cumsum()
+    volumes = rng.exponential(0.05, n).round(8)
+    return times, prices, volumes
+
+
+def pages_of(trades, size):
+    # Trades split into pages of the given size
+    return [tuple(values[i : i + size] for values in trades) for i in range(0, len(trades[0]), size)]
+
+
+class TestBars(unittest.TestCase):
+    def setUp(self):
+        self.trades = random_trades(20000, 1)
+
+    def test_tick_bars(self):
+        # A new bar every 3 trades, the last one unfinished
+        trades = (np.arange(8.0), np.array([5.0, 7, 4, 6, 6, 8, 9, 3]), np.ones(8))
+        bars = trade_bars([trades], "tick", 3)
+        self.assertTrue(list(bars["open"]) == [5, 6, 9] and list(bars["close"]) == [4, 8, 3])
+        self.assertTrue(list(bars["high"]) == [7, 8, 9] and list(bars["low"]) == [4, 6, 3])
+        self.assertTrue(list(bars["count"]) == [3, 3, 2])
+        self.assertTrue(bars["date"][1] == pd.to_datetime(3, unit="s"))
+
+        # Without the unfinished bar
+        self.assertTrue(len(trade_bars([trades], "tick", 3, include_partial=False)) == 2)
+
+    def test_volume_bars(self):
+        # Bars close on the trade reaching the next multiple of the threshold
+        trades = (np.arange(5.0), np.array([10.0, 20, 30, 40, 50]), np.array([1.0, 2, 1, 5, 1]))
+        bars = trade_bars([trades], "volume", 3)
+        self.assertTrue(list(bars["volume"]) == [3, 6, 1])
+        self.assertTrue(bars["vwap"][0] == (10 + 40) / 3)
+
+    def test_pages(self):
+        # Bars don't depend on the page size
+        for kind, threshold in [("tick", 100), ("volume", 5), ("dollar", 150000)]:
+            expected = trade_bars([self.trades], kind, threshold)
+            self.assertTrue(len(expected) > 10)
+            for size in [1000, 333, 7]:
+                bars = trade_bars(pages_of(self.trades, size), kind, threshold)
+                pd.testing.assert_frame_equal(bars, expected, check_exact=False, rtol=1e-12)
+
+    def test_build_bars(self):
+        # Bars yielded page by page, only the unfinished bar kept between pages
+        builder = BarBuilder("volume", 5)
+        for page in pages_of(self.trades, 500):
+            builder.update(page)
+            self.assertTrue(builder.partial is None or builder.partial.shape == ())
+
+        chunks = list(build_bars(pages_of(self.trades, 500), "volume", 5, include_partial=False))
+        self.assertTrue(len(chunks) > 1)
+        self.assertTrue(sum(map(len, chunks)) == len(trade_bars([self.trades], "volume", 5, include_partial=False)))
+
+    def test_schema(self):
+        # Same columns and types as candles from the API
+        response = {"error": [], "result": {"XXBTZUSD": [[1700000000, "1", "2", "0.5", "1.5", "1.2", "3", 4]]}}
+        candles = process_response(response)
+        bars = trade_bars([self.trades], "tick", 100)
+        self.assertTrue(list(bars.columns) == list(candles.columns))
+        self.assertTrue(bars.dtypes.equals(candles.dtypes))
+        self.assertTrue(bars["date"].is_monotonic_increasing)
+
+        # Empty trades give an empty frame
+        self.assertTrue(list(trade_bars([], "tick", 100).columns) == list(candles.columns))
+
+    def test_unknown_kind(self):
+        # Only tick, volume and dollar bars
+        with self.assertRaises(ValueError):
+            BarBuilder("time", 10)
+        with self.assertRaises(ValueError):
+            BarBuilder("tick", 0)
+
+    def test_trade_pages(self):
+        # Trades paged through the since cursor, bars built as pages arrive
+        trades = [[str(p), str(v), t, "b", "l", "", i] for i, (t, p, v) in enumerate(zip(*self.trades))][:50]
+        backfill = Backfill(FakeKraken(trades, [], page_size=8), None, limiter=RateLimiter(max_counter=1000))
+        pages = list(backfill.trade_pages("BTCUSD", 0))
+        self.assertTrue(len(pages) == 7 and sum(len(page[0]) for page in pages) == 50)
+
+        bars = trade_bars(backfill.trade_pages("BTCUSD", 0), "tick", 10)
+        self.assertTrue(list(bars["count"]) == [10] * 5)
+
+    def test_compute_bar_indicators(self):
+        # Indicators of bars from the Trades endpoint, cached
+        trades = [[str(p), str(v), t, "b", "l", "", i] for i, (t, p, v) in enumerate(zip(*self.trades))][:2000]
+        model = CryptoAnalysisModel()
+        model.connection = FakeKraken(trades, [], page_size=1000)
+
+        data = model.compute_bar_indicators("BTCUSD", kind="tick", threshold=20, since=0, until=1800000000)
+        self.assertTrue(len(data) == 100 - 25)
+        self.assertTrue({"pctK", "pctD", "Buy_Signal"} <= set(data.columns))
+        self.assertTrue(model.get_bars("BTCUSD", kind="tick", threshold=20, since=0, until=1800000000) is not None)
+        self.assertTrue(len(model.connection.calls) == 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+import os
+import json
+import tempfile
+import unittest
+
+from benchmarks.run import main
+from benchmarks.fake_kraken import ohlc_payload
+
+
+class TestBenchmarks(unittest.TestCase):
+    def test_ohlc_payload(self):
+        # Check rows on the interval grid, with the running candle last
+        payload = ohlc_payload(1000, interval=1)
+        rows = payload["result"]["XXBTZUSD"]
+        self.assertTrue(len(rows) == 1000)
+        self.assertTrue(all(b[0] - a[0] == 60 for a, b in zip(rows, rows[1:])))
+        self.assertTrue(payload["result"]["last"] == rows[-2][0])
+
+    def test_run(self):
+        # Run the suite on the smallest size and check the results file
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_path = os.path.join(tmp_dir, "bench.json")
+            main(["--sizes", "720", "--repeat", "1", "--output", output_path])
+
+            with open(output_path, "r") as file:
+                output = json.load(file)
+
+        benchmarks = [item["benchmark"] for item in output["results"]]
+        self.assertTrue("app_run" in benchmarks and "display_graph_hit" in benchmarks)
+        self.assertTrue(all(item["seconds"] > 0 for item in output["results"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import time
+import unittest
+import threading
+import pandas as pd
+
+from crypto_analysis.cache import DataCache, cache_key
+
+
+# Manual clock to control expiration
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestDataCache(unittest.TestCase):
+    def setUp(self):
+        # Initialize cache
+        self.clock = FakeClock()
+        self.cache = DataCache(max_entries=2, clock=self.clock)
+
+    def test_cache_key(self):
+        # Check every parameter is part of the key
+        self.assertTrue(cache_key("raw", "BTCUSD", 60) != cache_key("raw", "BTCUSD", 1440))
+        self.assertTrue(cache_key("raw", "BTCUSD", 60) != cache_key("raw", "BTCUSD", 60, since=1))
+        self.assertTrue(cache_key("raw", "BTCUSD", 60, a=1, b=2) == cache_key("raw", "BTCUSD", 60, b=2, a=1))
+
+    def test_hit_miss(self):
+        # Check counters
+        self.assertTrue(self.cache.get("a") is None)
+        self.cache.set("a", 1)
+        self.assertTrue(self.cache.get("a") == 1)
+        self.assertTrue(self.cache.stats()["hits"] == 1)
+        self.assertTrue(self.cache.stats()["misses"] == 1)
+
+    def test_expiration(self):
+        # Check entries expire after ttl
+        self.cache.set("a", 1, ttl=60)
+        self.clock.now = 59
+        self.assertTrue(self.cache.get("a") == 1)
+        self.clock.now = 60
+        self.assertTrue(self.cache.get("a") is None)
+        self.assertTrue(self.cache.expirations == 1)
+        self.assertTrue(len(self.cache) == 0)
+
+    def test_lru_eviction(self):
+        # Check least recently used entry is evicted
+        self.cache.set("a", 1)
+        self.cache.set("b", 2)
+        self.cache.get("a")
+        self.cache.set("c", 3)
+        self.assertTrue("a" in self.cache and "c" in self.cache)
+        self.assertTrue("b" not in self.cache)
+        self.assertTrue(self.cache.evictions == 1)
+
+    def test_memory_budget(self):
+        # Check memory limit
+        data = pd.DataFrame({"close": range(1000)})
+        cache = DataCache(max_entries=10, max_bytes=int(data.memory_usage(deep=True).sum() * 1.5))
+        cache.set("a", data)
+        cache.set("b", data.copy())
+        self.assertTrue(len(cache) == 1)
+        self.assertTrue(cache.nbytes <= cache.max_bytes)
+
+    def test_invalidate(self):
+        # Check invalidation by pair
+        cache = DataCache()
+        cache.set(cache_key("raw", "BTCUSD", 60), 1)
+        cache.set(cache_key("raw", "ETHUSD", 60), 2)
+        cache.invalidate(pair="BTCUSD")
+        self.assertTrue(len(cache) == 1)
+
+        # Check invalidation by kind of result
+        cache.set(cache_key("figure", "ETHUSD", 60), 3)
+        cache.invalidate(pair="ETHUSD", kind="figure")
+        self.assertTrue(cache.get(cache_key("raw", "ETHUSD", 60)) == 2)
+        self.assertTrue(cache.get(cache_key("figure", "ETHUSD", 60)) is None)
+
+    def test_get_or_compute(self):
+        # Concurrent misses of the same key share one computation
+        cache = DataCache()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return "value"
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get_or_compute("a", compute))) for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertTrue(len(calls) == 1)
+        self.assertTrue(results == ["value"] * 8)
+        self.assertTrue(cache.coalesced == 7)
+
+    def test_get_or_compute_error(self):
+        # Errors are raised and nothing is cached
+        cache = DataCache()
+
+        def compute():
+            raise ValueError("API error")
+
+        with self.assertRaises(ValueError):
+            cache.get_or_compute("a", compute)
+        self.assertTrue(len(cache) == 0 and len(cache.in_flight) == 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
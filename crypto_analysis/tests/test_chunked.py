@@ -0,0 +1,127 @@
+import os
+import tempfile
+import unittest
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+from helpers import random_candles, offline_model
+
+from crypto_analysis.model import CryptoAnalysisModel
+from crypto_analysis.store import CandleStore, candles_to_frame, frame_to_candles
+from crypto_analysis.indicators import IndicatorPanel, stochastic_oscillator
+from crypto_analysis.chunked import (
+    INDICATOR_DTYPE,
+    SIGNAL_COLUMNS,
+    ChunkedStochastic,
+    compute_chunked,
+    record_chunks,
+    rows_to_frame,
+)
+
+
+def assert_rows_equal(rows, expected):
+    # Every field bit-identical, NaN included
+    for name in INDICATOR_DTYPE.names:
+        np.testing.assert_array_equal(rows[name], expected[name])
+
+
+class TestChunked(unittest.TestCase):
+    def setUp(self):
+        # Random walk candles as records
+        self.candles = frame_to_candles(random_candles(3000, 5).assign(vwap=lambda data: data["close"], count=3))
+        self.expected = ChunkedStochastic(26, 14, 3).update(self.candles)
+
+    def test_bit_identical(self):
+        # Any chunk size, even smaller than the windows, gives the rows of a single pass
+        for chunk_rows in [1, 10, 27, 500, 2999]:
+            state = ChunkedStochastic(26, 14, 3)
+            rows = np.concatenate([state.update(chunk) for chunk in record_chunks(self.candles, chunk_rows)])
+            assert_rows_equal(rows, self.expected)
+
+        # Same as the in-memory panel computation
+        frame = IndicatorPanel.from_frames({"BTCUSD": candles_to_frame(self.candles)}, 26, 14, 3).frame("BTCUSD")
+        pd.testing.assert_frame_equal(rows_to_frame(self.expected), frame, check_exact=True)
+
+        # Same rows and signals as compute_indicators
+        data = stochastic_oscillator(candles_to_frame(self.candles), 26, 14, 3)
+        self.assertTrue(np.array_equal(rows_to_frame(self.expected)["date"], data["date"]))
+        self.assertTrue(np.array_equal(self.expected["Buy_Signal"], data["Buy_Signal"]))
+        np.testing.assert_allclose(self.expected["pctD"], data["pctD"])
+
+    def test_flat_candles(self):
+        # Flat runs, leaving rows without %K, across chunk boundaries
+        data = candles_to_frame(self.candles.copy())
+        for start in [1000, 1500]:
+            data.loc[start : start + 20, ["open", "high", "low", "close"]] = data.loc[start, "close"]
+        candles = frame_to_candles(data)
+        expected = ChunkedStochastic(26, 14, 3).update(candles)
+
+        for chunk_rows in [1, 10, 1020]:
+            state = ChunkedStochastic(26, 14, 3)
+            rows = np.concatenate([state.update(chunk) for chunk in record_chunks(candles, chunk_rows)])
+            assert_rows_equal(rows, expected)
+
+        # Same signals as compute_indicators, from the previous complete row
+        data = stochastic_oscillator(data, 26, 14, 3)
+        self.assertTrue(len(data) == len(expected))
+        for column in SIGNAL_COLUMNS:
+            self.assertTrue(np.array_equal(expected[column], data[column]))
+
+    def test_store(self):
+        # Memory-mapped store candles, written chunk by chunk as records
+        with tempfile.TemporaryDirectory() as directory:
+            model = CryptoAnalysisModel()
+            model.store = CandleStore(directory)
+            model.store.append("BTCUSD", 1440, self.candles)
+
+            path = model.compute_indicators_chunked("BTCUSD", interval=1440, chunk_rows=256)
+            self.assertTrue(path == os.path.join(directory, "indicators", "BTCUSD_1440.bin"))
+            self.assertTrue(len(model.store) == 1)
+            rows = np.memmap(path, dtype=INDICATOR_DTYPE, mode="r")
+            assert_rows_equal(rows, self.expected)
+            del rows
+
+    def test_parquet(self):
+        # Parquet candles in, Parquet rows out
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, "candles.parquet")
+            candles_to_frame(self.candles).to_parquet(source, index=False, row_group_size=700)
+
+            model = offline_model()
+            path = os.path.join(directory, "indicators.parquet")
+            model.compute_indicators_chunked("BTCUSD", interval=1440, path=path, source=source, chunk_rows=400)
+            pd.testing.assert_frame_equal(pd.read_parquet(path), rows_to_frame(self.expected), check_exact=True)
+
+    def test_peak_memory(self):
+        # Peak memory follows the chunk size, not the history length
+        candles = frame_to_candles(random_candles(40000, 6).assign(vwap=0.0, count=1))
+
+        def peak(chunk_rows):
+            with tempfile.TemporaryDirectory() as directory:
+                candles.tofile(os.path.join(directory, "candles.bin"))
+                stored = np.memmap(os.path.join(directory, "candles.bin"), dtype=candles.dtype, mode="r")
+                tracemalloc.start()
+                compute_chunked(record_chunks(stored, chunk_rows), os.path.join(directory, "rows.bin"), 26, 14, 3)
+                _, peak_bytes = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                del stored
+            return peak_bytes
+
+        self.assertTrue(peak(1000) * 10 < peak(40000))
+
+    def test_failure(self):
+        # Nothing is left behind when a chunk fails
+        def chunks():
+            yield self.candles[:1000]
+            raise ValueError("Corrupted chunk")
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "rows.bin")
+            with self.assertRaises(ValueError):
+                compute_chunked(chunks(), path, 26, 14, 3)
+            self.assertTrue(not os.path.exists(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import sys
+import tempfile
+import unittest
+import subprocess
+import pandas as pd
+
+from helpers import random_candles, offline_model, StubConnection
+
+from crypto_analysis.cli import DEFAULT_CONFIG, compute_signals, write_signals, output_format, main
+
+
+class TestCli(unittest.TestCase):
+    def setUp(self):
+        # Offline model serving cached candles
+        self.model = offline_model({pair: random_candles(100, i) for i, pair in enumerate(["BTCUSD", "ETHUSD"])})
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_compute_signals(self):
+        # Rows of every pair, and errors of unknown pairs
+        self.model.connection = StubConnection([ConnectionError("Kraken unreachable")])
+        signals, errors = compute_signals(self.model, ["BTCUSD", "ETHUSD", "NOPE"], interval=1440)
+        self.assertTrue(set(signals["pair"]) == {"BTCUSD", "ETHUSD"})
+        self.assertTrue(list(errors) == ["NOPE"])
+        self.assertTrue("Buy_Signal" in signals.columns)
+
+        # Newest row only
+        latest, _ = compute_signals(self.model, ["BTCUSD", "ETHUSD"], interval=1440, latest=True)
+        self.assertTrue(len(latest) == 2)
+
+    def test_write_signals(self):
+        # Every format is read back
+        signals, _ = compute_signals(self.model, ["BTCUSD", "ETHUSD"], interval=1440)
+        for name, read in [
+            ("signals.csv", pd.read_csv),
+            ("signals.jsonl", lambda path: pd.read_json(path, lines=True)),
+        ]:
+            path = os.path.join(self.tmp_dir.name, name)
+            write_signals(signals, path)
+            self.assertTrue(len(read(path)) == len(signals))
+
+        self.assertTrue(output_format("signals.parquet") == "parquet")
+        self.assertTrue(output_format("signals.txt", "jsonl") == "jsonl")
+
+    def test_headless_imports(self):
+        # The command line doesn't load the dashboard libraries
+        code = (
+            "import sys, crypto_analysis.cli, crypto_analysis.model; "
+            "print('streamlit' in sys.modules, 'plotly' in sys.modules)"
+        )
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+        self.assertTrue(output.strip() == "False False")
+
+
+    def test_config(self):
+        # The project config is found from any working directory, a missing one is an error
+        self.assertTrue(os.path.isabs(DEFAULT_CONFIG) and os.path.exists(DEFAULT_CONFIG))
+        with self.assertRaises(SystemExit):
+            main(["BTCUSD", "--config", os.path.join(self.tmp_dir.name, "config.yml")])
+
+
+if __name__ == "__main__":
+    unittest.main()
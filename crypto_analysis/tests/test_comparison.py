@@ -0,0 +1,68 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+from helpers import random_candles
+
+from crypto_analysis.indicators import IndicatorPanel, align_frames, stochastic_oscillator
+from crypto_analysis.comparison import (
+    normalize_prices,
+    log_returns,
+    correlation_matrix,
+    cross_sectional_rank,
+    rank_pairs,
+)
+
+
+class TestComparison(unittest.TestCase):
+    def setUp(self):
+        # Pairs with different history lengths, aligned on their shared timestamps
+        self.frames = {
+            "BTCUSD": random_candles(300, 1),
+            "ETHUSD": random_candles(200, 2, start="2023-04-01"),
+            "XRPUSD": random_candles(120, 3, start="2023-02-01"),
+        }
+        self.dates, self.arrays = align_frames(self.frames)
+        self.close = pd.DataFrame(self.arrays["close"], index=self.dates, columns=list(self.frames))
+
+    def test_normalize_prices(self):
+        # Every pair starts at 100 at its first candle
+        normalized = normalize_prices(self.close.to_numpy())
+        for j, frame in enumerate(self.frames.values()):
+            values = normalized[:, j][~np.isnan(normalized[:, j])]
+            self.assertTrue(values[0] == 100 and len(values) == len(frame))
+            np.testing.assert_allclose(values, frame["close"].to_numpy() / frame["close"].iloc[0] * 100)
+
+    def test_correlation_matrix(self):
+        # Same as pandas, over the rows shared by every pair of columns
+        returns = log_returns(self.close.to_numpy())
+        expected = pd.DataFrame(returns).corr().to_numpy()
+        np.testing.assert_allclose(correlation_matrix(returns), expected, rtol=1e-9)
+
+        # Pairs without enough shared rows
+        returns[:, 2] = np.nan
+        correlation = correlation_matrix(returns)
+        self.assertTrue(np.isnan(correlation[2]).all() and np.isnan(correlation[:, 2]).all())
+        self.assertTrue(correlation[0, 0] == 1)
+
+    def test_cross_sectional_rank(self):
+        # Ranks from 0 to 1 within every row, ties averaged and NaN kept
+        values = np.array([[3.0, 1.0, 2.0], [1.0, np.nan, 1.0], [np.nan, 5.0, np.nan], [np.nan] * 3])
+        expected = np.array([[1.0, 0.0, 0.5], [0.5, np.nan, 0.5], [np.nan, 1.0, np.nan], [np.nan] * 3])
+        np.testing.assert_array_equal(cross_sectional_rank(values), expected)
+
+    def test_rank_pairs(self):
+        # Lowest %K first, ranked from 0 to 1
+        ranking = rank_pairs(IndicatorPanel.from_frames(self.frames, 26, 14, 3))
+        self.assertTrue(ranking["pctK"].is_monotonic_increasing)
+        self.assertTrue(ranking["rank"].tolist() == [0.0, 0.5, 1.0])
+
+        # A missing candle doesn't change the last %K of a pair
+        frames = dict(self.frames, BTCUSD=self.frames["BTCUSD"].drop(index=290))
+        gapped = rank_pairs(IndicatorPanel.from_frames(frames, 26, 14, 3)).set_index("pair")
+        expected = stochastic_oscillator(frames["BTCUSD"], 26, 14, 3)["pctK"].iloc[-1]
+        self.assertTrue(np.isclose(gapped.loc["BTCUSD", "pctK"], expected))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+import numpy as np
+import pandas as pd
+from datetime import date
+
+from helpers import random_candles
+
+from crypto_analysis.dateindex import DateIndex
+
+
+class TestDateIndex(unittest.TestCase):
+    def setUp(self):
+        # Daily candles
+        self.data = random_candles(100, 3)
+        self.index = DateIndex(self.data)
+
+    def test_bounds(self):
+        # Oldest and newest dates
+        self.assertTrue(self.index.bounds() == (self.data["date"].min(), self.data["date"].max()))
+        self.assertTrue(DateIndex(self.data.iloc[:0]).bounds() == (None, None))
+
+    def test_slice(self):
+        # Same rows as a boolean filter, both bounds included
+        for start, end in [
+            (self.data["date"].iloc[10], self.data["date"].iloc[20]),
+            (self.data["date"].iloc[10] + pd.Timedelta(hours=1), self.data["date"].iloc[20] - pd.Timedelta(hours=1)),
+            (self.data["date"].iloc[0] - pd.Timedelta(days=30), self.data["date"].iloc[-1] + pd.Timedelta(days=30)),
+            (self.data["date"].iloc[20], self.data["date"].iloc[10]),
+        ]:
+            expected = self.data[self.data["date"].between(start, end)]
+            pd.testing.assert_frame_equal(self.index.slice(self.data, start, end), expected)
+
+        # Dates as picked in the date inputs, and open bounds
+        start = self.data["date"].iloc[50]
+        sliced = self.index.slice(self.data, date(start.year, start.month, start.day))
+        self.assertTrue(len(sliced) == 50 and sliced["date"].iloc[0] == start)
+        self.assertTrue(len(self.index.slice(self.data)) == len(self.data))
+
+    def test_slice_view(self):
+        # Sliced rows share the memory of the candles
+        sliced = self.index.slice(self.data, self.data["date"].iloc[10], self.data["date"].iloc[20])
+        self.assertTrue(np.shares_memory(sliced["close"].to_numpy(), self.data["close"].to_numpy()))
+
+    def test_unsorted(self):
+        # Unsorted dates can't be searched
+        with self.assertRaises(ValueError):
+            DateIndex(self.data.iloc[::-1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+import numpy as np
+
+from helpers import random_candles
+from crypto_analysis.indicators import stochastic_oscillator
+from crypto_analysis.downsample import aggregate_ohlc, bucket_starts, downsample_lines, lttb_indices
+
+
+class TestDownsample(unittest.TestCase):
+    def setUp(self):
+        # Candles with indicators and signals
+        self.data = stochastic_oscillator(random_candles(5000, 3), 26, 14, 3)
+
+    def test_bucket_starts(self):
+        # Check bucket boundaries
+        self.assertTrue(list(bucket_starts(10, 5)) == [0, 2, 4, 6, 8])
+        self.assertTrue(list(bucket_starts(3, 5)) == [0, 1, 2])
+
+        # Buckets of the same size, only the last one shorter
+        self.assertTrue(list(bucket_starts(11, 5)) == [0, 3, 6, 9])
+        self.assertTrue(set(np.diff(bucket_starts(695, 500))) == {2})
+
+    def test_aggregate_ohlc(self):
+        # Check aggregated candles
+        candles = aggregate_ohlc(self.data, 100)
+        self.assertTrue(len(candles) == 100)
+        self.assertTrue(candles["open"].iloc[0] == self.data["open"].iloc[0])
+        self.assertTrue(candles["close"].iloc[-1] == self.data["close"].iloc[-1])
+        self.assertTrue(candles["high"].max() == self.data["high"].max())
+        self.assertTrue(candles["low"].min() == self.data["low"].min())
+        self.assertTrue(np.isclose(candles["volume"].sum(), self.data["volume"].sum()))
+        self.assertTrue(candles["date"].is_monotonic_increasing)
+
+        # Small frames are returned as they are
+        self.assertTrue(aggregate_ohlc(self.data, 10000) is self.data)
+
+        # Every aggregated candle spans the same number of candles
+        dates = aggregate_ohlc(self.data.iloc[:695], 500)["date"]
+        self.assertTrue(len(dates) == 348 and dates.diff().iloc[1:].nunique() == 1)
+
+    def test_lttb_indices(self):
+        # Check selected points
+        x = np.arange(1000, dtype=np.float64)
+        y = np.sin(x / 50)
+        y[500] = 10
+        indices = lttb_indices(x, y, 100)
+        self.assertTrue(len(indices) == 100)
+        self.assertTrue(indices[0] == 0 and indices[-1] == 999)
+        self.assertTrue(np.all(np.diff(indices) > 0))
+
+        # Peaks are kept
+        self.assertTrue(500 in indices)
+
+    def test_downsample_lines(self):
+        # Check signal rows are kept
+        lines = downsample_lines(self.data, "pctK", 200)
+        signals = self.data[(self.data["Buy_Signal"] == 1) | (self.data["Sell_Signal"] == 1)]
+        self.assertTrue(len(signals) > 0)
+        self.assertTrue(set(signals["date"]).issubset(set(lines["date"])))
+        self.assertTrue(lines["date"].is_monotonic_increasing)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import json
+import unittest
+import pandas as pd
+
+from helpers import random_candles, offline_model
+
+from crypto_analysis.store import frame_to_candles
+from crypto_analysis.cache import cache_key
+from crypto_analysis.figures import FigureWarmer
+from crypto_analysis.utils import default_dates
+
+
+class TestFigures(unittest.TestCase):
+    def setUp(self):
+        # Offline model serving cached candles
+        self.candles = random_candles(400, 7).assign(vwap=lambda data: data["close"], count=1)
+        self.model = offline_model({pair: self.candles.iloc[:390].copy() for pair in ["BTCUSD", "ETHUSD"]})
+
+    def test_figure_json(self):
+        # Figure JSON of the date range
+        figure_json = self.model.get_figure_json("BTCUSD", interval=1440, start_date="2023-03-01")
+        figure = json.loads(figure_json)
+        self.assertTrue(figure["data"][0]["type"] == "candlestick")
+        self.assertTrue(figure["data"][0]["x"][0].startswith("2023-03-01"))
+
+        # Dates picking the same rows share the cached JSON
+        self.assertTrue(
+            self.model.get_figure_json("BTCUSD", interval=1440, start_date="2023-02-28 12:00") is figure_json
+        )
+        self.assertTrue(self.model.get_figure_json("BTCUSD", interval=1440) is not figure_json)
+
+        # The built figure is cached with its JSON
+        chart = self.model.get_figure("BTCUSD", interval=1440, start_date="2023-03-01")
+        self.assertTrue(chart is self.model.get_figure("BTCUSD", interval=1440, start_date="2023-02-28 12:00"))
+        self.assertTrue(chart.to_json() == figure_json)
+
+    def test_new_candles(self):
+        # Cached figures are dropped when candles of the pair arrive
+        figure_json = self.model.get_figure_json("BTCUSD", interval=1440)
+        other_json = self.model.get_figure_json("ETHUSD", interval=1440)
+        self.model.merge_candles(frame_to_candles(self.candles.iloc[390:]), "BTCUSD", interval=1440)
+
+        self.assertTrue(self.model.data_cache.peek(cache_key("figure", "BTCUSD", 1440, rows=(0, 390 - 25))) is None)
+        self.assertTrue(self.model.get_figure_json("ETHUSD", interval=1440) is other_json)
+
+        # The new figure shows the new candles
+        figure = json.loads(self.model.get_figure_json("BTCUSD", interval=1440))
+        self.assertTrue(figure_json != json.dumps(figure))
+        self.assertTrue(len(figure["data"][0]["x"]) == 400 - 25)
+
+    def test_warmer(self):
+        # Default range of every pair rendered, failing pairs skipped
+        warmer = FigureWarmer(self.model, pairs=["BTCUSD", "ETHUSD"], interval=1440)
+        self.assertTrue(warmer.warm() == 2)
+        key = cache_key("figure", "ETHUSD", 1440, rows=(0, 390 - 25))
+        self.assertTrue(self.model.data_cache.peek(key) is not None)
+
+        # Hourly candles past midnight today, where the default range of the app ends
+        hours = random_candles(400, 8).assign(vwap=lambda data: data["close"], count=1)
+        noon = pd.Timestamp.today().normalize() + pd.Timedelta(hours=12)
+        hours["date"] = pd.date_range(end=noon, periods=400, freq="h")
+        offline_model({"BTCUSD": hours}, interval=60, model=self.model)
+        FigureWarmer(self.model, pairs=["BTCUSD"], interval=60).warm()
+
+        # The warmed figure is the one the app asks for
+        data = self.model.compute_indicators(pair="BTCUSD", interval=60)
+        start_date, end_date = default_dates(self.model.date_index(data).bounds())
+        first, last = self.model.date_index(data).positions(start_date, end_date)
+        self.assertTrue(last < len(data))
+        self.assertTrue(self.model.data_cache.peek(cache_key("figure", "BTCUSD", 60, rows=(first, last))) is not None)
+
+        # Background rounds until stopped
+        warmer.period = 0.01
+        warmer.start()
+        warmer.stop()
+        warmer.thread.join(timeout=5)
+        self.assertTrue(not warmer.thread.is_alive() and warmer.rounds >= 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
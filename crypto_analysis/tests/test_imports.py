@@ -0,0 +1,71 @@
+import sys
+import unittest
+import subprocess
+
+# Libraries loaded only by the features that use them
+LAZY_MODULES = ["plotly", "streamlit", "requests", "krakenex", "yaml", "websockets"]
+
+# Total import time of the package on top of numpy and pandas, every other dependency included, in microseconds
+IMPORT_BUDGET_US = 75_000
+
+
+def import_times(code):
+    """
+    Run code in a new interpreter with -X importtime. Returns the cumulative time, in
+    microseconds, of every module imported by the code itself (not by another module).
+    """
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, check=True
+    ).stderr
+
+    times = {}
+    for line in output.splitlines()[1:]:
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if not name.startswith("  "):
+            times[name.strip()] = int(cumulative)
+
+    return times
+
+
+def loaded_packages(code):
+    """
+    Run code in a new interpreter. Returns the top-level packages it loaded, standard
+    library excluded.
+    """
+    output = subprocess.run(
+        [sys.executable, "-c", f"import sys; {code}; print(' '.join(sys.modules))"],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+
+    packages = {name.split(".")[0] for name in output.split()}
+    return {name for name in packages if name not in sys.stdlib_module_names and not name.startswith("_")}
+
+
+class TestImports(unittest.TestCase):
+    def test_model_import(self):
+        # Data-only use loads numpy and pandas (with what they load themselves) and nothing else
+        packages = loaded_packages("import crypto_analysis.model")
+        self.assertTrue(packages == loaded_packages("import numpy, pandas") | {"crypto_analysis"})
+        self.assertTrue(packages.isdisjoint(LAZY_MODULES))
+
+        # The package and any other dependency it loads stay within the budget
+        times = import_times("import numpy, pandas; import crypto_analysis.model")
+        total_time = sum(time for name, time in times.items() if name.startswith("crypto_analysis"))
+        self.assertTrue(total_time < IMPORT_BUDGET_US)
+
+    def test_cli_import(self):
+        # The headless command loads the same packages as the model
+        packages = loaded_packages("import crypto_analysis.cli")
+        self.assertTrue(packages == loaded_packages("import crypto_analysis.model"))
+
+        times = import_times("import numpy, pandas; import crypto_analysis.cli")
+        total_time = sum(time for name, time in times.items() if name.startswith("crypto_analysis"))
+        self.assertTrue(total_time < IMPORT_BUDGET_US)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+from helpers import random_candles
+
+from crypto_analysis.indicators import (
+    IndicatorPanel,
+    stochastic_oscillator,
+    rolling_window,
+    align_frames,
+    data_version,
+    extends_version,
+    extend_stochastic_oscillator,
+)
+
+
+class TestIndicators(unittest.TestCase):
+    def setUp(self):
+        # Pairs with different history lengths
+        self.frames = {
+            "BTCUSD": random_candles(300, 1),
+            "ETHUSD": random_candles(200, 2, start="2023-04-01"),
+            "XRPUSD": random_candles(120, 3, start="2023-02-01"),
+        }
+
+    def test_rolling_window(self):
+        # Check against pandas rolling
+        values = np.arange(10, dtype=float)
+        expected = pd.Series(values).rolling(3).max().to_numpy()
+        np.testing.assert_array_equal(rolling_window(values, 3, np.max), expected)
+
+        # Window longer than the data
+        self.assertTrue(np.isnan(rolling_window(values, 20, np.mean)).all())
+
+    def test_align_frames(self):
+        # Check shared timestamps
+        dates, arrays = align_frames(self.frames)
+        self.assertTrue(arrays["close"].shape == (len(dates), 3))
+        self.assertTrue(np.isnan(arrays["close"][0, 1]))
+        self.assertTrue(arrays["close"][0, 0] == self.frames["BTCUSD"]["close"][0])
+
+    def test_panel_frame(self):
+        # Check every pair against the single pair computation
+        panel = IndicatorPanel.from_frames(self.frames, 26, 14, 3)
+        for pair, raw_data in self.frames.items():
+            expected_output = stochastic_oscillator(raw_data, 26, 14, 3)
+            pd.testing.assert_frame_equal(panel.frame(pair), expected_output, check_exact=False)
+
+    def test_panel_missing_candles(self):
+        # A pair missing candles gets the indicators of its own candles
+        frames = dict(self.frames, ETHUSD=self.frames["ETHUSD"].drop(index=[100, 150]).reset_index(drop=True))
+        panel = IndicatorPanel.from_frames(frames, 26, 14, 3)
+        for pair, raw_data in frames.items():
+            expected_output = stochastic_oscillator(raw_data, 26, 14, 3)
+            pd.testing.assert_frame_equal(panel.frame(pair), expected_output, check_exact=False)
+        self.assertTrue(len(panel.frame("ETHUSD")) == 198 - 25)
+        self.assertTrue(panel.latest()["pair"].tolist().count("ETHUSD") == 1)
+
+    def test_panel_flat_candles(self):
+        # Flat candles leave rows without %K, the signals skip them like the dropped rows
+        raw_data = self.frames["BTCUSD"].copy()
+        for start in [85, 154]:
+            raw_data.loc[start : start + 20, ["open", "high", "low", "close"]] = raw_data.loc[start, "close"]
+        expected_output = stochastic_oscillator(raw_data, 26, 14, 3)
+        self.assertTrue(len(expected_output) < 300 - 25)
+
+        panel = IndicatorPanel.from_frames(dict(self.frames, BTCUSD=raw_data), 26, 14, 3)
+        pd.testing.assert_frame_equal(panel.frame("BTCUSD"), expected_output, check_exact=False)
+
+    def test_panel_latest(self):
+        # Check ranking by %K
+        panel = IndicatorPanel.from_frames(self.frames, 26, 14, 3)
+        latest = panel.latest()
+        self.assertTrue(set(latest["pair"]) == set(self.frames))
+        self.assertTrue(latest["pctK"].is_monotonic_increasing)
+        self.assertTrue(
+            latest.loc[latest["pair"] == "BTCUSD", "pctK"].iloc[0] == panel.frame("BTCUSD")["pctK"].iloc[-1]
+        )
+
+    def test_panel_slice(self):
+        # Rows of the date range, as views of the panel arrays
+        panel = IndicatorPanel.from_frames(self.frames, 26, 14, 3)
+        sliced = panel.slice("2023-04-15", "2023-06-30")
+        self.assertTrue(sliced.dates[0] == np.datetime64("2023-04-15"))
+        self.assertTrue(sliced.dates[-1] == np.datetime64("2023-06-30"))
+        self.assertTrue(sliced.pairs == panel.pairs and len(sliced.dates) == 77)
+        self.assertTrue(np.shares_memory(sliced.arrays["close"], panel.arrays["close"]))
+        self.assertTrue(len(panel.slice("2024-01-01").dates) == 0)
+
+    def test_data_version(self):
+        # Check versions of growing candles
+        raw_data = self.frames["BTCUSD"]
+        version = data_version(raw_data.iloc[:250])
+        self.assertTrue(version == data_version(raw_data.iloc[:250].copy()))
+        self.assertTrue(version != data_version(raw_data.iloc[:251]))
+        self.assertTrue(extends_version(version, raw_data))
+        self.assertTrue(not extends_version(version, raw_data.iloc[1:]))
+        self.assertTrue(not extends_version(data_version(raw_data.iloc[:0]), raw_data))
+
+    def test_extend_stochastic_oscillator(self):
+        # Extended result equals the full computation
+        raw_data = self.frames["BTCUSD"]
+        data = stochastic_oscillator(raw_data.iloc[:250], 26, 14, 3)
+        extended = extend_stochastic_oscillator(data, raw_data, raw_data["date"].iat[249], 26, 14, 3)
+        pd.testing.assert_frame_equal(extended, stochastic_oscillator(raw_data, 26, 14, 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import os
+import json
+import asyncio
+import tempfile
+import unittest
+import threading
+import websockets
+
+from helpers import random_candles, offline_model, StubConnection
+
+from crypto_analysis.live import LiveOHLCFeed
+from crypto_analysis.store import CandleStore, candles_to_frame, frame_to_candles, parse_candles
+from crypto_analysis.streaming import StochasticState
+
+FRAMES_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "kraken_ws_ohlc.jsonl")
+
+
+class TestLiveOHLCFeed(unittest.TestCase):
+    def setUp(self):
+        # Offline model with two cached daily candles
+        self.model = offline_model()
+        self.model.pair_catalogue.metadata = {"XXBTZUSD": {"altname": "XBTUSD", "wsname": "XBT/USD"}}
+        self.rows = [
+            [1641340800, "45", "47", "42", "43", "44", "40", 10],
+            [1641427200, "43", "43", "42", "43", "43", "47", 20],
+        ]
+        self.model.connection = StubConnection([{"error": [], "result": {"XXBTZUSD": self.rows, "last": 1641340800}}])
+        self.model.get_data("BTCUSD", interval=1440)
+
+        # Recorded websocket frames
+        with open(FRAMES_PATH, "r") as file:
+            self.frames = [line.strip() for line in file if line.strip()]
+
+    def replay(self, feed):
+        # Local websocket server replaying the recorded frames
+        async def handler(websocket):
+            self.subscription = json.loads(await websocket.recv())
+            for frame in self.frames:
+                await websocket.send(frame)
+
+        async def main():
+            async with websockets.serve(handler, "localhost", 0) as server:
+                feed.url = f"ws://localhost:{server.sockets[0].getsockname()[1]}"
+                await asyncio.wait_for(feed.listen(max_messages=len(self.frames)), timeout=10)
+
+        asyncio.run(main())
+
+    def test_concurrent_merges(self):
+        # Live feed and alert engine merging the same candles from their threads
+        state = self.model.get_indicator_state("BTCUSD", interval=1440)
+        candles = frame_to_candles(random_candles(100, 8, start="2022-01-06").assign(vwap=0.0, count=1))
+        expected = StochasticState.from_config(self.model.config)
+        for candle in self.model.get_data("BTCUSD", interval=1440).iloc[:-1].to_dict("records"):
+            expected.update(candle)
+        for candle in candles_to_frame(candles).to_dict("records"):
+            expected.update(candle)
+
+        errors = []
+
+        def merge():
+            try:
+                for i in range(len(candles)):
+                    self.model.merge_candles(candles[max(0, i - 1) : i + 1], "BTCUSD", interval=1440)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=merge) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertTrue(errors == [])
+        self.assertTrue(state.candle["date"] == expected.candle["date"])
+        self.assertTrue(state.previous["pctK"] == expected.previous["pctK"])
+        self.assertTrue(state.row["pctD"] == expected.row["pctD"])
+
+    def test_empty_store(self):
+        # Live candles merged before the history is downloaded don't replace it
+        with tempfile.TemporaryDirectory() as directory:
+            model = offline_model()
+            model.store = CandleStore(directory)
+            model.merge_candles(parse_candles([[1641427200, "43", "44", "42", "44", "43", "50", 21]]), "BTCUSD", 1440)
+            self.assertTrue(model.store.get_cursor("BTCUSD", 1440) is None)
+
+            model.connection = StubConnection([{"error": [], "result": {"XXBTZUSD": self.rows, "last": 1641340800}}])
+            data = model.get_data("BTCUSD", interval=1440)
+            self.assertTrue("since" not in model.connection.calls[0][1])
+            self.assertTrue(len(data) == 2)
+
+            # Once the history is stored, live candles are saved too
+            model.merge_candles(parse_candles([[1641513600, "43", "43", "40", "41", "41", "5", 2]]), "BTCUSD", 1440)
+            self.assertTrue(len(model.store.read("BTCUSD", 1440)) == 3)
+
+    def test_subscription(self):
+        # Check websocket pair names
+        feed = LiveOHLCFeed(self.model, ["BTCUSD"], interval=1440)
+        self.assertTrue(feed.subscription()["pair"] == ["XBT/USD"])
+        self.assertTrue(feed.subscription()["subscription"] == {"name": "ohlc", "interval": 1440})
+
+    def test_replay(self):
+        # Replay frames into the model
+        feed = LiveOHLCFeed(self.model, ["BTCUSD"], interval=1440)
+        self.replay(feed)
+
+        self.assertTrue(self.subscription["event"] == "subscribe")
+        self.assertTrue(feed.messages == len(self.frames))
+        self.assertTrue(feed.updates == 3)
+
+        # Running candle updated in place and new candle appended
+        data = self.model.get_data("BTCUSD", interval=1440)
+        self.assertTrue(len(data) == 4)
+        self.assertTrue(data["close"].tolist() == [43.0, 43.0, 44.5, 45.5])
+        self.assertTrue(data["volume"].iloc[2] == 65.0)
+        self.assertTrue(len(self.model.connection.calls) == 1)
+
+    def test_indicators_updated(self):
+        # Memoized and incremental indicators follow the new candles
+        params = {"window_size_ma": 2, "stochastic_window": 2, "stochastic_nmean": 1}
+        data = self.model.compute_indicators("BTCUSD", interval=1440, **params)
+        state = self.model.get_indicator_state("BTCUSD", interval=1440)
+
+        feed = LiveOHLCFeed(self.model, ["BTCUSD"], interval=1440)
+        self.replay(feed)
+
+        new_data = self.model.compute_indicators("BTCUSD", interval=1440, **params)
+        self.assertTrue(len(new_data) == len(data) + 2)
+        self.assertTrue(new_data["close"].iloc[-1] == 45.5)
+        self.assertTrue(state.candle["close"] == 45.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
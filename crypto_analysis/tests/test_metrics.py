@@ -0,0 +1,115 @@
+import json
+import logging
+import unittest
+
+from helpers import random_candles, offline_model
+
+from crypto_analysis.metrics import Metrics, metrics
+
+
+# Fake clock, one second per call
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        self.now += 1.0
+        return self.now
+
+
+# Test Metrics class
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.metrics = Metrics(clock=FakeClock())
+
+    def test_span(self):
+        # Nested spans are timed and traced with their depth
+        trace = self.metrics.start_trace()
+        with self.metrics.span("outer"):
+            with self.metrics.span("inner", pair="BTCUSD"):
+                pass
+        self.assertTrue(self.metrics.stop_trace() is trace)
+
+        self.assertTrue([record["span"] for record in trace] == ["inner", "outer"])
+        self.assertTrue([record["depth"] for record in trace] == [1, 0])
+        self.assertTrue(trace[0]["pair"] == "BTCUSD" and trace[0]["seconds"] == 1.0)
+        self.assertTrue(trace[1]["start"] < trace[0]["start"] and trace[1]["seconds"] == 3.0)
+
+        # Spans outside a trace are only aggregated
+        with self.metrics.span("outer"):
+            pass
+        self.assertTrue(len(trace) == 2)
+        self.assertTrue(self.metrics.snapshot()["spans"]["outer"] == {"count": 2, "sum": 4.0, "max": 3.0})
+
+    def test_span_error(self):
+        # Failed spans are timed and keep the error
+        trace = self.metrics.start_trace()
+        with self.assertRaises(ValueError):
+            with self.metrics.span("failing"):
+                raise ValueError("no data")
+        self.metrics.stop_trace()
+
+        self.assertTrue(trace[0]["error"] == "no data")
+        self.assertTrue(self.metrics.snapshot()["spans"]["failing"]["count"] == 1)
+
+    def test_timed(self):
+        # Decorated functions run inside a span
+        @self.metrics.timed("double")
+        def double(x):
+            return 2 * x
+
+        self.assertTrue(double(2) == 4 and double.__name__ == "double")
+        self.assertTrue(self.metrics.snapshot()["spans"]["double"]["count"] == 1)
+
+    def test_json_logs(self):
+        # Every span is logged as a JSON line when enabled
+        self.metrics.json_logs = True
+        with self.assertLogs("crypto_analysis.metrics", level=logging.INFO) as logs:
+            with self.metrics.span("logged", pair="ETHUSD"):
+                pass
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertTrue(record["span"] == "logged" and record["pair"] == "ETHUSD")
+
+    def test_prometheus_text(self):
+        # Histogram, counters and gauges
+        with self.metrics.span("model.get_data"):
+            pass
+        self.metrics.increment("indicator_results", result="hit")
+        self.metrics.increment("indicator_results", result="hit")
+        self.metrics.increment("payload_bytes", 512, endpoint="OHLC")
+
+        text = self.metrics.prometheus_text(gauges={"cache_entries": [({}, 3)]})
+        self.assertTrue('crypto_analysis_span_seconds_bucket{span="model.get_data",le="1"} 1' in text)
+        self.assertTrue('crypto_analysis_span_seconds_bucket{span="model.get_data",le="0.5"} 0' in text)
+        self.assertTrue('crypto_analysis_span_seconds_count{span="model.get_data"} 1' in text)
+        self.assertTrue('crypto_analysis_indicator_results_total{result="hit"} 2' in text)
+        self.assertTrue('crypto_analysis_payload_bytes_total{endpoint="OHLC"} 512' in text)
+        self.assertTrue("# TYPE crypto_analysis_cache_entries gauge\ncrypto_analysis_cache_entries 3" in text)
+
+        # Reset drops everything
+        self.metrics.reset()
+        self.assertTrue(self.metrics.snapshot() == {"spans": {}, "counters": []})
+
+    def test_export_metrics(self):
+        # Offline model serving cached candles
+        model = offline_model({"BTCUSD": random_candles(400, 7)})
+        metrics.reset()
+
+        # One computed and one memoized result
+        model.compute_indicators("BTCUSD", interval=1440)
+        model.compute_indicators("BTCUSD", interval=1440)
+
+        text = model.export_metrics()
+        self.assertTrue('crypto_analysis_span_seconds_count{span="model.compute_indicators"} 2' in text)
+        self.assertTrue('crypto_analysis_indicator_results_total{result="hit"} 1' in text)
+        self.assertTrue('crypto_analysis_indicator_results_total{result="miss"} 1' in text)
+        self.assertTrue("crypto_analysis_cache_hits" in text)
+
+        exported = json.loads(model.export_metrics(format="json"))
+        self.assertTrue(exported["spans"]["model.compute_indicators"]["count"] == 2)
+        self.assertTrue("cache" in exported and "http" in exported)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,15 @@
+import tempfile
+import threading
 import unittest
+import numpy as np
 import pandas as pd
 
+from helpers import random_candles, offline_model, StubConnection
+
 from crypto_analysis.model import CryptoAnalysisModel
+from crypto_analysis.store import CandleStore
+from crypto_analysis.cache import cache_key
+from crypto_analysis.indicators import stochastic_oscillator
 
 
 # Test CryptoAnalysisModel class
@@ -42,6 +50,22 @@ class TestCryptoAnalysisModel(unittest.TestCase):
         self.model.get_conection()
         self.assertTrue(self.model.connection is not None)
 
+        # One client per thread, all of them on the shared session
+        connections = []
+        thread = threading.Thread(target=lambda: connections.append(self.model.connection))
+        thread.start()
+        thread.join()
+        self.assertTrue(connections[0] is not self.model.connection)
+        self.assertTrue(connections[0].session is self.model.connection.session)
+
+        # A client set on the model is used by every thread
+        stub = StubConnection([])
+        self.model.connection = stub
+        thread = threading.Thread(target=lambda: connections.append(self.model.connection))
+        thread.start()
+        thread.join()
+        self.assertTrue(connections[1] is stub)
+
     def test_load_config(self):
         # Test configuration dictionary generation
         self.model.load_config()
@@ -60,15 +84,81 @@ class TestCryptoAnalysisModel(unittest.TestCase):
         self.assertTrue(len(output_data) > 0)
 
         # Check output columns
-        self.assertTrue(all(output_data.columns == ["date", "open", "high", "low", "close", "volume"]))
+        columns = ["date", "open", "high", "low", "close", "volume"]
+        all_columns = ["date", "open", "high", "low", "close", "vwap", "volume", "count"]
+        self.assertTrue(all(output_data.columns == all_columns))
 
         # Check output values
-        self.assertTrue(all(output_data.loc[0] == expected_output_0))
-        self.assertTrue(all(output_data.loc[1] == expected_output_1))
+        self.assertTrue(all(output_data.loc[0, columns] == expected_output_0))
+        self.assertTrue(all(output_data.loc[1, columns] == expected_output_1))
 
         # Check data cache
         self.assertTrue(len(self.model.data_cache) > 0)
-        self.assertTrue("raw" in self.model.data_cache[self.input_data["pair"]])
+        self.assertTrue(cache_key("raw", **self.input_data) in self.model.data_cache)
+
+    def test_get_stored_data(self):
+        # Offline model with a temporary store
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.model.store = CandleStore(tmp_dir.name)
+
+        rows = [
+            [1641340800, "45", "47", "42", "43", "44", "40", 10],
+            [1641427200, "43", "43", "42", "43", "43", "47", 20],
+        ]
+        self.model.connection = StubConnection(
+            [
+                {"error": [], "result": {"XXBTZUSD": rows, "last": 1641340800}},
+                {
+                    "error": [],
+                    "result": {
+                        "XXBTZUSD": [[1641427200, "43", "44", "42", "44", "43", "50", 25]],
+                        "last": 1641427200,
+                    },
+                },
+                ConnectionError("Kraken unreachable"),
+            ]
+        )
+
+        # Cold start downloads the history
+        output_data = self.model.get_stored_data("BTCUSD", 1440)
+        self.assertTrue(len(output_data) == 2)
+        self.assertTrue("since" not in self.model.connection.calls[0][1])
+
+        # Next request only asks for candles after the cursor
+        output_data = self.model.get_stored_data("BTCUSD", 1440)
+        self.assertTrue(self.model.connection.calls[1][1]["since"] == 1641340800)
+        self.assertTrue(len(output_data) == 2)
+        self.assertTrue(output_data["close"].iloc[-1] == 44.0)
+
+        # Stored data is served when the API fails
+        output_data = self.model.get_stored_data("BTCUSD", 1440)
+        self.assertTrue(len(output_data) == 2)
+
+    def test_get_data_cache_key(self):
+        # Offline model without store
+        self.model.store = None
+        daily_rows = [[1641340800, "45", "47", "42", "43", "44", "40", 10]]
+        hourly_rows = [
+            [1641340800, "45", "46", "44", "45", "45", "2", 3],
+            [1641344400, "45", "45", "43", "44", "44", "3", 4],
+        ]
+        self.model.connection = StubConnection(
+            [
+                {"error": [], "result": {"XXBTZUSD": daily_rows, "last": 1641340800}},
+                {"error": [], "result": {"XXBTZUSD": hourly_rows, "last": 1641340800}},
+            ]
+        )
+
+        # Same pair with different intervals are different entries
+        daily_data = self.model.get_data("BTCUSD", interval=1440)
+        hourly_data = self.model.get_data("BTCUSD", interval=60)
+        self.assertTrue(len(daily_data) == 1 and len(hourly_data) == 2)
+
+        # Cached data is served without new API calls
+        self.assertTrue(self.model.get_data("BTCUSD", interval=60) is hourly_data)
+        self.assertTrue(len(self.model.connection.calls) == 2)
+        self.assertTrue(self.model.data_cache.hits == 1)
 
     def test_get_crypto_pairs(self):
         # Set default pairs
@@ -88,8 +178,10 @@ class TestCryptoAnalysisModel(unittest.TestCase):
         # Check output not empty
         self.assertTrue(len(output_data) > 0)
 
-        # Check output columns
-        self.assertTrue(all(output_data.columns == self.expected_output.columns))
+        # Check output columns, vwap and count are kept too
+        self.assertTrue(set(self.expected_output.columns) <= set(output_data.columns))
+        self.assertTrue({"vwap", "count"} <= set(output_data.columns))
+        output_data = output_data[self.expected_output.columns]
 
         # Check output values
         self.assertTrue(all(output_data.loc[0] == self.expected_output.loc[0]))
@@ -107,13 +199,105 @@ class TestCryptoAnalysisModel(unittest.TestCase):
 
         # Check data cache
         self.assertTrue(len(self.model.data_cache) > 0)
-        self.assertTrue("data" in self.model.data_cache[self.input_data["pair"]])
+        params = self.model.indicator_params()
+        self.assertTrue(cache_key("data", **self.input_data, **params) in self.model.data_cache)
+
+    def test_compute_indicators_memo(self):
+        # Offline model serving cached candles
+        new_data = random_candles(410, 7)
+        raw_data = new_data.iloc[:400].copy()
+        offline_model({"BTCUSD": raw_data}, model=self.model)
+
+        # Same candles and parameters return the memoized result
+        data = self.model.compute_indicators("BTCUSD", interval=1440)
+        self.assertTrue(self.model.compute_indicators("BTCUSD", interval=1440) is data)
+
+        # Other parameters are computed and memoized separately
+        other = self.model.compute_indicators("BTCUSD", interval=1440, stochastic_window=5)
+        self.assertTrue(not other["pctK"].equals(data["pctK"]))
+        self.assertTrue(self.model.compute_indicators("BTCUSD", interval=1440) is data)
+
+        # New candles, and an updated running candle, extend the result
+        new_data.loc[399, "close"] += 0.5
+        self.model.data_cache.set(cache_key("raw", "BTCUSD", 1440), new_data)
+        extended = self.model.compute_indicators("BTCUSD", interval=1440)
+        pd.testing.assert_frame_equal(extended, stochastic_oscillator(new_data, 26, 14, 3))
+
+    def test_optimize_parameters(self):
+        # Offline model serving cached candles
+        offline_model({pair: random_candles(400, i) for i, pair in enumerate(["BTCUSD", "ETHUSD"])}, model=self.model)
+
+        # Backtest of the configured signals and of a parameter grid
+        self.assertTrue("sharpe" in self.model.backtest("BTCUSD", interval=1440))
+        results = self.model.optimize_parameters(["BTCUSD", "ETHUSD"], interval=1440, max_workers=1)
+        self.assertTrue(set(results["pair"]) == {"BTCUSD", "ETHUSD"})
+        self.assertTrue(len(results) == 2 * 5 * 3 * 3 * 3)
+
+    def test_filter_dates(self):
+        # Offline model serving cached candles
+        offline_model({"BTCUSD": random_candles(400, 7)}, model=self.model)
+        data = self.model.compute_indicators("BTCUSD", interval=1440)
+
+        # One index per memoized result
+        index = self.model.date_index(data)
+        self.assertTrue(self.model.date_index(self.model.compute_indicators("BTCUSD", interval=1440)) is index)
+
+        # Same rows as a boolean filter
+        start, end = pd.to_datetime("2023-03-01"), pd.to_datetime("2023-04-30")
+        pd.testing.assert_frame_equal(
+            self.model.filter_dates(data, start.date(), end.date()), data[data["date"].between(start, end)]
+        )
+
+        # Index dropped with its frame
+        self.model.data_cache.invalidate()
+        del data
+        self.assertTrue(len(self.model.date_indexes) == 0)
+
+    def test_compare_pairs(self):
+        # Offline model serving cached candles
+        pairs = ["BTCUSD", "ETHUSD", "XRPUSD"]
+        offline_model({pair: random_candles(400 - 50 * i, i) for i, pair in enumerate(pairs)}, model=self.model)
+
+        # Aligned panel, memoized while the candles don't change
+        panel = self.model.compute_indicators_batch(pairs, interval=1440)
+        self.assertTrue(self.model.compute_indicators_batch(pairs, interval=1440) is panel)
+
+        # Comparison over a date range
+        comparison = self.model.compare_pairs(pairs, interval=1440, start_date="2023-03-01", window=30)
+        self.assertTrue(comparison["panel"].dates[0] == pd.Timestamp("2023-03-01"))
+        self.assertTrue(comparison["normalized"].shape == comparison["panel"].arrays["close"].shape)
+        self.assertTrue(comparison["correlation"].shape == (3, 3))
+        self.assertTrue(set(comparison["ranking"]["pair"]) == set(pairs))
+
+        # Charts of the comparison
+        overlay, heatmap, ranking = self.model.graph_comparison(comparison)
+        self.assertTrue(len(overlay.data) == 3 and len(ranking.data[0].y) == 3)
 
     def test_graph_pair(self):
         # Test graph generation
         fig = self.model.graph_pair(self.expected_output, "BTCUSD")
         self.assertTrue(fig is not None)
 
+    def test_graph_pair_level_of_detail(self):
+        # Long range, more points than the plot width
+        data = stochastic_oscillator(random_candles(20000, 5), 26, 14, 3)
+        fig = self.model.graph_pair(data, "BTCUSD")
+        w_plot = self.model.config["visual"]["w_plot"]
+
+        # Candles and volume are aggregated within the budget
+        candlestick, moving_average, pct_k, pct_d, volume = fig.data
+        self.assertTrue(len(candlestick.x) <= w_plot)
+        widths = np.diff(pd.to_datetime(candlestick.x))
+        self.assertTrue(len(set(widths)) == 1)
+        self.assertTrue(max(candlestick.high) == data["high"].max())
+        self.assertTrue(abs(sum(volume.y) - data["volume"].sum()) < 1e-6)
+
+        # Every signal is still drawn
+        signal_dates = data.loc[(data["Buy_Signal"] == 1) | (data["Sell_Signal"] == 1), "date"]
+        self.assertTrue(set(signal_dates).issubset(set(pd.to_datetime(pct_k.x))))
+        self.assertTrue(len(pct_k.x) <= w_plot + 2 * len(signal_dates))
+        self.assertTrue(len(moving_average.x) <= w_plot + 2 * len(signal_dates))
+
 
 if __name__ == "__main__":
     unittest.main()
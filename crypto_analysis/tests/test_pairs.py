@@ -0,0 +1,113 @@
+import os
+import tempfile
+import unittest
+
+from crypto_analysis.pairs import PairCatalogue, DEFAULT_PAIRS
+
+
+# Offline stand-in for requests.Session, replays the given AssetPairs payloads
+class StubSession:
+    def __init__(self, payloads):
+        self.payloads = list(payloads)
+        self.calls = 0
+
+    def get(self, url, timeout=None):
+        self.calls += 1
+        payload = self.payloads.pop(0)
+        if isinstance(payload, Exception):
+            raise payload
+        return StubResponse(payload)
+
+
+class StubResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+
+# Manual clock to control expiration
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestPairCatalogue(unittest.TestCase):
+    def setUp(self):
+        # Temporary catalogue file
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "asset_pairs.json")
+        self.clock = FakeClock()
+
+        # AssetPairs payload
+        self.payload = {
+            "error": [],
+            "result": {
+                "XXBTZUSD": {
+                    "altname": "XBTUSD",
+                    "wsname": "XBT/USD",
+                    "base": "XXBT",
+                    "quote": "ZUSD",
+                    "tick_size": "0.1",
+                    "pair_decimals": 1,
+                }
+            },
+        }
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_get_pairs(self):
+        # First call downloads the catalogue
+        session = StubSession([self.payload])
+        catalogue = PairCatalogue(path=self.path, session=session, clock=self.clock)
+        pairs = catalogue.get_pairs()
+        self.assertTrue(pairs == DEFAULT_PAIRS + ["XXBTZUSD"])
+
+        # Next calls are served from memory
+        catalogue.get_pairs()
+        self.assertTrue(session.calls == 1)
+
+        # Metadata lookup by any name
+        self.assertTrue(catalogue.get_info("XBT/USD")["tick_size"] == "0.1")
+        self.assertTrue(catalogue.get_info("XBTUSD")["base"] == "XXBT")
+        self.assertTrue(catalogue.get_info("UNKNOWN") is None)
+
+    def test_disk_cache(self):
+        # Saved catalogue is loaded without network calls
+        PairCatalogue(path=self.path, session=StubSession([self.payload]), clock=self.clock).get_pairs()
+        session = StubSession([])
+        catalogue = PairCatalogue(path=self.path, session=session, clock=self.clock)
+        self.assertTrue("XXBTZUSD" in catalogue.get_pairs())
+        self.assertTrue(session.calls == 0)
+
+    def test_background_refresh(self):
+        # Stale catalogue is served while refreshing
+        catalogue = PairCatalogue(path=self.path, ttl=10, session=StubSession([self.payload]), clock=self.clock)
+        catalogue.get_pairs()
+
+        new_payload = {"error": [], "result": {"XETHZUSD": {"altname": "ETHUSD", "wsname": "ETH/USD"}}}
+        catalogue.session = StubSession([new_payload])
+        self.clock.now += 10
+        self.assertTrue("XXBTZUSD" in catalogue.get_pairs())
+
+        catalogue.refresh_thread.join()
+        self.assertTrue("XETHZUSD" in catalogue.get_pairs())
+
+    def test_default_pairs(self):
+        # Default pairs are returned if the API fails
+        session = StubSession([ConnectionError("Kraken unreachable")])
+        catalogue = PairCatalogue(path=self.path, session=session, clock=self.clock)
+        self.assertTrue(catalogue.get_pairs() == DEFAULT_PAIRS)
+
+        # No new request until the retry time
+        self.assertTrue(catalogue.get_pairs() == DEFAULT_PAIRS)
+        self.assertTrue(session.calls == 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+from helpers import StubConnection, offline_model
+from crypto_analysis.store import OHLC_DTYPE
+from crypto_analysis.pyramid import CandlePyramid, aggregate_candles, bucket_start
+
+
+def minute_candles(n, seed, start=1698364800):
+    # Random walk minute candles
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.normal(0, 0.1, n).cumsum()
+    candles = np.empty(n, dtype=OHLC_DTYPE)
+    candles["time"] = start + 60 * np.arange(n)
+    candles["open"] = close + rng.normal(0, 0.05, n)
+    candles["high"] = np.maximum(candles["open"], close) + rng.uniform(0, 0.1, n)
+    candles["low"] = np.minimum(candles["open"], close) - rng.uniform(0, 0.1, n)
+    candles["close"] = close
+    candles["vwap"] = close
+    candles["volume"] = rng.uniform(0, 5, n)
+    candles["count"] = rng.integers(1, 50, n)
+    return candles
+
+
+class TestCandlePyramid(unittest.TestCase):
+    def setUp(self):
+        # Twenty days of minute candles
+        self.candles = minute_candles(20 * 1440, 1)
+
+    def test_bucket_start(self):
+        # Check candle boundaries, weeks start on Monday
+        self.assertTrue(bucket_start(1698364800 + 3599, 60) == 1698364800)
+        week = pd.to_datetime(bucket_start(1698364800, 10080), unit="s")
+        self.assertTrue(week.dayofweek == 0 and week == pd.Timestamp("2023-10-23"))
+
+    def test_aggregate_candles(self):
+        # Check hourly candles
+        hourly = aggregate_candles(self.candles[:120], 60)
+        self.assertTrue(len(hourly) == 2)
+        self.assertTrue(hourly["open"][0] == self.candles["open"][0])
+        self.assertTrue(hourly["close"][1] == self.candles["close"][119])
+        self.assertTrue(hourly["high"][0] == self.candles["high"][:60].max())
+        self.assertTrue(hourly["count"][1] == self.candles["count"][60:120].sum())
+
+    def test_levels(self):
+        # Every level equals the direct aggregation of the minute candles
+        pyramid = CandlePyramid()
+        pyramid.update(self.candles)
+        for interval in pyramid.intervals[1:]:
+            expected = aggregate_candles(self.candles, interval)
+            level = pyramid.level(interval)
+            self.assertTrue(
+                np.array_equal(
+                    level[["time", "open", "high", "low", "close", "count"]],
+                    expected[["time", "open", "high", "low", "close", "count"]],
+                )
+            )
+            self.assertTrue(np.allclose(level["volume"], expected["volume"]))
+            self.assertTrue(np.allclose(level["vwap"], expected["vwap"]))
+
+        # Candles after a time
+        self.assertTrue(len(pyramid.level(1440, since=self.candles["time"][0])) == 19)
+
+    def test_incremental_update(self):
+        # Feed the candles in pages, with the running candle updated by the next page
+        pyramid = CandlePyramid()
+        for start in range(0, len(self.candles), 1000):
+            page = self.candles[max(0, start - 1) : start + 1000].copy()
+            if start + 1000 < len(self.candles):
+                page["close"][-1] += 1
+            pyramid.update(page)
+
+        full = CandlePyramid()
+        full.update(self.candles)
+        for interval in full.intervals:
+            self.assertTrue(np.array_equal(pyramid.level(interval)["close"], full.level(interval)["close"]))
+            self.assertTrue(np.allclose(pyramid.level(interval)["volume"], full.level(interval)["volume"]))
+        self.assertTrue(pyramid.last_timestamp() == int(self.candles["time"][-1]))
+
+    def test_invalid_intervals(self):
+        # Levels must be multiples of each other
+        with self.assertRaises(ValueError):
+            CandlePyramid([1, 5, 7])
+
+    def test_model_pyramid(self):
+        # Offline model aggregating every interval from minute candles
+        model = offline_model()
+        model.pyramid_enabled = True
+        rows = [
+            [
+                int(c["time"]),
+                *(str(c[name]) for name in ["open", "high", "low", "close", "vwap", "volume"]),
+                int(c["count"]),
+            ]
+            for c in self.candles[:720]
+        ]
+        model.connection = StubConnection([{"error": [], "result": {"XXBTZUSD": rows, "last": rows[-2][0]}}])
+
+        # Intervals covered by the minute candles are served from a single request
+        since = int(self.candles["time"][0]) - 60
+        hourly = model.get_data("BTCUSD", interval=60, since=since)
+        quarter = model.get_data("BTCUSD", interval=15, since=since)
+        self.assertTrue(len(hourly) == 12 and len(quarter) == 48)
+        self.assertTrue(len(model.connection.calls) == 1)
+        self.assertTrue(model.connection.calls[0][1]["interval"] == 1)
+        self.assertTrue(hourly["close"].iloc[-1] == self.candles["close"][719])
+
+        # New minute candles update the coarser intervals
+        new_candles = self.candles[720:780]
+        model.merge_candles(new_candles, "BTCUSD", interval=1)
+        hourly = model.get_data("BTCUSD", interval=60, since=since)
+        self.assertTrue(len(hourly) == 13)
+        self.assertTrue(hourly["close"].iloc[-1] == self.candles["close"][779])
+
+    def test_model_pyramid_daily(self):
+        # Daily candles aren't built from a few hours of minute candles, they are requested
+        model = offline_model()
+        model.pyramid_enabled = True
+        minute_rows = [[int(c["time"]), "1", "1", "1", "1", "1", "1", 1] for c in self.candles[:720]]
+        daily_rows = [[1698364800 - 86400 * i, "1", "2", "1", "1", "1", "1", 1] for i in range(300, 0, -1)]
+        model.connection = StubConnection(
+            [
+                {"error": [], "result": {"XXBTZUSD": minute_rows, "last": minute_rows[-2][0]}},
+                {"error": [], "result": {"XXBTZUSD": daily_rows, "last": daily_rows[-2][0]}},
+            ]
+        )
+
+        daily = model.get_data("BTCUSD", interval=1440)
+        self.assertTrue(len(daily) == 300)
+        self.assertTrue([call[1]["interval"] for call in model.connection.calls] == [1, 1440])
+        self.assertTrue(len(model.get_data("BTCUSD", interval=15, since=int(self.candles["time"][0]) - 60)) == 48)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+from helpers import random_candles, offline_model
+
+from crypto_analysis.cache import cache_key
+from crypto_analysis.registry import IndicatorGraph, INDICATORS, compile_indicators, register_indicator
+
+
+def wilder_rsi(close, window):
+    # Reference RSI, averages of gains and losses updated one candle at a time
+    change = np.diff(close)
+    gains, losses = np.clip(change, 0, None), np.clip(-change, 0, None)
+    output = np.full(len(close), np.nan)
+    avg_gain, avg_loss = gains[0], losses[0]
+    for i in range(1, len(change)):
+        avg_gain += (gains[i] - avg_gain) / window
+        avg_loss += (losses[i] - avg_loss) / window
+        if i >= window - 1:
+            output[i + 1] = 100 * avg_gain / (avg_gain + avg_loss)
+    return output
+
+
+class TestRegistry(unittest.TestCase):
+    def setUp(self):
+        # Random walk candles with their vwap
+        self.candles = random_candles(300, 3).assign(
+            vwap=lambda data: (data["high"] + data["low"] + data["close"]) / 3, count=1
+        )
+
+    def test_builtin_indicators(self):
+        # Same values as straightforward pandas computations
+        graph = compile_indicators(
+            [
+                {"kind": "rsi", "window": 14},
+                {"kind": "macd", "fast": 12, "slow": 26, "signal": 9},
+                {"kind": "bollinger", "window": 20, "width": 2},
+                {"kind": "atr", "window": 14},
+                {"kind": "vwap", "window": 10},
+            ]
+        )
+        output = graph.evaluate(self.candles)
+        close, high, low = self.candles["close"], self.candles["high"], self.candles["low"]
+
+        np.testing.assert_allclose(output["RSI_14"], wilder_rsi(close.to_numpy(), 14))
+
+        fast = close.ewm(span=12, adjust=False, min_periods=12).mean()
+        slow = close.ewm(span=26, adjust=False, min_periods=26).mean()
+        signal = (fast - slow).ewm(span=9, adjust=False, min_periods=9).mean()
+        np.testing.assert_allclose(output["MACD_12_26"], fast - slow)
+        np.testing.assert_allclose(output["MACD_hist_12_26_9"], fast - slow - signal)
+
+        band = 2 * close.rolling(20).std(ddof=0)
+        np.testing.assert_allclose(output["BB_upper_20_2"], close.rolling(20).mean() + band)
+        np.testing.assert_allclose(output["BB_lower_20_2"], close.rolling(20).mean() - band)
+
+        previous = close.shift(1)
+        true_range = pd.concat([high - low, (high - previous).abs(), (low - previous).abs()], axis=1).max(axis=1)
+        average_true_range = true_range.ewm(alpha=1 / 14, adjust=False, min_periods=14).mean()
+        np.testing.assert_allclose(output["ATR_14"], average_true_range)
+
+        traded = (self.candles["vwap"] * self.candles["volume"]).rolling(10).sum()
+        np.testing.assert_allclose(output["VWAP_10"], traded / self.candles["volume"].rolling(10).sum())
+
+    def test_shared_nodes(self):
+        # Equal nodes of different indicators are added once
+        separate = sum(
+            len(compile_indicators([spec]).nodes)
+            for spec in [{"kind": "ma", "window": 20}, {"kind": "bollinger", "window": 20}]
+        )
+        graph = compile_indicators([{"kind": "ma", "window": 20}, {"kind": "bollinger", "window": 20}])
+        self.assertTrue(len(graph.nodes) == separate - 2)
+        self.assertTrue(graph.columns["MA_20"] == graph.columns["BB_middle_20"])
+
+        # Only the nodes of the requested columns are evaluated
+        graph = compile_indicators([{"kind": "rsi"}, {"kind": "stochastic"}])
+        operations = {node[0] for node in graph.dependencies(["RSI_14"])}
+        self.assertTrue("rolling_max" not in operations and "ewm" in operations)
+        self.assertTrue(list(graph.evaluate(self.candles, ["pctK_14"])) == ["pctK_14"])
+
+    def test_panel(self):
+        # (time x pair) arrays computed at once, as every pair on its own
+        graph = compile_indicators([{"kind": "stochastic"}, {"kind": "atr"}])
+        other = random_candles(300, 4).assign(vwap=0.0)
+        panel = {
+            column: np.column_stack([self.candles[column], other[column]]) for column in ["high", "low", "close"]
+        }
+        output = graph.evaluate(panel)
+        for j, frame in enumerate([self.candles, other]):
+            for column, values in graph.evaluate(frame).items():
+                np.testing.assert_allclose(output[column][:, j], values)
+
+    def test_register(self):
+        # New indicators are plugged in by kind
+        @register_indicator("range")
+        def price_range(graph, window=5):
+            high = graph.node("rolling_max", graph.column("high"), window=window)
+            return {
+                f"range_{window}": graph.node(
+                    "sub", high, graph.node("rolling_min", graph.column("low"), window=window)
+                )
+            }
+
+        try:
+            graph = compile_indicators([{"kind": "range"}, {"kind": "stochastic", "window": 5}])
+            self.assertTrue(len([node for node in graph.nodes if node[0] == "rolling_max"]) == 1)
+            self.assertTrue(np.nanmin(graph.evaluate(self.candles)["range_5"]) > 0)
+        finally:
+            INDICATORS.pop("range")
+
+        # Unknown indicators, operations and columns
+        with self.assertRaises(ValueError):
+            compile_indicators([{"kind": "unknown"}])
+        with self.assertRaises(ValueError):
+            IndicatorGraph().node("median", IndicatorGraph().column("close"))
+        with self.assertRaises(KeyError):
+            compile_indicators([{"kind": "rsi"}]).evaluate(self.candles, ["RSI_7"])
+
+    def test_compute_indicators_columns(self):
+        # Requested columns added to the rows of the stochastic oscillator, and cached
+        model = offline_model({"BTCUSD": self.candles})
+
+        data = model.compute_indicators("BTCUSD", interval=1440)
+        self.assertTrue("RSI_14" in model.indicator_columns() and "RSI_14" not in data)
+
+        extended = model.compute_indicators("BTCUSD", interval=1440, columns=["RSI_14", "VWAP_26"])
+        self.assertTrue(list(extended.columns) == list(data.columns) + ["RSI_14", "VWAP_26"])
+        self.assertTrue(len(extended) == len(data) and "RSI_14" not in data)
+        expected = model.indicator_graph.evaluate(self.candles, ["RSI_14"])["RSI_14"][-len(data) :]
+        np.testing.assert_array_equal(extended["RSI_14"].to_numpy(), expected)
+
+        cached = model.data_cache.peek(cache_key("indicator", "BTCUSD", 1440, column="VWAP_26"))
+        self.assertTrue(cached is not None and len(cached[1]) == len(self.candles))
+
+
+if __name__ == "__main__":
+    unittest.main()
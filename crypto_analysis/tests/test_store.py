@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+
+from crypto_analysis.store import CandleStore, parse_candles, candles_to_frame
+
+
+class TestCandleStore(unittest.TestCase):
+    def setUp(self):
+        # Temporary store directory
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store = CandleStore(os.path.join(self.tmp_dir.name, "store"))
+
+        # Raw API rows
+        self.rows = [
+            [1641340800, "45", "47", "42", "43", "44", "40", 10],
+            [1641427200, "43", "43", "42", "43", "43", "47", 20],
+            [1641513600, "43", "43", "40", "41", "41", "57", 15],
+        ]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_parse_candles(self):
+        # Check typed fields
+        candles = parse_candles(self.rows)
+        self.assertTrue(len(candles) == 3)
+        self.assertTrue(candles["time"].dtype == np.int64)
+        self.assertTrue(candles["close"][2] == 41.0)
+        self.assertTrue(candles["count"][1] == 20)
+
+    def test_empty_store(self):
+        # Check empty store reads
+        self.assertTrue(len(self.store.read("BTCUSD", 1440)) == 0)
+        self.assertTrue(self.store.last_timestamp("BTCUSD", 1440) is None)
+        self.assertTrue(self.store.get_cursor("BTCUSD", 1440) is None)
+
+    def test_append(self):
+        # Append first candles and save cursor
+        self.store.append("BTCUSD", 1440, parse_candles(self.rows[:2]), last=1641340800)
+        self.assertTrue(self.store.get_cursor("BTCUSD", 1440) == 1641340800)
+        self.assertTrue(self.store.last_timestamp("BTCUSD", 1440) == 1641427200)
+
+        # Append overlapping candles, the running candle is overwritten
+        updated_rows = [[1641427200, "43", "44", "42", "44", "43", "50", 25]] + self.rows[2:]
+        self.store.append("BTCUSD", 1440, parse_candles(updated_rows), last=1641427200)
+
+        candles = self.store.read("BTCUSD", 1440)
+        self.assertTrue(list(candles["time"]) == [1641340800, 1641427200, 1641513600])
+        self.assertTrue(candles["close"][1] == 44.0)
+        self.assertTrue(candles["count"][1] == 25)
+
+        # Memory-mapped read returns the same records
+        self.assertTrue(np.array_equal(self.store.read("BTCUSD", 1440, mmap=True), candles))
+
+        # Different intervals are stored separately
+        self.assertTrue(len(self.store.read("BTCUSD", 60)) == 0)
+        self.assertTrue(len(self.store) == 1)
+
+    def test_candles_to_frame(self):
+        # Check frame columns
+        data = candles_to_frame(parse_candles(self.rows))
+        self.assertTrue(all(data.columns == ["date", "open", "high", "low", "close", "vwap", "volume", "count"]))
+        self.assertTrue(data["volume"].tolist() == [40, 47, 57])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+from crypto_analysis.indicators import stochastic_oscillator
+from crypto_analysis.streaming import StochasticState, RollingMean, RollingExtreme
+from helpers import random_candles
+
+
+class TestStreaming(unittest.TestCase):
+    def setUp(self):
+        # Random walk candles
+        self.raw_data = random_candles(400, 7)
+
+    def test_rolling_mean(self):
+        # Check mean including the new value
+        mean = RollingMean(3)
+        for value in [1.0, 2.0]:
+            self.assertTrue(np.isnan(mean.peek(value)))
+            mean.push(value)
+        self.assertTrue(mean.peek(3.0) == 2.0)
+        mean.push(3.0)
+        self.assertTrue(mean.peek(7.0) == 4.0)
+
+    def test_rolling_extreme(self):
+        # Check against pandas rolling max
+        values = np.random.default_rng(0).normal(size=100)
+        expected = pd.Series(values).rolling(5).max().to_numpy()
+        extreme = RollingExtreme(5, max)
+        output = []
+        for value in values:
+            output.append(extreme.peek(value))
+            extreme.push(value)
+        np.testing.assert_array_equal(np.array(output), expected)
+
+    def test_same_as_batch(self):
+        # Feed candles one at a time
+        state = StochasticState(26, 14, 3)
+        rows = [state.update(candle) for candle in self.raw_data.to_dict("records")]
+        output = pd.DataFrame([row for row in rows if row is not None])
+
+        # Check against the batch computation
+        expected_output = stochastic_oscillator(self.raw_data, 26, 14, 3)
+        pd.testing.assert_frame_equal(output, expected_output, check_exact=False, check_dtype=False)
+
+    def test_running_candle(self):
+        # Updates of the running candle replace it
+        state = StochasticState(26, 14, 3)
+        for candle in self.raw_data.iloc[:-1].to_dict("records"):
+            state.update(candle)
+
+        last_candle = self.raw_data.iloc[-1].to_dict()
+        state.update(dict(last_candle, close=last_candle["low"], high=last_candle["high"] + 5))
+        row = state.update(last_candle)
+
+        expected_output = stochastic_oscillator(self.raw_data, 26, 14, 3).iloc[-1]
+        self.assertTrue(np.isclose(row["pctK"], expected_output["pctK"]))
+        self.assertTrue(np.isclose(row["pctD"], expected_output["pctD"]))
+        self.assertTrue(np.isclose(row["MA"], expected_output["MA"]))
+
+        # Older candles are rejected
+        with self.assertRaises(ValueError):
+            state.update(self.raw_data.iloc[0].to_dict())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import json
+import time
+import unittest
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from crypto_analysis.model import CryptoAnalysisModel
+from crypto_analysis.metrics import metrics
+from crypto_analysis.transport import LatencyMetrics, Transport
+
+
+class Handler(BaseHTTPRequestHandler):
+    # Local endpoints: /ok, /flaky (fails twice, then answers) and /slow
+    failures = {}
+
+    def do_GET(self):
+        if self.path == "/flaky" and Handler.failures.get(self.path, 0) < 2:
+            Handler.failures[self.path] = Handler.failures.get(self.path, 0) + 1
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        if self.path == "/slow":
+            time.sleep(0.5)
+
+        body = json.dumps({"error": [], "result": {"path": self.path}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except BrokenPipeError:
+            # Client gone after its timeout
+            pass
+
+    do_POST = do_GET
+
+    def log_message(self, *args):
+        pass
+
+
+class TestTransport(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Local HTTP server
+        cls.server = ThreadingHTTPServer(("localhost", 0), Handler)
+        cls.uri = f"http://localhost:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        Handler.failures = {}
+        self.transport = Transport(read_timeout=0.2, retries=3, backoff=0.01)
+
+    def test_pooled_session(self):
+        # The same connection answers every request
+        for _ in range(3):
+            self.assertTrue(self.transport.get(f"{self.uri}/ok").json()["result"]["path"] == "/ok")
+
+        metrics = self.transport.metrics.snapshot()["/ok"]
+        self.assertTrue(metrics["requests"] == 3 and metrics["errors"] == 0)
+        self.assertTrue(metrics["p50"] <= metrics["max"])
+
+    def test_payload_bytes(self):
+        # Size of every response received, by endpoint, even with requests running at once
+        def payload_bytes():
+            return sum(
+                counter["value"]
+                for counter in metrics.snapshot()["counters"]
+                if counter["name"] == "payload_bytes" and counter["labels"] == {"endpoint": "ok"}
+            )
+
+        before = payload_bytes()
+        threads = [threading.Thread(target=self.transport.get, args=(f"{self.uri}/ok",)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        body = json.dumps({"error": [], "result": {"path": "/ok"}}).encode()
+        self.assertTrue(payload_bytes() - before == 8 * len(body))
+
+    def test_retry_server_errors(self):
+        # Server errors are retried with backoff
+        response = self.transport.get(f"{self.uri}/flaky")
+        self.assertTrue(response.status_code == 200)
+        self.assertTrue(Handler.failures["/flaky"] == 2)
+
+    def test_timeout(self):
+        # Slow endpoints fail after the read timeout, and count as errors
+        with self.assertRaises(Exception):
+            Transport(read_timeout=0.1, retries=0).get(f"{self.uri}/slow")
+
+        transport = Transport(read_timeout=0.1, retries=0)
+        try:
+            transport.get(f"{self.uri}/slow")
+        except Exception:
+            pass
+        self.assertTrue(transport.metrics.snapshot()["/slow"]["errors"] == 1)
+
+    def test_query_retry(self):
+        # Kraken rate limit errors are retried
+        sleeps = []
+        transport = Transport(retries=2, sleep=sleeps.append)
+        responses = [{"error": ["EAPI:Rate limit exceeded"]}, {"error": [], "result": {}}]
+        self.assertTrue(transport.query(lambda: responses.pop(0)) == {"error": [], "result": {}})
+        self.assertTrue(len(sleeps) == 1)
+
+        # Other errors are returned at once
+        self.assertTrue(transport.query(lambda: {"error": ["EQuery:Unknown asset pair"]})["error"])
+
+    def test_latency_percentiles(self):
+        # Percentiles over the recent requests
+        metrics = LatencyMetrics(window=100)
+        for i in range(200):
+            metrics.record("/0/public/OHLC", i / 1000)
+        snapshot = metrics.snapshot()["/0/public/OHLC"]
+        self.assertTrue(snapshot["requests"] == 200)
+        self.assertTrue(snapshot["p50"] == 0.15 and snapshot["p99"] == 0.199)
+
+    def test_model_transport(self):
+        # Kraken client and pairs catalogue share the model transport
+        model = CryptoAnalysisModel()
+        model.get_conection()
+        self.assertTrue(model.connection.session is model.transport.session)
+        self.assertTrue(model.pair_catalogue.session is model.transport)
+        self.assertTrue(CryptoAnalysisModel().transport is model.transport)
+
+        # Kraken requests are measured by endpoint
+        model.connection.uri = self.uri
+        model.connection.session.post(f"{self.uri}/ok")
+        self.assertTrue("/ok" in model.get_http_metrics())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,6 +3,7 @@ import pandas as pd
 from datetime import datetime, timedelta
 
 from crypto_analysis.utils import select_box_date, process_response
+from crypto_analysis.exception import CryptoAnalysisException
 
 
 class TestUtils(unittest.TestCase):
@@ -29,11 +30,13 @@ class TestUtils(unittest.TestCase):
     def test_process_response(self):
         # Set expected processed output
         output_data = [
-            [pd.to_datetime(1641340800, unit="s"), 45, 47, 42, 43, 40],
-            [pd.to_datetime(1641427200, unit="s"), 43, 43, 42, 43, 47],
-            [pd.to_datetime(1641513600, unit="s"), 43, 43, 40, 41, 57],
+            [pd.to_datetime(1641340800, unit="s"), 45, 47, 42, 43, 44, 40, 10],
+            [pd.to_datetime(1641427200, unit="s"), 43, 43, 42, 43, 43, 47, 20],
+            [pd.to_datetime(1641513600, unit="s"), 43, 43, 40, 41, 41, 57, 15],
         ]
-        expected_output = pd.DataFrame(output_data, columns=["date", "open", "high", "low", "close", "volume"])
+        expected_output = pd.DataFrame(
+            output_data, columns=["date", "open", "high", "low", "close", "vwap", "volume", "count"]
+        )
 
         # Get processed output
         output = process_response(self.response)
@@ -43,6 +46,16 @@ class TestUtils(unittest.TestCase):
 
         # Check output values
         self.assertTrue(all(output == expected_output))
+        pd.testing.assert_frame_equal(output, expected_output, check_dtype=False)
+
+        # Check typed columns
+        self.assertTrue(output["close"].dtype == "float64")
+        self.assertTrue(output["count"].dtype == "int64")
+
+    def test_process_response_empty(self):
+        # Empty response raises
+        with self.assertRaises(CryptoAnalysisException):
+            process_response({"error": [], "result": {"BTCUSD": [], "last": 0}})
 
     def test_select_box_date(self):
         # Set expected output
@@ -60,6 +73,14 @@ class TestUtils(unittest.TestCase):
         # Check start date
         self.assertTrue(end_date.strftime("%Y/%m/%d") in expected_end_date)
 
+    def test_select_box_date_bounds(self):
+        # Precomputed bounds, the newest date before today is the default end date
+        bounds = (pd.to_datetime(1698364800, unit="s"), pd.to_datetime(1698537600, unit="s"))
+        start_date, end_date = select_box_date(self.date_df.iloc[:3], bounds=bounds)
+
+        self.assertTrue(start_date.strftime("%Y/%m/%d") == bounds[0].strftime("%Y/%m/%d"))
+        self.assertTrue(end_date.strftime("%Y/%m/%d") == bounds[1].strftime("%Y/%m/%d"))
+
 
 if __name__ == "__main__":
     unittest.main()